@@ -0,0 +1,339 @@
+# bench_pipeline.py
+# End-to-end benchmark of the three tools against the offline LLM stand-in.
+#
+#   python benchmarks/bench_pipeline.py                       # writes bench_results/<commit>.json
+#   python benchmarks/bench_pipeline.py --quick --compare bench_results/abc1234.json
+#
+# FAKE_LLM_* environment variables shape the simulated model (see README).
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "0")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "0")
+os.environ.setdefault("FAKE_LLM_LATENCY", "lognormal")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "40")
+os.environ.setdefault("FAKE_LLM_JITTER_MS", "10")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SEC", "4000")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src_core.loader import load_tool
+from src_core.pdf_text import extract_pdf_text
+from src_core.ratelimit import get_llm_guard
+from src_core.semantic_cache import SemanticCache
+
+PDFS = [
+    "Impact_of_climate_change_on_agriculture.pdf",
+    "Irregular_shape__surface_area_calculation_using_image_processing.pdf",
+]
+SENTENCE = "Climate variability reshapes crop yields, water availability and the economics of smallholder farming. "
+
+
+def sample_text(words):
+    base = SENTENCE.split()
+    text = " ".join(base[i % len(base)] for i in range(words))
+    # Paragraph breaks every ~120 words so chunking has natural boundaries
+    parts = text.split(" ")
+    return "\n\n".join(" ".join(parts[i:i + 120]) for i in range(0, len(parts), 120))
+
+
+def layout_sample(megabytes):
+    block = (
+        "## Section heading\n\n"
+        "A paragraph with **bold** terms and plain text about crop yields and water.\n"
+        "- a bullet point with **emphasis**\n"
+        "1.1 Numbered subsection\n"
+    )
+    return block * (megabytes * 1024 * 1024 // len(block))
+
+
+def synthetic_topics(count, seed):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9))) for _ in range(5000)]
+    return [" ".join(rng.sample(vocabulary, rng.randint(3, 6))) for _ in range(count)]
+
+
+def reword(topic, rng):
+    # Same content words, different phrasing: shuffled, with filler and a plural
+    words = topic.split()
+    rng.shuffle(words)
+    words[0] += "s"
+    return "what about the " + " and ".join(words)
+
+
+def peak_memory_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def measure(fn, runs, concurrency=1):
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, range(runs)))
+    wall = time.perf_counter() - wall
+    return {
+        "runs": runs,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(runs / wall, 3),
+    }
+
+
+class TokenCounter(BaseCallbackHandler):
+    # Sums usage reported by every LLM call made while it is attached
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.calls += 1
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+
+def count_calls(fn):
+    guard = get_llm_guard()
+    before = guard.stats["calls"]
+    fn()
+    return {"llm_calls": guard.stats["calls"] - before}
+
+
+def count_tokens(workflow, state):
+    counter = TokenCounter()
+    workflow.invoke(state, config={"callbacks": [counter]})
+    return {"llm_calls": counter.calls, "input_tokens": counter.input_tokens, "output_tokens": counter.output_tokens}
+
+
+class Bench:
+    def __init__(self):
+        self.results = []
+
+    def run(self, name, params, fn, runs, concurrency=1, extra=None):
+        label = f"{name} {json.dumps(params, sort_keys=True)}"
+        try:
+            result = extra() if extra else {}
+            fn()  # warm-up, also surfaces errors before timing
+            result.update(measure(fn, runs, concurrency))
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        self.results.append({"name": name, "params": params, **result})
+        print(f"{label:<70} {result.get('p50_ms', result.get('error'))}", file=sys.stderr)
+
+
+def bench_workflows(bench, sizes, concurrencies, runs):
+    inputs = {
+        "essay": lambda text: {"topic": text},
+        "thesis": lambda text: {"topic": text},
+        "paraphrase": lambda text: {"input_paragraph": text},
+    }
+    for tool, make_input in inputs.items():
+        try:
+            nodes = load_tool(tool).nodes_workflow
+        except Exception as e:
+            bench.results.append({"name": f"workflow/{tool}", "params": {}, "error": f"{type(e).__name__}: {e}"})
+            print(f"workflow/{tool}: could not load ({type(e).__name__}: {e})", file=sys.stderr)
+            continue
+        workflow = nodes.create_workflow()
+        for words in sizes:
+            # "fast" merges humanize + grammar into one call; compare against "standard"
+            for mode in ("standard", "fast"):
+                state = {**make_input(sample_text(words)), "mode": mode}
+                for concurrency in concurrencies:
+                    bench.run(
+                        f"workflow/{tool}",
+                        {"words": words, "concurrency": concurrency, "mode": mode},
+                        lambda: workflow.invoke(state),
+                        runs=max(runs, concurrency),
+                        concurrency=concurrency,
+                        extra=lambda: count_tokens(workflow, state),
+                    )
+        if tool == "essay":
+            # Outline, then every section written in its own branch; compare with one call
+            for length in (5000,):
+                for mode in ("standard", "fast"):
+                    state = {"topic": SENTENCE.strip(), "length": length, "mode": mode}
+                    bench.run(
+                        "workflow/essay_sectioned",
+                        {"length": length, "mode": mode},
+                        lambda: workflow.invoke(state, nodes.RUN_CONFIG),
+                        runs=runs,
+                        extra=lambda: count_tokens(workflow, state),
+                    )
+        if tool == "thesis":
+            # N topics through the batched prompts vs. N single-topic runs
+            for topics in (5, 20):
+                names = [f"{SENTENCE.strip()} ({i})" for i in range(topics)]
+                for mode in ("standard", "fast"):
+                    bench.run(
+                        "generate_theses",
+                        {"topics": topics, "mode": mode},
+                        lambda: nodes.generate_theses(names, mode=mode),
+                        runs=runs,
+                        extra=lambda: count_calls(lambda: nodes.generate_theses(names, mode=mode)),
+                    )
+        if tool == "paraphrase":
+            for words in sizes:
+                text = sample_text(words)
+                bench.run("paraphrase_document", {"words": words}, lambda: nodes.paraphrase_document(text), runs=runs)
+                # Re-run after editing one paragraph, reusing the outputs of the others
+                memo = {}
+                nodes.paraphrase_document(text, memo=memo)
+                edited = "Edited opening sentence. " + text
+                bench.run(
+                    "paraphrase_document/edit_one_paragraph",
+                    {"words": words},
+                    lambda: nodes.paraphrase_document(edited, memo=dict(memo)),
+                    runs=runs,
+                )
+
+
+def bench_pdf(bench, sizes, runs, layout_sizes):
+    essay_tools = load_tool("essay").tools
+    for words in sizes + (20000,):
+        text = "## Introduction\n\n" + sample_text(words) + "\n\nReferences\n\nAuthor, A. (2024). Title."
+        bench.run("format_for_pdf", {"words": words}, lambda: essay_tools.format_for_pdf(text), runs=runs)
+        bench.run("render_pdf_bytes", {"words": words}, lambda: essay_tools.render_pdf_bytes(text), runs=runs)
+
+    # The layout tokenizer should scale linearly with constant extra memory
+    layout = load_tool("essay").layout
+    for megabytes in layout_sizes:
+        text = layout_sample(megabytes)
+        bench.run(
+            "layout.iter_blocks",
+            {"input_mb": megabytes},
+            lambda: deque(layout.iter_blocks(text), maxlen=0),
+            runs=max(1, runs // 2),
+            extra=lambda: {"peak_kb": peak_memory_kb(lambda: deque(layout.iter_blocks(text), maxlen=0))},
+        )
+    # Long runs of blanks inside headings and list items must stay linear too
+    for spaces in (1000, 4000):
+        lines = "".join(f"{prefix}a{' ' * spaces}b{' ' * spaces}\n" for prefix in ("# ", "- ", "1. ", "1.1 "))
+        bench.run("layout.iter_blocks/whitespace", {"spaces": spaces}, lambda: deque(layout.iter_blocks(lines), maxlen=0), runs=runs)
+
+    for pdf in PDFS:
+        path = os.path.join(ROOT, pdf)
+        bench.run("extract_pdf_text", {"file": pdf, "cache": False}, lambda: extract_pdf_text(path, use_cache=False), runs=runs)
+        bench.run("extract_pdf_text", {"file": pdf, "cache": True}, lambda: extract_pdf_text(path), runs=runs)
+
+
+def bench_semantic_cache(bench, sizes, runs):
+    namespace = ("essay", "standard")
+    for entries in sizes:
+        topics = synthetic_topics(entries, seed=entries)
+        cache = SemanticCache(max_entries=entries, ttl=0)
+        start = time.perf_counter()
+        for i, topic in enumerate(topics):
+            cache.add(namespace, topic, {"final_output": str(i)})
+        fill_s = time.perf_counter() - start
+        rng = random.Random(entries)
+        queries = {
+            "hit": [reword(rng.choice(topics), rng) for _ in range(256)],
+            "miss": synthetic_topics(256, seed=entries + 1),
+        }
+        for kind, batch in queries.items():
+            found = sum(cache.lookup(namespace, query) is not None for query in batch) / len(batch)
+            cycle = itertools.cycle(batch)
+            bench.run(
+                "semantic_cache.lookup",
+                {"entries": entries, "query": kind},
+                lambda: cache.lookup(namespace, next(cycle)),
+                runs=max(runs * 40, 200),
+                extra=lambda: {"fill_s": round(fill_s, 3), "signature_kb": round(cache.stats()["bytes"] / 1024, 1), "found": found},
+            )
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    print(f"\nComparison with {baseline_path} ({baseline['meta']['commit']}):")
+    for result in current:
+        key = (result["name"], json.dumps(result["params"], sort_keys=True))
+        old = previous.get(key)
+        if not old or "p50_ms" not in old or "p50_ms" not in result:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0.0
+        print(f"  {key[0]} {key[1]:<45} p50 {old['p50_ms']:>10.2f} -> {result['p50_ms']:>10.2f} ms ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the essay, thesis and paraphrase pipelines offline.")
+    parser.add_argument("--output", help="results file (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="smaller matrix for a fast sanity check")
+    args = parser.parse_args(argv)
+
+    sizes = (100, 1000) if args.quick else (100, 1000, 5000)
+    concurrencies = (1, 4) if args.quick else (1, 4, 16)
+
+    bench = Bench()
+    bench_workflows(bench, sizes, concurrencies, args.runs)
+    bench_pdf(bench, sizes, args.runs, (1, 4) if args.quick else (1, 4, 16))
+    bench_semantic_cache(bench, (10000, 100000) if args.quick else (1000, 10000, 100000), args.runs)
+
+    commit = current_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "fake_llm": {k: v for k, v in os.environ.items() if k.startswith("FAKE_LLM_")},
+        },
+        "results": bench.results,
+    }
+    output = args.output or os.path.join(ROOT, "bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}", file=sys.stderr)
+
+    if args.compare:
+        compare(bench.results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
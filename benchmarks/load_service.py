@@ -0,0 +1,84 @@
+# load_service.py
+# Load test for the HTTP service. Start it against the offline LLM first:
+#
+#   LLM_PROVIDER=fake FAKE_LLM_LATENCY_MS=200 uvicorn src_core.service:app --port 8000
+#   python benchmarks/load_service.py --jobs 200 --clients 32 --tool essay
+#
+# Each client submits a job, follows its event stream to the end and repeats.
+# 429 responses are retried after the Retry-After delay and counted.
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)] if ordered else 0.0
+
+
+async def run_one(client, tool, index, stats):
+    body = {"text": f"Paragraph {index} about crop yields."} if tool == "paraphrase" else {"topic": f"Topic {index}"}
+    start = time.perf_counter()
+    while True:
+        response = await client.post(f"/{tool}", json=body)
+        if response.status_code != 429:
+            break
+        stats["rejected"] += 1
+        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+    response.raise_for_status()
+    first_token = None
+    async with client.stream("GET", response.json()["events_url"]) as events:
+        async for line in events.aiter_lines():
+            if line == "event: token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif line.startswith("event: ") and line[7:] in ("done", "error"):
+                stats["ok" if line[7:] == "done" else "failed"] += 1
+    stats["latencies"].append(time.perf_counter() - start)
+    if first_token is not None:
+        stats["first_token"].append(first_token)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the essay/thesis/paraphrase HTTP service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tool", choices=("essay", "thesis", "paraphrase"), default="essay")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    stats = {"ok": 0, "failed": 0, "rejected": 0, "latencies": [], "first_token": []}
+    queue = asyncio.Queue()
+    for index in range(args.jobs):
+        queue.put_nowait(index)
+
+    async def client_loop(client):
+        while not queue.empty():
+            await run_one(client, args.tool, queue.get_nowait(), stats)
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies = stats.pop("latencies")
+    first_token = stats.pop("first_token")
+    print(json.dumps({
+        **stats,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_s": round(stats["ok"] / elapsed, 3),
+        "mean_s": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p50_first_token_s": round(percentile(first_token, 50), 3),
+    }, indent=2))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,163 @@
+# batch.py
+# Headless runner for bulk essay / thesis / paraphrase jobs.
+#
+#   python -m src_core.batch jobs.jsonl -o results.jsonl --tool essay --concurrency 4
+#
+# Each input line is a JSON object with an id ("id", "job_id" or "request_id"),
+# an optional "tool", an optional "mode" ("standard" or "fast") and the input
+# text ("topic" for essay/thesis, "text" for paraphrase, or any field named
+# with --input-field). Essay jobs may set "length", a target word count.
+# Results are appended to the output file as they finish;
+# rerunning with the same output file skips jobs that already succeeded.
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from src_core.loader import load_tool, TOOL_PACKAGES
+from src_core.ratelimit import lane, is_guarded, BATCH
+
+INPUT_FIELDS = {"essay": "topic", "thesis": "topic", "paraphrase": "text"}
+ID_FIELDS = ("id", "job_id", "request_id")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def read_jobs(path, default_tool, input_field):
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            job_id = next((str(record[k]) for k in ID_FIELDS if k in record), str(line_no))
+            tool = record.get("tool", default_tool)
+            if tool not in TOOL_PACKAGES:
+                raise ValueError(f"Job {job_id}: unknown or missing tool '{tool}'")
+            field = input_field or INPUT_FIELDS[tool]
+            if not record.get(field):
+                raise ValueError(f"Job {job_id}: missing input field '{field}'")
+            jobs.append({
+                "id": job_id,
+                "tool": tool,
+                "input": record[field],
+                "mode": record.get("mode", "standard"),
+                "bypass_cache": record.get("bypass_cache", False),
+                "length": record.get("length", 0),
+            })
+    return jobs
+
+
+def completed_job_ids(path):
+    # The output file doubles as the resume checkpoint
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok":
+                    done.add(record["id"])
+    return done
+
+
+async def run_job(job):
+    nodes = load_tool(job["tool"]).nodes_workflow
+    if job["tool"] == "paraphrase":
+        return await nodes.aparaphrase_document(job["input"], bypass_cache=job["bypass_cache"], mode=job["mode"])
+    inputs = {"topic": job["input"], "bypass_cache": job["bypass_cache"], "mode": job["mode"]}
+    if job["tool"] == "essay":
+        inputs["length"] = job["length"]
+        return (await nodes.acreate_workflow().ainvoke(inputs, nodes.RUN_CONFIG))["final_output"]
+    return (await nodes.acreate_workflow().ainvoke(inputs))["thesis_list"]
+
+
+async def run_with_retries(job, max_retries, base_delay):
+    # Every LLM call already goes through LLMGuard's retries, so a whole job is only
+    # rerun for other failures, such as a locked cache database
+    attempt = 0
+    while True:
+        try:
+            return await run_job(job), attempt
+        except Exception as e:
+            if attempt >= max_retries or is_guarded(e):
+                raise
+            await asyncio.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+async def run_batch(jobs, output_path, concurrency=4, max_retries=3, base_delay=2.0, log=sys.stderr):
+    done = completed_job_ids(output_path)
+    pending = [job for job in jobs if job["id"] not in done]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        async def worker(job):
+            nonlocal failures
+            async with semaphore:
+                job_start = time.perf_counter()
+                record = {"id": job["id"], "tool": job["tool"]}
+                try:
+                    record["output"], record["retries"] = await run_with_retries(job, max_retries, base_delay)
+                    record["status"] = "ok"
+                except Exception as e:
+                    record["status"] = "error"
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    failures += 1
+                record["latency_s"] = round(time.perf_counter() - job_start, 3)
+                if record["status"] == "ok":
+                    latencies.append(record["latency_s"])
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                print(f"[{record['status']}] {job['tool']} {job['id']} in {record['latency_s']}s", file=log)
+
+        await asyncio.gather(*(worker(job) for job in pending))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "succeeded": len(latencies),
+        "failed": failures,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_min": round(len(latencies) / elapsed * 60, 2) if elapsed and latencies else 0.0,
+        "p50_latency_s": percentile(latencies, 50),
+        "p95_latency_s": percentile(latencies, 95),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run essay, thesis and paraphrase jobs from a JSONL file.")
+    parser.add_argument("jobs", help="input JSONL file, one job per line")
+    parser.add_argument("-o", "--output", required=True, help="results JSONL file (appended to, used to resume)")
+    parser.add_argument("--tool", choices=sorted(TOOL_PACKAGES), help="tool for jobs that do not set one")
+    parser.add_argument("--input-field", help="read the job input from this field instead of topic/text")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3, help="reruns of a job after a failure outside the LLM calls")
+    parser.add_argument("--retry-delay", type=float, default=2.0, help="base backoff delay in seconds")
+    args = parser.parse_args(argv)
+
+    jobs = read_jobs(args.jobs, args.tool, args.input_field)
+    # Batch calls yield to interactive ones when both share a provider quota
+    with lane(BATCH):
+        summary = asyncio.run(run_batch(jobs, args.output, args.concurrency, args.retries, args.retry_delay))
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage
+
+from src_core.concurrency import llm_slot
+from src_core.metrics import note_cache_hit, note_llm_call, note_queue_wait
+from src_core.ratelimit import get_llm_guard
+from src_core.tokens import estimate_tokens, message_usage
+from src_core.config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_BYTES,
+)
+
+
+def make_cache_key(model, temperature, max_tokens, template, rendered):
+    payload = json.dumps([model, temperature, max_tokens, template, rendered], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    # On-disk LLM response store with TTL and LRU size eviction.
+    # Safe to share between threads; entries are plain text keyed by make_cache_key().
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created = row
+            if self.ttl and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl:
+            cursor = self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.evictions += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until both limits hold
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+class TTLCache:
+    # Small in-memory store for results that are cheap to keep but costly to fetch
+    # (e.g. web search). Entries expire after `ttl` seconds; the least recently
+    # used entry is dropped once `max_entries` is reached. Hits are counted in the
+    # metrics under `kind`.
+
+    def __init__(self, ttl, max_entries, kind="memory"):
+        self.ttl = ttl
+        self.kind = kind
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl and entry[0] < now):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        note_cache_hit(self.kind)
+        return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+
+def _template_text(prompt):
+    template = getattr(prompt, "template", None)
+    return template if isinstance(template, str) else prompt.pretty_repr()
+
+
+class CachedChain:
+    # Drop-in replacement for `prompt | llm` that serves repeated requests from the response cache.
+
+    def __init__(self, prompt, llm, cache=None):
+        self.prompt = prompt
+        self.llm = llm
+        self.chain = prompt | llm
+        self.cache = cache
+        self._template = _template_text(prompt)
+
+    def cache_key(self, inputs):
+        rendered = self.prompt.format_prompt(**inputs).to_string()
+        max_tokens = getattr(self.llm, "max_output_tokens", None) or getattr(self.llm, "max_tokens", None)
+        model = getattr(self.llm, "model", None) or type(self.llm).__name__
+        return make_cache_key(model, getattr(self.llm, "temperature", None), max_tokens, self._template, rendered)
+
+    def _prompt_tokens(self, inputs):
+        return estimate_tokens(self.prompt.format_prompt(**inputs).to_string())
+
+    def _call(self, inputs, config):
+        # Every provider call goes through the shared rate limiter / retry / breaker guard
+        return get_llm_guard().call(lambda: self.chain.invoke(inputs, config), self._prompt_tokens(inputs))
+
+    def invoke(self, inputs, config=None, bypass_cache=False):
+        response = self._invoke(inputs, config, bypass_cache)
+        note_llm_call(message_usage(response))
+        return response
+
+    def _invoke(self, inputs, config, bypass_cache):
+        cache = self.cache if self.cache is not None else get_response_cache()
+        if cache is None:
+            return self._call(inputs, config)
+
+        key = self.cache_key(inputs)
+        if not bypass_cache:
+            content = cache.get(key)
+            if content is not None:
+                return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+        response = self._call(inputs, config)
+        if isinstance(response.content, str) and response.content:
+            cache.set(key, response.content)
+        return response
+
+    async def ainvoke(self, inputs, config=None, bypass_cache=False):
+        response = await self._ainvoke(inputs, config, bypass_cache)
+        note_llm_call(message_usage(response))
+        return response
+
+    async def _ainvoke(self, inputs, config, bypass_cache):
+        cache = self.cache if self.cache is not None else get_response_cache()
+        key = self.cache_key(inputs) if cache is not None else None
+        # The cache is SQLite on disk, so reads and writes stay off the event loop
+        if cache is not None and not bypass_cache:
+            content = await asyncio.to_thread(cache.get, key)
+            if content is not None:
+                return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+        waited = time.perf_counter()
+        async with llm_slot():
+            note_queue_wait(time.perf_counter() - waited)
+            response = await get_llm_guard().acall(lambda: self.chain.ainvoke(inputs, config), self._prompt_tokens(inputs))
+        if cache is not None and isinstance(response.content, str) and response.content:
+            await asyncio.to_thread(cache.set, key, response.content)
+        return response
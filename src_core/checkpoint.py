@@ -0,0 +1,172 @@
+# checkpoint.py
+# Persistent LangGraph checkpoints so a run that fails part-way (e.g. in the grammar
+# stage) resumes from the last completed node instead of repeating every LLM call.
+# Runs are keyed by a job id; by default it is derived from the run's inputs, so
+# simply retrying the same request resumes it, in this session or a later one.
+# Only run_job() and stream_job() use checkpoints; create_workflow() graphs stay
+# plain and can be invoked without a thread id.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from src_core.config import CHECKPOINTS_ENABLED, CHECKPOINT_PATH, CHECKPOINT_CLAIM_TTL, CHECKPOINT_TTL
+from src_core.registry import get_or_create
+
+
+def _build_checkpointer():
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        return None
+    directory = os.path.dirname(CHECKPOINT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SqliteSaver(sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False))
+
+
+def get_checkpointer():
+    # Shared by every sync workflow; None when disabled or langgraph-checkpoint-sqlite is missing
+    if not CHECKPOINTS_ENABLED:
+        return None
+    return get_or_create(("checkpointer", CHECKPOINT_PATH), _build_checkpointer)
+
+
+def resumable(workflow):
+    # The compiled workflow with the shared checkpointer attached, or as is when
+    # checkpoints are off
+    checkpointer = get_checkpointer()
+    if checkpointer is None or workflow.checkpointer is not None:
+        return workflow
+    return get_or_create(("resumable", workflow), lambda: workflow.copy({"checkpointer": checkpointer}))
+
+
+class JobClaims:
+    # Which job ids are running and which stopped part-way, kept next to the
+    # checkpoints so other processes see them too. A run holds its claim until it
+    # finishes (the row is deleted) or fails (marked "failed" for a later resume).
+    # A "running" claim older than stale_after is taken to be from a dead process.
+    # Claims untouched for keep_for, and checkpoint threads without a claim, are
+    # pruned when the claims are opened and then at most once per stale_after.
+
+    def __init__(self, path, stale_after=CHECKPOINT_CLAIM_TTL, keep_for=CHECKPOINT_TTL):
+        self.stale_after = stale_after
+        self.keep_for = keep_for
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_claims (thread_id TEXT PRIMARY KEY, status TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self.prune()
+
+    def prune(self, now=None):
+        # Drop expired claims, then every checkpoint thread with no claim left: runs
+        # never retried, one-off runs and leftovers of a crash. Rows are deleted here,
+        # as SqliteSaver.delete_thread would, so that no run can claim a thread
+        # between the check and the delete. Returns the number of threads removed.
+        now = time.time() if now is None else now
+        with self._lock:
+            self._pruned = now
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM job_claims WHERE updated < ?", (now - self.keep_for,))
+                tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                if "checkpoints" not in tables:
+                    return 0
+                orphans = "thread_id NOT IN (SELECT thread_id FROM job_claims)"
+                removed = self._conn.execute(f"SELECT COUNT(DISTINCT thread_id) FROM checkpoints WHERE {orphans}").fetchone()[0]
+                for table in ("checkpoints", "writes"):
+                    if table in tables:
+                        self._conn.execute(f"DELETE FROM {table} WHERE {orphans}")
+                return removed
+            finally:
+                self._conn.execute("COMMIT")
+
+    def claim(self, thread_id):
+        # "new", "resume" (an earlier run stopped part-way) or "busy" (running elsewhere)
+        now = time.time()
+        if now - self._pruned >= self.stale_after:
+            self.prune(now)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT status, updated FROM job_claims WHERE thread_id = ?", (thread_id,)).fetchone()
+                if row and row[0] == "running" and row[1] >= now - self.stale_after:
+                    return "busy"
+                self._conn.execute("INSERT OR REPLACE INTO job_claims VALUES (?, 'running', ?)", (thread_id, now))
+            finally:
+                self._conn.execute("COMMIT")
+        return "resume" if row else "new"
+
+    def release(self, thread_id, failed=False):
+        with self._lock:
+            if failed:
+                self._conn.execute("UPDATE job_claims SET status = 'failed', updated = ? WHERE thread_id = ?", (time.time(), thread_id))
+            else:
+                self._conn.execute("DELETE FROM job_claims WHERE thread_id = ?", (thread_id,))
+
+
+def get_job_claims():
+    return get_or_create(("job_claims", CHECKPOINT_PATH), lambda: JobClaims(CHECKPOINT_PATH))
+
+
+def make_job_id(namespace, inputs):
+    payload = json.dumps(
+        {key: value for key, value in inputs.items() if key != "bypass_cache"},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+
+def job_config(namespace, inputs, job_id=None, config=None):
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "thread_id": job_id or make_job_id(namespace, inputs)}
+    return config
+
+
+def begin_job(workflow, inputs, namespace, job_id=None, config=None):
+    # (graph input, config) for a checkpointed workflow: None resumes a run under
+    # this job id that failed part-way; anything else starts afresh on a cleared
+    # thread. A job id already running elsewhere (a double submit, or identical
+    # chunks of one document) runs separately under a one-off id, which is never
+    # resumed.
+    config = job_config(namespace, inputs, job_id, config)
+    if workflow.checkpointer is None:
+        return inputs, config
+    claims = get_job_claims()
+    status = claims.claim(config["configurable"]["thread_id"])
+    if status == "busy":
+        config = job_config(namespace, inputs, f"{config['configurable']['thread_id']}:{uuid.uuid4().hex[:12]}", config)
+        config["configurable"]["one_off"] = True
+        status = claims.claim(config["configurable"]["thread_id"])
+    if status == "resume" and not inputs.get("bypass_cache") and workflow.get_state(config).next:
+        return None, config
+    workflow.checkpointer.delete_thread(config["configurable"]["thread_id"])
+    return inputs, config
+
+
+def end_job(workflow, config, failed=False):
+    # A failed run keeps its checkpoints for a later resume; a finished one drops
+    # them, since its completed stages live on in the response cache
+    if workflow.checkpointer is None:
+        return
+    thread_id = config["configurable"]["thread_id"]
+    failed = failed and not config["configurable"].get("one_off")
+    if not failed:
+        workflow.checkpointer.delete_thread(thread_id)
+    get_job_claims().release(thread_id, failed)
+
+
+def run_job(workflow, inputs, namespace, job_id=None, config=None):
+    workflow = resumable(workflow)
+    start, config = begin_job(workflow, inputs, namespace, job_id, config)
+    try:
+        result = workflow.invoke(start, config)
+    except BaseException:
+        end_job(workflow, config, failed=True)
+        raise
+    end_job(workflow, config)
+    return result
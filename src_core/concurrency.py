@@ -0,0 +1,33 @@
+# concurrency.py
+import asyncio
+import threading
+import weakref
+
+from src_core.config import LLM_MAX_CONCURRENCY
+
+_semaphores = weakref.WeakKeyDictionary()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def llm_slot():
+    # Per-loop semaphore capping in-flight LLM calls across every async workflow
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+
+def get_event_loop():
+    # One background loop per process, shared by all sync callers of run_async()
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ai-tools-event-loop", daemon=True).start()
+        return _loop
+
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
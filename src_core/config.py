@@ -0,0 +1,87 @@
+# config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+CACHE_DIR = os.path.expanduser(os.getenv("AI_TOOLS_CACHE_DIR", os.path.join("~", ".cache", "ai_research_tools")))
+
+# Response cache
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_PATH = os.path.expanduser(os.getenv("RESPONSE_CACHE_PATH", os.path.join(CACHE_DIR, "responses.sqlite3")))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+# Workflow checkpoints (resume failed runs)
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "1") != "0"
+CHECKPOINT_PATH = os.path.expanduser(os.getenv("CHECKPOINT_PATH", os.path.join(CACHE_DIR, "checkpoints.sqlite3")))
+# A run still marked as running after this many seconds is taken to be abandoned
+CHECKPOINT_CLAIM_TTL = int(os.getenv("CHECKPOINT_CLAIM_TTL", 3600))
+# A failed run can be resumed for this many seconds; after that its checkpoints are deleted
+CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", 7 * 24 * 3600))
+
+# Related-article search (thesis app)
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 256))
+
+# PDF text extraction
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 500))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", 50 * 1024 * 1024))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", 16))
+
+# Async workflows
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+
+# Provider quota guard (0 disables a limit); see src_core/ratelimit.py
+LLM_RPM = int(os.getenv("LLM_RPM", 0))
+LLM_TPM = int(os.getenv("LLM_TPM", 0))
+LLM_BURST_FRACTION = float(os.getenv("LLM_BURST_FRACTION", 0.1))
+LLM_BATCH_RESERVE = float(os.getenv("LLM_BATCH_RESERVE", 0.2))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 1.0))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 30.0))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30.0))
+
+# Near-duplicate topic reuse for essay and thesis runs (src_core/semantic_cache.py)
+# Opt-in: a reused result is only as right as the topic match
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "0") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.8))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 10000))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", RESPONSE_CACHE_TTL))
+
+# Offline grammar pre-pass (src_core/grammar.py): the LLM grammar stage is skipped
+# when no sentence is flagged and runs on the whole text only when more than this
+# share of sentences is flagged
+GRAMMAR_PREPASS = os.getenv("GRAMMAR_PREPASS", "1") != "0"
+GRAMMAR_FULL_PASS_DENSITY = float(os.getenv("GRAMMAR_FULL_PASS_DENSITY", 0.2))
+
+# HTTP service (src_core/service.py)
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", 4))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", 64))
+SERVICE_JOB_TTL = int(os.getenv("SERVICE_JOB_TTL", 3600))
+SERVICE_RETRY_AFTER = int(os.getenv("SERVICE_RETRY_AFTER", 5))
+
+# Per-stage metrics (Prometheus text format); see src_core/metrics.py
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_FILE = os.path.expanduser(os.getenv("METRICS_FILE", ""))
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+# Interface the /metrics endpoint listens on; 0.0.0.0 exposes it to the network
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# LLM provider: "gemini" for the real API, "fake" for the offline stand-in
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+FAKE_LLM_MODE = os.getenv("FAKE_LLM_MODE", "echo")
+FAKE_LLM_RESPONSE = os.getenv("FAKE_LLM_RESPONSE", "This is a canned response from the offline LLM stand-in.")
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "fixed")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 0))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", 0))
+FAKE_LLM_TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", 0))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", 0))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0))
+FAKE_LLM_QUOTA_RPM = int(os.getenv("FAKE_LLM_QUOTA_RPM", 0))
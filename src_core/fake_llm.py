@@ -0,0 +1,129 @@
+# fake_llm.py
+# Deterministic offline stand-in for ChatGoogleGenerativeAI, used for benchmarks
+# and load tests. Select it with LLM_PROVIDER=fake.
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src_core.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+TOKEN_PIECE = re.compile(r"\S+\s*|\s+")
+
+
+class FakeRateLimitError(Exception):
+    pass
+
+
+class FakeChatModel(BaseChatModel):
+    model: str = "fake-llm"
+    temperature: float = 0.0
+    max_output_tokens: Optional[int] = None
+    # "echo" repeats the last message, "canned" always returns `response`
+    mode: str = "echo"
+    response: str = "This is a canned response from the offline LLM stand-in."
+    # Time to first token: "fixed", "uniform" (latency_ms +/- jitter_ms) or "lognormal"
+    latency: str = "fixed"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Output generation speed; 0 means the whole response arrives at once
+    tokens_per_second: float = 0.0
+    seed: int = 0
+    # Throttling simulation: fail this fraction of calls at random, and/or fail
+    # calls beyond `quota_rpm` in any trailing 60 s window, like a provider quota
+    error_rate: float = 0.0
+    quota_rpm: int = 0
+    rng: random.Random = None
+    calls: deque = None
+    lock: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rng = random.Random(self.seed)
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def _check_quota(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                raise FakeRateLimitError("429 Resource has been exhausted (e.g. check quota).")
+            if self.quota_rpm:
+                while self.calls and now - self.calls[0] > 60:
+                    self.calls.popleft()
+                if len(self.calls) >= self.quota_rpm:
+                    raise FakeRateLimitError("429 Quota exceeded for requests per minute.")
+                self.calls.append(now)
+
+    def _respond(self, messages):
+        self._check_quota()
+        text = self.response if self.mode == "canned" else messages[-1].content
+        if self.max_output_tokens:
+            text = text[: self.max_output_tokens * CHARS_PER_TOKEN]
+        return text
+
+    def _first_token_delay(self):
+        mean = self.latency_ms / 1000
+        jitter = self.jitter_ms / 1000
+        if self.latency == "uniform":
+            return self.rng.uniform(max(0.0, mean - jitter), mean + jitter)
+        if self.latency == "lognormal" and mean > 0:
+            return mean * self.rng.lognormvariate(0, jitter / mean)
+        return mean
+
+    def _token_delay(self, text):
+        return estimate_tokens(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _message(self, messages, text):
+        input_tokens = sum(estimate_tokens(m.content) for m in messages if isinstance(m.content, str))
+        output_tokens = estimate_tokens(text)
+        return AIMessage(
+            content=text,
+            response_metadata={"model_name": self.model},
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self._first_token_delay() + self._token_delay(text))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, text))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay() + self._token_delay(text))
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self._first_token_delay())
+        for piece in TOKEN_PIECE.findall(text):
+            time.sleep(self._token_delay(piece))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay())
+        for piece in TOKEN_PIECE.findall(text):
+            await asyncio.sleep(self._token_delay(piece))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
@@ -0,0 +1,265 @@
+# grammar.py
+# Offline pre-pass for the grammar stages. Mechanical errors (doubled words, stray
+# spaces, common misspellings, ...) are fixed in-process; rules that need judgement
+# only flag their sentence. A stage then skips the LLM when nothing is flagged,
+# sends just the flagged sentences when there are few, and falls back to the usual
+# full-text pass when errors are dense, so the cost follows the error count.
+# Code, URLs and identifiers are never rewritten, and a fix that could be wrong
+# ("i" as a variable, "file.Py") is only flagged for the LLM to decide.
+import asyncio
+import json
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+from langchain_core.prompts import PromptTemplate
+
+from src_core.config import GRAMMAR_PREPASS, GRAMMAR_FULL_PASS_DENSITY
+
+MISSPELLINGS = {
+    "accomodate": "accommodate", "acheive": "achieve", "acheived": "achieved", "adress": "address",
+    "alot": "a lot", "arguement": "argument", "arguements": "arguments", "begining": "beginning",
+    "beleive": "believe", "beleif": "belief", "calender": "calendar", "concious": "conscious",
+    "definately": "definitely", "embarass": "embarrass", "enviroment": "environment",
+    "enviromental": "environmental", "existance": "existence", "foriegn": "foreign",
+    "goverment": "government", "grammer": "grammar", "harrass": "harass", "independant": "independent",
+    "knowlege": "knowledge", "millenium": "millennium", "neccessary": "necessary", "noticable": "noticeable",
+    "occassion": "occasion", "occured": "occurred", "occurence": "occurrence", "occuring": "occurring",
+    "persue": "pursue", "posession": "possession", "prefered": "preferred", "priviledge": "privilege",
+    "publically": "publicly", "reccomend": "recommend", "recieve": "receive", "recieved": "received",
+    "refered": "referred", "relevent": "relevant", "seperate": "separate", "seperately": "separately",
+    "sucess": "success", "succesful": "successful", "tendancy": "tendency", "teh": "the",
+    "thier": "their", "threshhold": "threshold", "tommorow": "tomorrow", "truely": "truly",
+    "untill": "until", "wich": "which", "wierd": "weird",
+}
+MISSPELLED = re.compile(r"\b(" + "|".join(MISSPELLINGS) + r")\b", re.IGNORECASE)
+
+# Legitimate doubled words ("that that", "had had") and capitalized pairs, which
+# are usually names ("Bora Bora", "Walla Walla"), are left alone
+DOUBLED_WORD = re.compile(r"\b(\w+)[ \t]+\1\b", re.IGNORECASE)
+ALLOWED_DOUBLES = {"had", "that"}
+
+# Never fixed: code, URLs and e-mail addresses (also hidden from the flags), then
+# dotted, slashed or snake_case identifiers such as file.Py or a/b
+CODE_OR_URL = re.compile(
+    r"```.*?```|`[^`\n]+`|\b(?:[a-z][a-z0-9+.-]*://|www\.)\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+    re.DOTALL | re.IGNORECASE,
+)
+PROTECTED = re.compile(CODE_OR_URL.pattern + r"|\w+(?:[./\\]\w+)+|\w*_\w*", re.DOTALL | re.IGNORECASE)
+
+# (pattern, replacement) applied to the whole text, in order
+FIXES = [
+    (re.compile(r"(?<=\S)[ \t]{2,}(?=\S)"), " "),
+    (re.compile(r"(?<=\w)[ \t]+([,;])"), r"\1"),
+    (re.compile(r"(?<=\w)[ \t]+([:!?.])(?=\s|$)"), r"\1"),
+    (re.compile(r"(?<=[a-z])([,;])(?=[A-Za-z])"), r"\1 "),
+    (re.compile(r",{2,}"), ","),
+    (re.compile(r"(?<!\.)\.\.(?!\.)"), "."),
+    (re.compile(r"([!?])\1+"), r"\1"),
+    (re.compile(r"\b(could|should|would|must|might)[ \t]+of\b", re.IGNORECASE), r"\1 have"),
+]
+
+# (pattern, reason) that flag a sentence for the LLM
+FLAGS = [
+    (re.compile(r"\b[aA] (?!uni|use|usu|uti|uro|eu|one|once|ub)[aeiou]\w*"), "'a' before a vowel sound"),
+    (re.compile(r"\b[aA]n (?!hour|hono|hone|heir|herb)[b-df-hj-np-tv-z]\w*"), "'an' before a consonant sound"),
+    (re.compile(r"\b(?:he|she|it) don't\b", re.IGNORECASE), "subject-verb agreement"),
+    (re.compile(r"\b(?:they|we|you) (?:was|wasn't|doesn't)\b", re.IGNORECASE), "subject-verb agreement"),
+    (re.compile(r"\bthere (?:is|was) (?:many|several|numerous|few|two|three)\b", re.IGNORECASE), "subject-verb agreement"),
+    (re.compile(r"\bit's (?:own|self)\b", re.IGNORECASE), "it's/its confusion"),
+    (re.compile(r"\bits (?:a|an|the|not|been|important|clear|likely|possible|necessary)\b", re.IGNORECASE), "it's/its confusion"),
+    (re.compile(r"\btheir (?:is|are|was|were)\b", re.IGNORECASE), "their/there confusion"),
+    (re.compile(r"\b(?:more|less|better|worse|rather|greater|fewer|larger|smaller|higher|lower) then\b", re.IGNORECASE), "then/than confusion"),
+    (re.compile(r"(?<![\w.(])i(?=(?:'m|'ve|'ll|'d)?[ \t,])"), "lowercase 'i' (should it be 'I'?)"),
+    (re.compile(r"(?<=[a-z]{2})\.(?=[A-Z](?:[a-z]|\b))"), "missing space after a full stop"),
+]
+LONG_SENTENCE_WORDS = 50
+MIN_COUNTED_WORDS = 3
+
+# Sentence boundaries: closing punctuation followed by whitespace, unless it ends
+# an abbreviation or an initial; line breaks always end a sentence
+BOUNDARY = re.compile(r"([\w.]*)[.!?]+[\"'’”)\]]*(?=\s)")
+ABBREVIATIONS = {"e.g", "i.e", "etc", "vs", "cf", "al", "mr", "mrs", "ms", "dr", "prof", "fig", "no", "st", "approx"}
+# Markdown prefixes kept out of the sentence text: headings, quotes, list markers
+LINE_MARKER = re.compile(r"(?:#{1,6}[ \t]+|>[ \t]*|[-*+][ \t]+|\d+[.)][ \t]+)*")
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+SENTENCES_PROMPT = PromptTemplate(
+    input_variables=["sentences", "notes"],
+    template="""
+You are a grammar expert. Each entry of the JSON object below is one sentence from a longer text, keyed by its number. Correct grammar, spelling, and punctuation in each sentence without changing its meaning, tone, or formatting.
+The notes list what looks wrong in each sentence.
+Return only a JSON object with exactly the same keys, each mapped to its corrected sentence. No commentary and no code fences.
+
+NOTES:
+{notes}
+
+SENTENCES (JSON):
+{sentences}
+
+CORRECTED SENTENCES (JSON):
+"""
+)
+
+# Keeps the sentence pass's JSON out of token streams meant for the final text
+NO_STREAM = {"tags": ["nostream"]}
+
+
+class GrammarReport(NamedTuple):
+    text: str
+    fixes: int
+    sentences: List[Tuple[int, int]]
+    flagged: Dict[int, List[str]]
+    # "skip", "sentences" or "full"
+    action: str
+
+
+def _keep_case(match):
+    word = match.group()
+    fixed = MISSPELLINGS[word.lower()]
+    return fixed[0].upper() + fixed[1:] if word[0].isupper() else fixed
+
+
+def _undouble(match):
+    if match.group(1).lower() in ALLOWED_DOUBLES or match.group().split()[-1][0].isupper():
+        return match.group()
+    return match.group(1)
+
+
+def _sub_outside(pattern, replacement, text):
+    # pattern.subn() that leaves matches touching a PROTECTED span as they are
+    spans = [match.span() for match in PROTECTED.finditer(text)]
+    count = 0
+
+    def substitute(match):
+        nonlocal count
+        if any(start < match.end() and match.start() < end for start, end in spans):
+            return match.group()
+        fixed = replacement(match) if callable(replacement) else match.expand(replacement)
+        count += fixed != match.group()
+        return fixed
+
+    return pattern.sub(substitute, text), count
+
+
+def fix_text(text):
+    # (fixed text, number of fixes) for the mechanical errors
+    count = 0
+    for pattern, replacement in [(MISSPELLED, _keep_case), (DOUBLED_WORD, _undouble)] + FIXES:
+        text, n = _sub_outside(pattern, replacement, text)
+        count += n
+    return text, count
+
+
+def split_sentences(text):
+    # (start, end) offsets of each sentence, markdown line markers excluded
+    spans = []
+    for line in re.finditer(r"[^\n]+", text):
+        body = line.group()
+        start = LINE_MARKER.match(body).end()
+        for boundary in BOUNDARY.finditer(body, start):
+            word = boundary.group(1).lower().rstrip(".")
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+            if body[start:boundary.end()].strip():
+                spans.append((line.start() + start, line.start() + boundary.end()))
+            start = boundary.end()
+            while start < len(body) and body[start].isspace():
+                start += 1
+        if body[start:].strip():
+            spans.append((line.start() + start, line.start() + len(body.rstrip())))
+    return spans
+
+
+def _sentence_problems(sentence, plain, ends_paragraph):
+    # plain: not a heading or list item, whose fragments may start lowercase
+    sentence = CODE_OR_URL.sub(lambda match: " " * len(match.group()), sentence)
+    problems = [reason for pattern, reason in FLAGS if pattern.search(sentence)]
+    first = re.search(r"[A-Za-z]", sentence)
+    if first and first.group().islower() and first.start() == 0 and plain:
+        problems.append("sentence starts with a lowercase letter")
+    if ends_paragraph and plain and len(sentence.split()) >= 8 and sentence[-1] not in ".!?:;\"'”)*_":
+        problems.append("missing final punctuation")
+    if len(sentence.split()) > LONG_SENTENCE_WORDS:
+        problems.append("very long sentence")
+    if sentence.count("(") != sentence.count(")") or sentence.count('"') % 2:
+        problems.append("unbalanced brackets or quotes")
+    return list(dict.fromkeys(problems))
+
+
+def check_text(text, full_pass_density=GRAMMAR_FULL_PASS_DENSITY):
+    fixed, fixes = fix_text(text)
+    sentences = split_sentences(fixed)
+    flagged = {}
+    for i, (start, end) in enumerate(sentences):
+        line_start = fixed.rfind("\n", 0, start) + 1
+        line_end = fixed.find("\n", end)
+        prefix = fixed[line_start:start]
+        plain = not (prefix.strip() and LINE_MARKER.fullmatch(prefix))
+        ends_paragraph = not fixed[end:line_end if line_end >= 0 else len(fixed)].strip()
+        problems = _sentence_problems(fixed[start:end], plain, ends_paragraph)
+        if problems:
+            flagged[i] = problems
+    counted = sum(1 for start, end in sentences if len(fixed[start:end].split()) >= MIN_COUNTED_WORDS)
+    if not flagged:
+        action = "skip"
+    elif len(flagged) / max(counted, 1) > full_pass_density:
+        action = "full"
+    else:
+        action = "sentences"
+    return GrammarReport(fixed, fixes, sentences, flagged, action)
+
+
+def sentence_inputs(report):
+    sentences = {str(i): report.text[report.sentences[i][0]:report.sentences[i][1]] for i in report.flagged}
+    notes = "\n".join(f"{i}: {', '.join(problems)}" for i, problems in report.flagged.items())
+    return {"sentences": json.dumps(sentences, ensure_ascii=False), "notes": notes}
+
+
+def apply_corrections(report, reply):
+    # Splices corrected sentences back in; anything missing or implausible is kept as is
+    match = JSON_OBJECT.search(reply or "")
+    try:
+        data = json.loads(match.group()) if match else {}
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    text = report.text
+    for i in sorted(report.flagged, reverse=True):
+        start, end = report.sentences[i]
+        corrected = data.get(str(i))
+        if isinstance(corrected, str) and corrected.strip() and len(corrected) <= 2 * (end - start) + 20:
+            text = text[:start] + corrected.strip() + text[end:]
+    return text
+
+
+def proofread(text, full_pass, sentence_chain, bypass_cache=False):
+    # (corrected text, LLM response or None). full_pass(text) runs the stage's own
+    # grammar prompt; sentence_chain handles SENTENCES_PROMPT.
+    if not GRAMMAR_PREPASS:
+        response = full_pass(text)
+        return response.content, response
+    report = check_text(text)
+    if report.action == "skip":
+        return report.text, None
+    if report.action == "full":
+        response = full_pass(report.text)
+        return response.content, response
+    response = sentence_chain.invoke(sentence_inputs(report), NO_STREAM, bypass_cache=bypass_cache)
+    return apply_corrections(report, response.content), response
+
+
+async def aproofread(text, full_pass, sentence_chain, bypass_cache=False):
+    # Async counterpart of proofread(); full_pass is a coroutine function. The
+    # rule checks are CPU-bound on long texts, so they run in a worker thread.
+    if not GRAMMAR_PREPASS:
+        response = await full_pass(text)
+        return response.content, response
+    report = await asyncio.to_thread(check_text, text)
+    if report.action == "skip":
+        return report.text, None
+    if report.action == "full":
+        response = await full_pass(report.text)
+        return response.content, response
+    response = await sentence_chain.ainvoke(sentence_inputs(report), NO_STREAM, bypass_cache=bypass_cache)
+    return apply_corrections(report, response.content), response
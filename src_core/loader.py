@@ -0,0 +1,42 @@
+# loader.py
+import importlib
+import sys
+import threading
+from types import SimpleNamespace
+
+TOOL_PACKAGES = {
+    "essay": "src_essay_writer",
+    "thesis": "src_thesis_writer",
+    "paraphrase": "src_paraphraser",
+}
+
+# Modules imported eagerly by load_tool(); the Streamlit apps are left out so
+# headless callers (batch, benchmarks, the API) never import streamlit.
+_TOOL_MODULES = ("LLM", "tools", "nodes_workflow")
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def load_tool(tool):
+    # Returns the tool's modules as a namespace (tool.LLM, tool.tools,
+    # tool.nodes_workflow, plus any helper module such as tool.layout).
+    # They are ordinary package imports, so every tool shares the one set of
+    # LLM clients, caches and compiled graphs held in src_core.
+    with _lock:
+        if tool in _loaded:
+            return _loaded[tool]
+        if tool not in TOOL_PACKAGES:
+            raise ValueError(f"Unknown tool '{tool}'. Expected one of: {', '.join(TOOL_PACKAGES)}")
+
+        package = TOOL_PACKAGES[tool]
+        for name in _TOOL_MODULES:
+            importlib.import_module(f"{package}.{name}")
+        prefix = f"{package}."
+        modules = {
+            name[len(prefix):]: module
+            for name, module in list(sys.modules.items())
+            if name.startswith(prefix) and "." not in name[len(prefix):]
+        }
+        _loaded[tool] = SimpleNamespace(**modules)
+        return _loaded[tool]
@@ -0,0 +1,283 @@
+# metrics.py
+# Per-stage instrumentation. @traced wraps node functions and tool helpers and records
+# wall time, time spent queued for an LLM slot / rate limit, input/output tokens,
+# cache hits and errors. Totals are exported in Prometheus text format (HTTP endpoint
+# and/or file); capture() collects the spans of one run for the apps' debug panels.
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src_core.config import METRICS_ENABLED, METRICS_FILE, METRICS_HOST, METRICS_PORT
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_span = contextvars.ContextVar("metrics_span", default=None)
+_capture = contextvars.ContextVar("metrics_capture", default=None)
+
+
+@dataclass
+class Span:
+    tool: str
+    stage: str
+    wall_s: float = 0.0
+    queue_s: float = 0.0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_hits: int = 0
+    # cache_hits split by cache: "response", "semantic", "search", "pdf_text"
+    cache_kinds: dict = field(default_factory=dict)
+    error: str = ""
+
+
+class _Stat:
+    __slots__ = ("count", "errors", "wall_sum", "queue_sum", "llm_calls", "input_tokens", "output_tokens", "cache_hits", "buckets")
+
+    def __init__(self):
+        self.count = self.errors = self.llm_calls = self.input_tokens = self.output_tokens = 0
+        self.wall_sum = self.queue_sum = 0.0
+        self.cache_hits = {}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class Metrics:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        with self._lock:
+            stat = self._stats.setdefault((span.tool, span.stage), _Stat())
+            stat.count += 1
+            stat.errors += bool(span.error)
+            stat.wall_sum += span.wall_s
+            stat.queue_sum += span.queue_s
+            stat.llm_calls += span.llm_calls
+            stat.input_tokens += span.input_tokens
+            stat.output_tokens += span.output_tokens
+            for kind, hits in span.cache_kinds.items():
+                stat.cache_hits[kind] = stat.cache_hits.get(kind, 0) + hits
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if span.wall_s <= bound:
+                    stat.buckets[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render_prometheus(self):
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines = [
+                "# HELP ai_tools_stage_seconds Wall time per workflow stage or tool call.",
+                "# TYPE ai_tools_stage_seconds histogram",
+            ]
+            for (tool, stage), stat in items:
+                labels = f'tool="{tool}",stage="{stage}"'
+                for bound, count in zip(LATENCY_BUCKETS, stat.buckets):
+                    lines.append(f'ai_tools_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'ai_tools_stage_seconds_bucket{{{labels},le="+Inf"}} {stat.count}')
+                lines.append(f"ai_tools_stage_seconds_sum{{{labels}}} {stat.wall_sum:.6f}")
+                lines.append(f"ai_tools_stage_seconds_count{{{labels}}} {stat.count}")
+            counters = (
+                ("ai_tools_stage_errors_total", "Failed stage or tool calls.", "errors"),
+                ("ai_tools_stage_queue_seconds_total", "Time spent waiting for an LLM slot or the rate limiter.", "queue_sum"),
+                ("ai_tools_llm_calls_total", "LLM calls made (cache hits included).", "llm_calls"),
+            )
+            for name, help_text, attr in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (tool, stage), stat in items:
+                    lines.append(f'{name}{{tool="{tool}",stage="{stage}"}} {getattr(stat, attr):g}')
+            lines += [
+                "# HELP ai_tools_cache_hits_total Calls served from a cache, by kind: response (LLM response cache), "
+                "semantic (similar earlier topic), search (article search) or pdf_text (extracted PDF text).",
+                "# TYPE ai_tools_cache_hits_total counter",
+            ]
+            for (tool, stage), stat in items:
+                for kind, hits in sorted(stat.cache_hits.items()):
+                    lines.append(f'ai_tools_cache_hits_total{{tool="{tool}",stage="{stage}",kind="{kind}"}} {hits}')
+            lines += ["# HELP ai_tools_tokens_total LLM tokens by direction.", "# TYPE ai_tools_tokens_total counter"]
+            for (tool, stage), stat in items:
+                lines.append(f'ai_tools_tokens_total{{tool="{tool}",stage="{stage}",direction="input"}} {stat.input_tokens}')
+                lines.append(f'ai_tools_tokens_total{{tool="{tool}",stage="{stage}",direction="output"}} {stat.output_tokens}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path=METRICS_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+_metrics = Metrics()
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def get_metrics():
+    _start_exporters()
+    return _metrics
+
+
+def _start_exporters():
+    # METRICS_PORT serves /metrics over HTTP; METRICS_FILE is rewritten every few seconds and at exit
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if METRICS_PORT:
+            try:
+                serve_metrics(METRICS_HOST, METRICS_PORT)
+            except OSError:
+                pass  # another process (e.g. a second Streamlit worker) already serves the port
+        if METRICS_FILE:
+            def flush_periodically():
+                while True:
+                    time.sleep(5)
+                    _metrics.write_file(METRICS_FILE)
+
+            threading.Thread(target=flush_periodically, name="metrics-file", daemon=True).start()
+            atexit.register(_metrics.write_file, METRICS_FILE)
+
+
+def serve_metrics(host, port):
+    # Serves /metrics from a daemon thread; returns the server (port 0 picks a free port)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = _metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def note_llm_call(usage):
+    # Called by CachedChain for every LLM call; usage comes from tokens.message_usage()
+    span = _span.get()
+    if span is not None:
+        span.llm_calls += 1
+        span.input_tokens += usage["input_tokens"]
+        span.output_tokens += usage["output_tokens"]
+        if usage["cached"]:
+            _add_cache_hit(span, "response")
+
+
+def note_cache_hit(kind):
+    # A cache other than the response cache (search results, PDF text, a similar
+    # earlier topic) served the traced call
+    span = _span.get()
+    if span is not None:
+        _add_cache_hit(span, kind)
+
+
+def _add_cache_hit(span, kind):
+    span.cache_hits += 1
+    span.cache_kinds[kind] = span.cache_kinds.get(kind, 0) + 1
+
+
+def note_queue_wait(seconds):
+    # Time blocked on the rate limiter or the async LLM slot semaphore
+    span = _span.get()
+    if span is not None:
+        span.queue_s += seconds
+
+
+@contextlib.contextmanager
+def _open_span(tool, stage):
+    span = Span(tool, stage)
+    token = _span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.wall_s = time.perf_counter() - start
+        _span.reset(token)
+        get_metrics().record(span)
+        collected = _capture.get()
+        if collected is not None:
+            collected.append(span)
+
+
+def traced(tool, stage=None):
+    def decorate(fn):
+        name = stage or fn.__name__
+        if not METRICS_ENABLED:
+            return fn
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _open_span(tool, name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _open_span(tool, name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@contextlib.contextmanager
+def capture():
+    # Collects the spans finished inside the block (including worker threads it starts)
+    spans = []
+    token = _capture.set(spans)
+    try:
+        yield spans
+    finally:
+        _capture.reset(token)
+
+
+def span_rows(spans):
+    # Flat dicts for st.dataframe / JSON, in completion order
+    return [
+        {
+            "tool": s.tool,
+            "stage": s.stage,
+            "wall_ms": round(s.wall_s * 1000, 1),
+            "queue_ms": round(s.queue_s * 1000, 1),
+            "llm_calls": s.llm_calls,
+            "input_tokens": s.input_tokens,
+            "output_tokens": s.output_tokens,
+            "cache_hits": s.cache_hits,
+            "error": s.error,
+        }
+        for s in spans
+    ]
+
+
+def span_totals(rows):
+    keys = ("wall_ms", "queue_ms", "llm_calls", "input_tokens", "output_tokens", "cache_hits")
+    totals = {key: round(sum(row[key] for row in rows), 1) for key in keys}
+    totals["errors"] = sum(bool(row["error"]) for row in rows)
+    return totals
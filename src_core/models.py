@@ -0,0 +1,48 @@
+# models.py
+from src_core.registry import get_or_create
+from src_core.config import (
+    LLM_PROVIDER,
+    FAKE_LLM_MODE,
+    FAKE_LLM_RESPONSE,
+    FAKE_LLM_LATENCY,
+    FAKE_LLM_LATENCY_MS,
+    FAKE_LLM_JITTER_MS,
+    FAKE_LLM_TOKENS_PER_SEC,
+    FAKE_LLM_SEED,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_QUOTA_RPM,
+)
+
+
+def build_chat_model(model, google_api_key, temperature, max_tokens=None, provider=LLM_PROVIDER):
+    if provider == "fake":
+        from src_core.fake_llm import FakeChatModel
+
+        return FakeChatModel(
+            model=f"fake-{model}",
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            mode=FAKE_LLM_MODE,
+            response=FAKE_LLM_RESPONSE,
+            latency=FAKE_LLM_LATENCY,
+            latency_ms=FAKE_LLM_LATENCY_MS,
+            jitter_ms=FAKE_LLM_JITTER_MS,
+            tokens_per_second=FAKE_LLM_TOKENS_PER_SEC,
+            seed=FAKE_LLM_SEED,
+            error_rate=FAKE_LLM_ERROR_RATE,
+            quota_rpm=FAKE_LLM_QUOTA_RPM,
+        )
+    if provider != "gemini":
+        raise ValueError(f"Unknown LLM_PROVIDER '{provider}'. Expected 'gemini' or 'fake'.")
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+    # Retries and backoff are handled by src_core.ratelimit, not inside the client
+    return ChatGoogleGenerativeAI(model=model, google_api_key=google_api_key, temperature=temperature, max_retries=1, **kwargs)
+
+
+def get_chat_model(model, google_api_key, temperature, max_tokens=None):
+    # One shared client per distinct configuration, built on first use
+    key = ("chat_model", LLM_PROVIDER, model, google_api_key, temperature, max_tokens)
+    return get_or_create(key, lambda: build_chat_model(model, google_api_key, temperature, max_tokens))
@@ -0,0 +1,96 @@
+# pdf_text.py
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src_core.cache import TTLCache
+from src_core.config import (
+    PDF_MAX_PAGES,
+    PDF_MAX_BYTES,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_WORKERS,
+    PDF_CACHE_MAX_ENTRIES,
+)
+from src_core.registry import get_or_create
+
+# Extracted text keyed by (sha256 of the file, page limit); entries never expire
+_text_cache = TTLCache(ttl=0, max_entries=PDF_CACHE_MAX_ENTRIES, kind="pdf_text")
+
+
+class PDFTooLargeError(ValueError):
+    pass
+
+
+def read_pdf_bytes(source, max_bytes=PDF_MAX_BYTES):
+    # Accepts a path, raw bytes or a file-like object (including Streamlit uploads)
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    elif isinstance(source, (str, os.PathLike)):
+        if os.path.getsize(source) > max_bytes:
+            raise PDFTooLargeError(f"PDF is larger than the {max_bytes / (1024 * 1024):.3g} MB limit.")
+        with open(source, "rb") as f:
+            data = f.read()
+    elif hasattr(source, "getvalue"):
+        data = source.getvalue()
+    else:
+        source.seek(0)
+        data = source.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise PDFTooLargeError(f"PDF is larger than the {max_bytes / (1024 * 1024):.3g} MB limit.")
+    return data
+
+
+def _reader(data):
+    import PyPDF2
+
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_range(data, start, stop):
+    # Runs in a worker process: parse the document once, extract a slice of pages
+    pages = _reader(data).pages
+    return [pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool():
+    return get_or_create(("pdf_pool", PDF_WORKERS), lambda: ProcessPoolExecutor(max_workers=PDF_WORKERS))
+
+
+def iter_pdf_pages(source, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES):
+    # Yields the text of each non-empty page in order, extracting every page once.
+    # Large documents are split into page ranges and extracted in worker processes.
+    data = read_pdf_bytes(source, max_bytes)
+    pages = _reader(data).pages
+    count = len(pages)
+    if count > max_pages:
+        raise PDFTooLargeError(f"PDF has {count} pages; the limit is {max_pages}.")
+
+    if count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        for page in pages:
+            text = page.extract_text()
+            if text:
+                yield text
+        return
+
+    step = -(-count // PDF_WORKERS)
+    futures = [_get_pool().submit(_extract_range, data, start, min(start + step, count)) for start in range(0, count, step)]
+    try:
+        for future in futures:
+            for text in future.result():
+                if text:
+                    yield text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pdf_text(source, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES, use_cache=True):
+    data = read_pdf_bytes(source, max_bytes)
+    key = (hashlib.sha256(data).hexdigest(), max_pages)
+    text = _text_cache.get(key) if use_cache else None
+    if text is None:
+        text = "\n".join(iter_pdf_pages(data, max_pages, max_bytes))
+        if use_cache:
+            _text_cache.set(key, text)
+    return text
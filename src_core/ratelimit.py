@@ -0,0 +1,325 @@
+# ratelimit.py
+# Shared guard around every LLM call: request/token buckets sized to the provider
+# quota, jittered exponential backoff on throttling and transient errors, a circuit
+# breaker for sustained failures, and priority lanes so interactive (Streamlit)
+# calls are admitted ahead of batch jobs.
+import asyncio
+import contextlib
+import contextvars
+import random
+import threading
+import time
+
+from src_core.config import (
+    LLM_RPM,
+    LLM_TPM,
+    LLM_BATCH_RESERVE,
+    LLM_BURST_FRACTION,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_BREAKER_THRESHOLD,
+    LLM_BREAKER_COOLDOWN,
+)
+from src_core.metrics import note_queue_wait
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+RATE_LIMIT_MARKERS = ("429", "resourceexhausted", "resource_exhausted", "rate limit", "ratelimit", "quota")
+TRANSIENT_MARKERS = ("500", "502", "503", "504", "unavailable", "deadline", "timeout", "timed out", "connection")
+
+_lane = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+
+def is_rate_limited(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+def is_transient(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+def is_guarded(error):
+    # Errors LLMGuard has already retried (throttling, transient provider faults) or
+    # raised without calling (open breaker); retrying them again only adds load
+    return isinstance(error, CircuitOpenError) or is_rate_limited(error) or is_transient(error)
+
+
+@contextlib.contextmanager
+def lane(name):
+    # Calls made inside the block (including tasks and worker threads started from it) use this lane
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane():
+    return _lane.get()
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    # Holds `burst` of the per-minute quota and refills the rest evenly, so no
+    # trailing 60 s window ever admits more than `per_minute` (sliding-window quotas
+    # included). Not thread-safe on its own; RateLimiter holds the lock.
+
+    def __init__(self, per_minute, burst=LLM_BURST_FRACTION):
+        if not 0 <= burst < 1:
+            # burst == 1 would leave nothing to refill and no call could ever wait its turn
+            raise ValueError(f"LLM_BURST_FRACTION must be at least 0 and below 1, got {burst}")
+        self.capacity = max(1.0, per_minute * burst)
+        self.rate = per_minute * (1 - burst) / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, headroom=0.0, now=None):
+        self._refill(now or time.monotonic())
+        needed = min(amount, self.capacity) + headroom * self.capacity
+        return max(0.0, (needed - self.level) / self.rate)
+
+    def take(self, amount):
+        # May go negative: the debt is paid back before later callers are admitted
+        self.level -= amount
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures; after `cooldown` seconds one
+    # trial call is let through and its outcome closes or re-opens the circuit.
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial:
+                raise CircuitOpenError("LLM provider is failing; not sending requests for now. Try again shortly.")
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        # The call failed for a reason unrelated to the provider (e.g. a bad prompt)
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.threshold and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class RateLimiter:
+    # Admits a call once both buckets have room. Batch calls also leave
+    # `batch_reserve` of each bucket free and wait while interactive calls are queued.
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, batch_reserve=LLM_BATCH_RESERVE):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.batch_reserve = batch_reserve
+        self.paused_until = 0.0
+        self.waiting = {INTERACTIVE: 0, BATCH: 0}
+        self._lock = threading.Lock()
+
+    def _try_admit(self, tokens, lane_name):
+        # Returns 0 once admitted, otherwise how long to wait before asking again
+        now = time.monotonic()
+        with self._lock:
+            if now < self.paused_until:
+                return self.paused_until - now
+            if lane_name == BATCH and self.waiting[INTERACTIVE]:
+                return 0.05
+            headroom = self.batch_reserve if lane_name == BATCH else 0.0
+            waits = [
+                bucket.wait_time(amount, headroom, now)
+                for bucket, amount in ((self.requests, 1), (self.tokens, tokens))
+                if bucket is not None
+            ]
+            wait = max(waits, default=0.0)
+            if wait:
+                return wait
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def acquire(self, tokens=0, lane_name=None):
+        lane_name = lane_name or current_lane()
+        wait = self._try_admit(tokens, lane_name)
+        if not wait:
+            return
+        self._count_waiting(lane_name, 1)
+        start = time.perf_counter()
+        try:
+            while wait:
+                time.sleep(min(wait, 1.0))
+                wait = self._try_admit(tokens, lane_name)
+        finally:
+            self._count_waiting(lane_name, -1)
+            note_queue_wait(time.perf_counter() - start)
+
+    async def aacquire(self, tokens=0, lane_name=None):
+        lane_name = lane_name or current_lane()
+        wait = self._try_admit(tokens, lane_name)
+        if not wait:
+            return
+        self._count_waiting(lane_name, 1)
+        start = time.perf_counter()
+        try:
+            while wait:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = self._try_admit(tokens, lane_name)
+        finally:
+            self._count_waiting(lane_name, -1)
+            note_queue_wait(time.perf_counter() - start)
+
+    def _count_waiting(self, lane_name, delta):
+        with self._lock:
+            self.waiting[lane_name] += delta
+
+    def charge(self, tokens):
+        # Bill output tokens once the response reports them
+        if self.tokens and tokens:
+            with self._lock:
+                self.tokens.take(tokens)
+
+    def pause(self, seconds):
+        # A throttling error means the provider's window is exhausted for everyone
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def backoff_delay(attempt, rate_limited, base=LLM_RETRY_BASE_DELAY, maximum=LLM_RETRY_MAX_DELAY):
+    # Jittered over [delay/2, delay]; throttling starts from a longer base so the quota can refill
+    delay = min(maximum, base * (4 if rate_limited else 1) * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class LLMGuard:
+    def __init__(self, limiter=None, breaker=None, max_retries=LLM_MAX_RETRIES,
+                 base_delay=LLM_RETRY_BASE_DELAY, max_delay=LLM_RETRY_MAX_DELAY):
+        self.limiter = limiter or RateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    def _retry_delay(self, error, attempt):
+        # Seconds to wait before retrying, or None to give up and re-raise
+        rate_limited = is_rate_limited(error)
+        retryable = rate_limited or is_transient(error)
+        if rate_limited:
+            self.stats["rate_limited"] += 1
+        if retryable and attempt < self.max_retries:
+            if rate_limited:
+                # Throttling says nothing about the provider's health; a half-open
+                # trial is handed back so the retry (or another call) can take it
+                self.breaker.release()
+            else:
+                self.breaker.record_failure()
+            delay = backoff_delay(attempt, rate_limited, self.base_delay, self.max_delay)
+            if rate_limited:
+                self.limiter.pause(delay)
+            self.stats["retries"] += 1
+            return delay
+        self.stats["failures"] += 1
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        return None
+
+    def call(self, fn, tokens=0):
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                self.limiter.acquire(tokens)
+                result = fn()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, so a
+                # half-open trial is handed back rather than held forever
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            self.limiter.charge(_output_tokens(result))
+            return result
+
+    async def acall(self, fn, tokens=0):
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                await self.limiter.aacquire(tokens)
+                result = await fn()
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the provider, so a
+                # half-open trial is handed back rather than held forever
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            self.limiter.charge(_output_tokens(result))
+            return result
+
+
+def _output_tokens(response):
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("output_tokens", 0)
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_llm_guard():
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = LLMGuard()
+        return _guard
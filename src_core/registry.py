@@ -0,0 +1,23 @@
+# registry.py
+import threading
+
+_registry = {}
+_lock = threading.RLock()
+
+
+def get_or_create(key, factory):
+    # Process-wide memo for expensive objects (LLM clients, chains, compiled graphs).
+    # The factory runs at most once per key, on first use.
+    try:
+        return _registry[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _registry:
+            _registry[key] = factory()
+        return _registry[key]
+
+
+def clear_registry():
+    with _lock:
+        _registry.clear()
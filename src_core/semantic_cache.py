@@ -0,0 +1,330 @@
+# semantic_cache.py
+# Near-duplicate lookup for essay and thesis topics. People phrase one topic many
+# ways ("impact of junk food on health", "junk food health impacts"), which the
+# exact response cache never matches. Topics are reduced to stemmed content words
+# plus their character trigrams and summarized as MinHash signatures, stored as
+# rows of a NumPy matrix; a lookup compares the query against every row in one
+# vectorized pass. Only the low 16 bits of each min-hash are kept (b-bit MinHash),
+# so 100k topics take about 13 MB. Entries expire after a TTL and the least
+# recently used one is dropped when the cache is full.
+# The MinHash score only shortlists candidates. A result is reused only when the two
+# topics have the same content words (places, groups, numbers, the audience of a
+# thesis topic) up to word order, plurals and one-letter typos, and the same
+# negation and stance words: "teenage girls" vs "teenage boys", "India" vs "Kenya"
+# or "should" vs "should not be abolished" score high but want different essays.
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from src_core.config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL,
+)
+from src_core.metrics import note_cache_hit
+
+NUM_PERM = 64
+PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a about an and are as at be between by do does for from how in into is it its of on or "
+    "the their this to vs what which why with".split()
+)
+STANCE_WORD = re.compile(r"[a-z]+n['’]t|[a-z]+")
+NEGATIONS = frozenset("not no never nor neither none nothing without cannot".split())
+# Stemmed, see _stem()
+STANCE_WORDS = frozenset(
+    "against anti pro con support oppose advantage disadvantage benefit drawback positive negative "
+    "increase decrease more less better worse".split()
+)
+
+
+class Match(NamedTuple):
+    topic: str
+    similarity: float
+    result: dict
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic):
+    # Stemmed content words in order; word order and stopwords stop mattering later
+    return " ".join(_stem(word) for word in WORD.findall(topic.lower()) if word not in STOPWORDS)
+
+
+def stance_key(topic):
+    # Negations (folded into "not") and stance words in the topic; lookups only
+    # compare topics with the same key
+    words = set()
+    for word in STANCE_WORD.findall(topic.lower()):
+        if word in NEGATIONS or word.endswith(("n't", "n’t")):
+            words.add("not")
+        elif _stem(word) in STANCE_WORDS:
+            words.add(_stem(word))
+    return tuple(sorted(words))
+
+
+def _one_edit_apart(a, b):
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        return sum(x != y for x, y in zip(a, b)) == 1
+    short, long = sorted((a, b), key=len)
+    return any(long[:i] + long[i + 1:] == short for i in range(len(long)))
+
+
+def _close(word, other):
+    # Numbers and short words must match exactly; longer words may differ by a typo
+    return word == other or (
+        not word.isdigit() and not other.isdigit() and min(len(word), len(other)) >= 5 and _one_edit_apart(word, other)
+    )
+
+
+def same_content(topic, other):
+    words, others = set(normalize_topic(topic).split()), set(normalize_topic(other).split())
+    return all(any(_close(word, o) for o in others) for word in words - others) and all(
+        any(_close(o, word) for word in words) for o in others - words
+    )
+
+
+def topic_features(topic):
+    words = normalize_topic(topic).split()
+    features = set(words)
+    for word in words:
+        padded = f"^{word}$"
+        features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+def signature(topic):
+    # uint16 MinHash signature, or None for a topic with no content words
+    features = topic_features(topic)
+    if not features:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little") for f in features),
+        dtype=np.uint64,
+        count=len(features),
+    )
+    minhash = ((_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME).min(axis=1)
+    return (minhash & 0xFFFF).astype(np.uint16)
+
+
+class SemanticCache:
+    # Thread-safe; namespaces keep results for different tools and modes apart, and
+    # within a namespace topics with different stance keys never match.
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl=SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        capacity = min(max_entries, 1024)
+        self._signatures = np.zeros((capacity, NUM_PERM), dtype=np.uint16)
+        self._space = np.zeros(capacity, dtype=np.int32)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._created = np.zeros(capacity)
+        self._accessed = np.zeros(capacity)
+        self._entries = [None] * capacity
+        self._rows = {}
+        self._spaces = {}
+        self._free = []
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _grow(self):
+        capacity = min(self.max_entries, 2 * len(self._entries))
+        extra = capacity - len(self._entries)
+        self._signatures = np.vstack([self._signatures, np.zeros((extra, NUM_PERM), dtype=np.uint16)])
+        self._space = np.concatenate([self._space, np.zeros(extra, dtype=np.int32)])
+        self._live = np.concatenate([self._live, np.zeros(extra, dtype=bool)])
+        self._created = np.concatenate([self._created, np.zeros(extra)])
+        self._accessed = np.concatenate([self._accessed, np.zeros(extra)])
+        self._entries.extend([None] * extra)
+
+    def _drop(self, row):
+        namespace, key, _, _ = self._entries[row]
+        del self._rows[(namespace, key)]
+        self._entries[row] = None
+        self._live[row] = False
+        self._free.append(row)
+        self.evictions += 1
+
+    def _expire(self, now):
+        if self.ttl:
+            for row in np.flatnonzero(self._live[:self._used] & (self._created[:self._used] < now - self.ttl)):
+                self._drop(int(row))
+
+    def _slot(self):
+        if len(self._rows) >= self.max_entries:
+            accessed = np.where(self._live[:self._used], self._accessed[:self._used], np.inf)
+            self._drop(int(np.argmin(accessed)))
+        if self._free:
+            return self._free.pop()
+        if self._used == len(self._entries):
+            self._grow()
+        self._used += 1
+        return self._used - 1
+
+    def add(self, namespace, topic, result):
+        sig = signature(topic)
+        if sig is None:
+            return
+        key = normalize_topic(topic)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            row = self._rows.get((namespace, key))
+            if row is None:
+                row = self._slot()
+                self._rows[(namespace, key)] = row
+            self._signatures[row] = sig
+            self._space[row] = self._spaces.setdefault((namespace, stance_key(topic)), len(self._spaces))
+            self._live[row] = True
+            self._created[row] = self._accessed[row] = now
+            self._entries[row] = (namespace, key, topic, result)
+
+    def lookup(self, namespace, topic, threshold=None):
+        # Best Match at or above the threshold, or None
+        sig = signature(topic)
+        threshold = self.threshold if threshold is None else threshold
+        now = time.time()
+        with self._lock:
+            space = self._spaces.get((namespace, stance_key(topic)))
+            if sig is None or space is None or not self._rows:
+                self.misses += 1
+                return None
+            used = self._used
+            similarity = (self._signatures[:used] == sig).sum(axis=1, dtype=np.int32)
+            valid = self._live[:used] & (self._space[:used] == space)
+            if self.ttl:
+                valid &= self._created[:used] >= now - self.ttl
+            similarity[~valid] = -1
+            # Best-scoring shortlisted topic whose content words also agree
+            candidates = np.flatnonzero(similarity >= threshold * NUM_PERM)
+            for row in candidates[np.argsort(-similarity[candidates], kind="stable")]:
+                _, _, stored_topic, result = self._entries[row]
+                if same_content(topic, stored_topic):
+                    break
+            else:
+                self.misses += 1
+                return None
+            self._accessed[row] = now
+            self.hits += 1
+            score = similarity[row] / NUM_PERM
+        note_cache_hit("semantic")
+        return Match(stored_topic, round(float(score), 3), result)
+
+    def clear(self):
+        with self._lock:
+            for row in list(self._rows.values()):
+                self._drop(row)
+            self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._rows),
+            "bytes": self._signatures.nbytes,
+        }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+        return _semantic_cache
+
+
+# Workflow helpers: reuse the result of an earlier run on a near-identical topic
+# (same tool, mode and target length) instead of running the graph. Regenerate
+# skips the lookup.
+def _namespace(tool, inputs):
+    return tool, inputs.get("mode") or "standard", inputs.get("length") or 0
+
+
+def find_similar(tool, inputs):
+    cache = get_semantic_cache()
+    if cache is None or inputs.get("bypass_cache") or not inputs.get("topic"):
+        return None
+    return cache.lookup(_namespace(tool, inputs), inputs["topic"])
+
+
+def remember(tool, inputs, state, fields):
+    cache = get_semantic_cache()
+    if cache is not None and inputs.get("topic"):
+        cache.add(_namespace(tool, inputs), inputs["topic"], {field: state[field] for field in fields if field in state})
+
+
+def reused_state(inputs, match):
+    return {**inputs, **match.result, "similar_topic": match.topic, "similarity": match.similarity}
+
+
+def run_with_similar(tool, inputs, fields, run):
+    # run() performs a fresh run and returns its final state
+    match = find_similar(tool, inputs)
+    if match is not None:
+        return reused_state(inputs, match)
+    state = run()
+    remember(tool, inputs, state, fields)
+    return state
+
+
+def stream_with_similar(tool, inputs, fields, stream):
+    # stream() returns the (event, payload) iterator of a fresh run. A reused result
+    # yields ("similar", {"topic", "similarity"}) and then ("done", state).
+    match = find_similar(tool, inputs)
+    if match is not None:
+        yield "similar", {"topic": match.topic, "similarity": match.similarity}
+        yield "done", reused_state(inputs, match)
+        return
+    for event, payload in stream():
+        if event == "done":
+            remember(tool, inputs, payload, fields)
+        yield event, payload
+
+
+async def astream_with_similar(tool, inputs, fields, stream):
+    match = await asyncio.to_thread(find_similar, tool, inputs)
+    if match is not None:
+        yield "similar", {"topic": match.topic, "similarity": match.similarity}
+        yield "done", reused_state(inputs, match)
+        return
+    async for event, payload in stream():
+        if event == "done":
+            await asyncio.to_thread(remember, tool, inputs, payload, fields)
+        yield event, payload
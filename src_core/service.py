@@ -0,0 +1,255 @@
+# service.py
+# HTTP front end for the three tools, for deployments that outgrow Streamlit.
+#
+#   uvicorn src_core.service:app --host 0.0.0.0 --port 8000
+#
+# POST /essay, /thesis or /paraphrase queues a job and returns its id right away.
+# GET /jobs/{id} polls it and GET /jobs/{id}/events streams its progress as
+# server-sent events. A bounded queue feeds a fixed pool of async workers; once
+# the queue is full new jobs get 429 with Retry-After so a load balancer can
+# send them elsewhere. Job state lives in the process that accepted the job.
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from src_core.config import SERVICE_WORKERS, SERVICE_QUEUE_SIZE, SERVICE_JOB_TTL, SERVICE_RETRY_AFTER
+from src_core.loader import load_tool
+from src_core.metrics import get_metrics
+
+OUTPUT_FIELDS = {"essay": "final_output", "thesis": "thesis_list", "paraphrase": "final_output", "thesis_batch": "theses"}
+
+
+class JobRequest(BaseModel):
+    # "topic" for essay and thesis, "text" for paraphrase, "topics" for a thesis batch
+    topic: Optional[str] = None
+    text: Optional[str] = None
+    topics: Optional[List[str]] = None
+    mode: Literal["standard", "fast"] = "standard"
+    bypass_cache: bool = False
+    # Essay only: target word count; long essays are written section by section
+    length: Optional[int] = None
+
+
+class Job:
+    def __init__(self, tool, request):
+        self.id = uuid.uuid4().hex
+        self.tool = tool
+        self.request = request
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Streamed tokens are kept as one running text and every other event as
+        # (event, payload, len(text) when it happened), so late SSE subscribers get
+        # the same sequence without one stored entry per token
+        self.text = ""
+        self.events = []
+        self.changed = asyncio.Condition()
+
+    async def emit(self, event, payload):
+        async with self.changed:
+            if event == "token":
+                self.text += payload
+            else:
+                self.events.append((event, payload, len(self.text)))
+            self.changed.notify_all()
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "tool": self.tool,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "queue_s": round((self.started or time.time()) - self.created, 3),
+            "run_s": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+        }
+
+
+async def _thesis_batch_events(request):
+    # Same shape as a thesis job: markdown lists as the output, ThesisItems as "items"
+    tool = load_tool("thesis")
+    theses = await tool.nodes_workflow.agenerate_theses(request.topics, request.mode, request.bypass_cache)
+    lists = {topic: tool.tools.format_thesis_list(items) for topic, items in theses.items()}
+    yield "done", {"theses": lists, "thesis_items": theses}
+
+
+def _events_for(tool, request):
+    if tool == "thesis_batch":
+        return _thesis_batch_events(request)
+    nodes = load_tool(tool).nodes_workflow
+    if tool == "paraphrase":
+        return nodes.astream_document(request.text, bypass_cache=request.bypass_cache, mode=request.mode)
+    inputs = {"topic": request.topic, "bypass_cache": request.bypass_cache, "mode": request.mode}
+    if tool == "essay" and request.length:
+        inputs["length"] = request.length
+    return nodes.astream_workflow(inputs)
+
+
+class JobQueue:
+    def __init__(self, workers=SERVICE_WORKERS, max_queued=SERVICE_QUEUE_SIZE, ttl=SERVICE_JOB_TTL):
+        self.workers = workers
+        self.ttl = ttl
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.jobs = {}
+        self.running = 0
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._prune_every(min(self.ttl, 60))))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def submit(self, tool, request):
+        job = Job(tool, request)
+        self.queue.put_nowait(job)  # raises asyncio.QueueFull when saturated
+        self.jobs[job.id] = job
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    async def _prune_every(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            self._prune()
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            self.running += 1
+            job.status, job.started = "running", time.time()
+            try:
+                async for event, payload in _events_for(job.tool, job.request):
+                    if event == "done":
+                        job.result = {"output": payload[OUTPUT_FIELDS[job.tool]], "token_usage": payload.get("token_usage")}
+                        if "thesis_items" in payload:
+                            job.result["items"] = payload["thesis_items"]
+                    else:
+                        await job.emit(event, payload)
+                job.status = "done"
+            except Exception as e:
+                job.status, job.error = "error", f"{type(e).__name__}: {e}"
+            finally:
+                job.finished = time.time()
+                self.running -= 1
+                self.queue.task_done()
+                await job.emit(job.status, job.result if job.status == "done" else {"error": job.error})
+
+    def stats(self):
+        return {"workers": self.workers, "running": self.running, "queued": self.queue.qsize(), "capacity": self.queue.maxsize}
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def create_app(workers=SERVICE_WORKERS, max_queued=SERVICE_QUEUE_SIZE):
+    jobs = JobQueue(workers, max_queued)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        jobs.start()
+        yield
+        await jobs.stop()
+
+    app = FastAPI(title="Academic Writing Tools", lifespan=lifespan)
+    app.state.jobs = jobs
+
+    def get_job(job_id):
+        job = jobs.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(404, f"Unknown job '{job_id}'")
+        return job
+
+    def enqueue(tool, request):
+        try:
+            job = jobs.submit(tool, request)
+        except asyncio.QueueFull:
+            return JSONResponse(
+                {"detail": "Too many queued jobs; retry later.", **jobs.stats()},
+                status_code=429,
+                headers={"Retry-After": str(SERVICE_RETRY_AFTER)},
+            )
+        return {"id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events"}
+
+    @app.post("/thesis/batch", status_code=202)
+    async def submit_thesis_batch(request: JobRequest):
+        # Many topics in few LLM calls; the result maps each topic to its thesis list
+        if not any(topic.strip() for topic in request.topics or ()):
+            raise HTTPException(422, "'topics' is required for thesis batch jobs")
+        return enqueue("thesis_batch", request)
+
+    @app.post("/{tool}", status_code=202)
+    async def submit(tool: Literal["essay", "thesis", "paraphrase"], request: JobRequest):
+        field = "text" if tool == "paraphrase" else "topic"
+        if not (getattr(request, field) or "").strip():
+            raise HTTPException(422, f"'{field}' is required for {tool} jobs")
+        return enqueue(tool, request)
+
+    @app.get("/jobs/{job_id}")
+    async def status(job_id: str):
+        return get_job(job_id).summary()
+
+    @app.get("/jobs/{job_id}/events")
+    async def events(job_id: str):
+        # stage/token events as they happen, then one final "done" or "error" event
+        job = get_job(job_id)
+
+        async def stream():
+            sent, sent_text = 0, 0
+            while True:
+                async with job.changed:
+                    await job.changed.wait_for(lambda: len(job.events) > sent or len(job.text) > sent_text)
+                    pending, text = job.events[sent:], job.text
+                sent += len(pending)
+                for event, payload, at in pending:
+                    if at > sent_text:
+                        yield _sse("token", text[sent_text:at])
+                        sent_text = at
+                    yield _sse(event, payload)
+                    if event in ("done", "error"):
+                        return
+                if len(text) > sent_text:
+                    yield _sse("token", text[sent_text:])
+                    sent_text = len(text)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.get("/articles")
+    async def articles(topic: str = Query(..., min_length=1)):
+        # Web search is blocking I/O, so it runs in a thread; results are cached per topic
+        fetch = load_tool("thesis").tools.fetch_related_articles
+        try:
+            return {"topic": topic, "articles": await asyncio.to_thread(fetch, topic)}
+        except Exception as e:
+            raise HTTPException(502, f"Article search failed: {type(e).__name__}: {e}")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **jobs.stats()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return get_metrics().render_prometheus()
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,58 @@
+# streaming.py
+from src_core.checkpoint import resumable, begin_job, end_job
+
+
+def _events(workflow, start, inputs, final_nodes, config):
+    # Yields the stage and token events and returns the merged final state
+    state = dict(inputs)
+    for mode, payload in workflow.stream(start, config, stream_mode=["values", "updates", "messages"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") in final_nodes and isinstance(chunk.content, str) and chunk.content:
+                yield "token", chunk.content
+        elif mode == "values":
+            # Full state after each step, with any reducers already applied
+            state = payload
+        else:
+            for node in payload:
+                yield "stage", node
+    return state
+
+
+def stream_events(workflow, inputs, final_nodes, config=None):
+    # Yields ("stage", node) as each node finishes, ("token", text) for tokens
+    # generated inside any of final_nodes, and ("done", state) with the merged final state.
+    # Cached responses produce no tokens, so callers should render the final state.
+    state = yield from _events(workflow, inputs, inputs, final_nodes, config)
+    yield "done", state
+
+
+def stream_job(workflow, inputs, final_nodes, namespace, job_id=None, config=None):
+    # stream_events() on the checkpointed workflow; an unfinished run with the same
+    # job id is resumed (see src_core/checkpoint.py)
+    workflow = resumable(workflow)
+    start, config = begin_job(workflow, inputs, namespace, job_id, config)
+    try:
+        state = yield from _events(workflow, start, inputs, final_nodes, config)
+    except BaseException:
+        end_job(workflow, config, failed=True)
+        raise
+    end_job(workflow, config)
+    yield "done", state
+
+
+async def astream_events(workflow, inputs, final_nodes, config=None):
+    # Async counterpart of stream_events() for graphs built by acreate_workflow()
+    state = dict(inputs)
+    async for mode, payload in workflow.astream(inputs, config, stream_mode=["values", "updates", "messages"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") in final_nodes and isinstance(chunk.content, str) and chunk.content:
+                yield "token", chunk.content
+        elif mode == "values":
+            # Full state after each step, with any reducers already applied
+            state = payload
+        else:
+            for node in payload:
+                yield "stage", node
+    yield "done", state
@@ -0,0 +1,36 @@
+# tokens.py
+
+# Gemini averages roughly four characters per token for English prose
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def message_usage(message):
+    # Tokens billed for one LLM response; cached responses cost nothing
+    if message.response_metadata.get("cache_hit"):
+        return {"input_tokens": 0, "output_tokens": 0, "cached": True}
+    usage = getattr(message, "usage_metadata", None) or {}
+    content = message.content if isinstance(message.content, str) else ""
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", estimate_tokens(content)),
+        "cached": False,
+    }
+
+
+def merge_usage(left, right):
+    # LangGraph reducer so each node can add its own entry to state["token_usage"]
+    return {**(left or {}), **(right or {})}
+
+
+def sum_usage(usages):
+    # One token_usage entry for a node that made several calls
+    usages = list(usages)
+    return {
+        "input_tokens": sum(usage["input_tokens"] for usage in usages),
+        "output_tokens": sum(usage["output_tokens"] for usage in usages),
+        "cached": bool(usages) and all(usage["cached"] for usage in usages),
+    }
@@ -1,17 +1,20 @@
-# config.py
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
-
 # LLM.py
-from langchain_google_genai import ChatGoogleGenerativeAI
+import os
 from langchain_core.prompts import PromptTemplate
+from src_core.cache import CachedChain
+from src_core.config import GEMINI_API_KEY
+from src_core.grammar import SENTENCES_PROMPT
+from src_core.models import get_chat_model
+from src_core.registry import get_or_create
 
+# Sectioned mode: roughly this many words per Core Analysis section
+SECTION_WORDS = int(os.getenv("ESSAY_SECTION_WORDS", 700))
+# Sections written at once (LangGraph's own default is tied to the CPU count)
+SECTION_WORKERS = int(os.getenv("ESSAY_SECTION_WORKERS", 16))
 
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=GEMINI_API_KEY, temperature=0.7)
+
+def get_llm():
+    return get_chat_model(model="gemini-2.0-flash", google_api_key=GEMINI_API_KEY, temperature=0.7)
 
 essay_prompt = PromptTemplate.from_template(
     """
@@ -85,4 +88,90 @@ grammar_prompt = PromptTemplate.from_template(
 
     Corrected Essay:
     """
-)
\ No newline at end of file
+)
+
+# Fast mode: one editing pass that applies the humanizer and proofreader
+# instructions together, reusing the text of the two prompts above
+humanize_grammar_prompt = PromptTemplate.from_template(
+    humanizer_prompt.template.split("Essay:")[0].rstrip()
+    + "\n\n    Then, in the same pass, act as the proofreader described below.\n"
+    + grammar_prompt.template.split("Essay:")[0].rstrip()
+    + "\n\n    Essay:\n    {essay}\n\n    Final Essay:\n    "
+)
+
+# Sectioned long-form mode: plan an outline, write every section in parallel, then
+# add short transitions. The JSON instructions avoid brackets and braces.
+outline_prompt = PromptTemplate.from_template(
+    """
+    You are a doctoral-level academic essay writer planning a long essay.
+
+    Plan a PhD-level academic essay of about {words} words on the following topic:
+    "{topic}"
+
+    The plan must have an Introduction, then {core_sections} Core Analysis sections, each with its own clear thematic heading, then a Conclusion.
+    For each section give its heading, 2 to 4 key points it must cover, and its share of the word count.
+
+    Return only a JSON array with one object per section, in order, each with the fields "heading", "points" (a list of strings) and "words" (an integer). No commentary and no code fences.
+
+    Outline:
+    """
+)
+
+section_prompt = PromptTemplate.from_template(
+    """
+    You are a doctoral-level academic essay writer.
+
+    You are writing one section of a PhD-level academic essay on the following topic:
+    "{topic}"
+
+    Essay plan (all sections, in order):
+    {outline}
+
+    Write only the section "{heading}", in about {words} words, covering:
+    {points}
+
+    - Start with the section heading as a markdown heading (## {heading}) and use bolded subheadings where helpful.
+    - Support claims with scholarly evidence, data, or peer-reviewed literature, with deep critical analysis.
+    - Do not cover material that belongs to other sections of the plan.
+
+    Section:
+    """
+)
+
+coherence_prompt = PromptTemplate.from_template(
+    """
+    You are an academic editor joining separately written sections of one essay on "{topic}".
+    The JSON object below maps each section number to its heading and its first and last sentences.
+    For every section except the first, write one short transition sentence to open that section so it follows naturally from the one before.
+
+    Return only a JSON object mapping those section numbers to their transition sentences. No commentary and no code fences.
+
+    Sections (JSON):
+    {sections}
+
+    Transitions (JSON):
+    """
+)
+
+PROMPTS = {
+    "essay": essay_prompt,
+    "humanizer": humanizer_prompt,
+    "grammar": grammar_prompt,
+    "humanize_grammar": humanize_grammar_prompt,
+    "grammar_sentences": SENTENCES_PROMPT,
+    "outline": outline_prompt,
+    "section": section_prompt,
+    "coherence": coherence_prompt,
+}
+
+# Clients and chains are built on first use and shared for the life of the process
+def get_chain(name):
+    return get_or_create(("chain", __file__, name), lambda: CachedChain(PROMPTS[name], get_llm()))
+
+def __getattr__(name):
+    # Keeps `LLM.llm` / `LLM.essay_chain` style access working without import-time setup
+    if name == "llm":
+        return get_llm()
+    if name.endswith("_chain") and name[:-len("_chain")] in PROMPTS:
+        return get_chain(name[:-len("_chain")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,108 @@
+# layout.py
+# Single-pass Markdown-ish tokenizer for generated essays. iter_blocks() yields one
+# Block per non-empty line, so exporters (PDF today, DOCX/HTML later) can stream
+# a document of any size without holding a parsed copy of it.
+import re
+from typing import Iterable, Iterator, NamedTuple, Union
+
+LINES = re.compile(r"[^\r\n]+")
+# Captures run greedily to the end of the line and trailing blanks are stripped in
+# Python: quantifiers that compete for the same whitespace backtrack polynomially
+# on long runs of spaces.
+LINE = re.compile(
+    r"""
+    [ \t]*(?:
+        (?P<hashes>\#{1,6})[ \t]+(?P<heading>.*)            # ## Heading
+      | (?P<section>\d+(?:\.\d+)+)\.?[ \t]+(?P<section_text>.*) # 1.1 Heading
+      | (?P<bullet>[-*+•])[ \t]+(?P<bullet_text>.*)        # - item
+      | (?P<ordinal>\d+[.)])[ \t]+(?P<ordinal_text>.*)      # 1. item
+      | \*\*(?P<bold_line>[^*]+)\*\*:?[ \t]*                  # **Whole line bold**
+      | (?P<text>.*)
+    )
+    """,
+    re.VERBOSE,
+)
+INLINE_BOLD = re.compile(r"\*\*(.+?)\*\*")
+REFERENCES = re.compile(r"(references|bibliography|works cited)\W*", re.IGNORECASE)
+
+
+class Span(NamedTuple):
+    text: str
+    bold: bool = False
+
+
+class Block(NamedTuple):
+    # kind: "heading", "paragraph", "list_item", "references" (the heading) or "reference"
+    kind: str
+    spans: tuple
+    # Heading depth (1 for "#", 2 for "##" or "1.1", ...); list nesting for list items
+    level: int = 0
+    # "-" for bullets, "1." etc. for numbered items
+    marker: str = ""
+
+    @property
+    def text(self):
+        return "".join(span.text for span in self.spans)
+
+
+def parse_spans(text):
+    if "**" not in text:
+        return (Span(text),)
+    spans, position = [], 0
+    for match in INLINE_BOLD.finditer(text):
+        if match.start() > position:
+            spans.append(Span(text[position:match.start()]))
+        spans.append(Span(match.group(1), True))
+        position = match.end()
+    if position < len(text):
+        spans.append(Span(text[position:]))
+    return tuple(spans)
+
+
+def _lines(source):
+    if isinstance(source, str):
+        return (match.group() for match in LINES.finditer(source))
+    return (line.rstrip("\r\n") for line in source)
+
+
+def iter_blocks(source: Union[str, Iterable[str]]) -> Iterator[Block]:
+    # `source` is the whole text or any iterable of lines (e.g. an open file)
+    in_references = False
+    for line in _lines(source):
+        match = LINE.fullmatch(line)
+        # The last group to close names the branch that matched
+        branch = match.lastgroup
+        if branch == "text":
+            text = match.group("text")
+            if not text:
+                continue
+            if len(text) < 40 and REFERENCES.fullmatch(text.replace("*", "")):
+                in_references = True
+                yield Block("references", (Span(text.replace("*", ""), True),), level=2)
+            else:
+                yield Block("reference" if in_references else "paragraph", parse_spans(text))
+            continue
+
+        if branch == "heading":
+            title, level = match.group("heading").rstrip(" \t#"), len(match.group("hashes"))
+        elif branch == "section_text":
+            title, level = f"{match.group('section')} {match.group('section_text').rstrip()}", match.group("section").count(".") + 1
+        elif branch == "bold_line":
+            title, level = match.group("bold_line"), 2
+        elif in_references:
+            yield Block("reference", parse_spans(line.strip()))
+            continue
+        else:
+            bullet = branch == "bullet_text"
+            indent = (len(line) - len(line.lstrip())) // 2
+            yield Block(
+                "list_item",
+                parse_spans(match.group(branch).rstrip()),
+                level=indent,
+                marker="-" if bullet else match.group("ordinal"),
+            )
+            continue
+
+        title = title.replace("*", "").strip()
+        in_references = bool(REFERENCES.fullmatch(title))
+        yield Block("references" if in_references else "heading", (Span(title, True),), level=level)
@@ -1,37 +1,248 @@
 # nodes_workflow.py
-from typing import TypedDict
-from langgraph.graph import StateGraph, END
+import json
+from typing import Annotated, TypedDict
 from langchain_core.runnables import RunnableLambda
-from LLM import llm, essay_prompt, humanizer_prompt, grammar_prompt
+from .LLM import get_chain, SECTION_WORDS, SECTION_WORKERS
+from .tools import parse_outline, outline_text, points_text, with_heading, section_summary, parse_transitions, join_sections
+from src_core.checkpoint import run_job
+from src_core.config import GRAMMAR_PREPASS
+from src_core.grammar import proofread, aproofread
+from src_core.metrics import traced
+from src_core.registry import get_or_create
+from src_core.semantic_cache import run_with_similar, stream_with_similar, astream_with_similar
+from src_core.streaming import stream_job, astream_events
+from src_core.tokens import message_usage, merge_usage, sum_usage
+
+def collect_sections(current, update):
+    # Branches append their finished sections; Outline writes None to start a new list,
+    # so a rerun on the same thread never mixes in an earlier run's sections
+    return [] if update is None else (current or []) + update
 
 class EssayState(TypedDict):
     topic: str
     essay: str
     humanized_essay: str
     final_output: str
+    bypass_cache: bool
+    # "standard" (three calls) or "fast" (humanize and grammar in one call)
+    mode: str
+    # Per-node {"input_tokens", "output_tokens", "cached"}
+    token_usage: Annotated[dict, merge_usage]
+    # Sectioned mode, used when "length" (target words) is set: the planned
+    # sections, and the finished ones as the parallel branches return them
+    length: int
+    outline: list
+    sections: Annotated[list, collect_sections]
+
+# Stages pass plain text along; the raw AIMessage only feeds token accounting
 
+@traced("essay")
 def generate_essay(state):
     topic = state["topic"]
-    essay = llm.invoke(essay_prompt.format(topic=topic))
-    return {"topic": topic, "essay": essay}
+    response = get_chain("essay").invoke({"topic": topic}, bypass_cache=state.get("bypass_cache", False))
+    return {"topic": topic, "essay": response.content, "token_usage": {"GenerateEssay": message_usage(response)}}
 
+@traced("essay")
 def humanize_essay(state):
     essay = state["essay"]
-    humanized = llm.invoke(humanizer_prompt.format(essay=essay))
-    return {"topic": state["topic"], "essay": essay, "humanized_essay": humanized}
+    response = get_chain("humanizer").invoke({"essay": essay}, bypass_cache=state.get("bypass_cache", False))
+    return {"humanized_essay": response.content, "token_usage": {"HumanizeEssay": message_usage(response)}}
 
+# The offline pre-pass decides whether grammar needs no call, a call for the
+# flagged sentences only, or the usual full pass (see src_core/grammar.py)
+@traced("essay")
 def correct_grammar(state):
-    humanized = state["humanized_essay"]
-    corrected = llm.invoke(grammar_prompt.format(humanized_essay=humanized))
-    return {"final_output": corrected}
+    bypass_cache = state.get("bypass_cache", False)
+
+    def full_pass(text):
+        return get_chain("grammar").invoke({"humanized_essay": text}, bypass_cache=bypass_cache)
+
+    final, response = proofread(state["humanized_essay"], full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return {"final_output": final, "token_usage": {"GrammarCorrect": message_usage(response)} if response is not None else {}}
+
+@traced("essay")
+def humanize_and_correct(state):
+    response = get_chain("humanize_grammar").invoke({"essay": state["essay"]}, bypass_cache=state.get("bypass_cache", False))
+    return {"final_output": response.content, "token_usage": {"HumanizeGrammar": message_usage(response)}}
+
+@traced("essay", "generate_essay")
+async def agenerate_essay(state):
+    topic = state["topic"]
+    response = await get_chain("essay").ainvoke({"topic": topic}, bypass_cache=state.get("bypass_cache", False))
+    return {"topic": topic, "essay": response.content, "token_usage": {"GenerateEssay": message_usage(response)}}
+
+@traced("essay", "humanize_essay")
+async def ahumanize_essay(state):
+    essay = state["essay"]
+    response = await get_chain("humanizer").ainvoke({"essay": essay}, bypass_cache=state.get("bypass_cache", False))
+    return {"humanized_essay": response.content, "token_usage": {"HumanizeEssay": message_usage(response)}}
+
+@traced("essay", "correct_grammar")
+async def acorrect_grammar(state):
+    bypass_cache = state.get("bypass_cache", False)
+
+    async def full_pass(text):
+        return await get_chain("grammar").ainvoke({"humanized_essay": text}, bypass_cache=bypass_cache)
+
+    final, response = await aproofread(state["humanized_essay"], full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return {"final_output": final, "token_usage": {"GrammarCorrect": message_usage(response)} if response is not None else {}}
+
+@traced("essay", "humanize_and_correct")
+async def ahumanize_and_correct(state):
+    response = await get_chain("humanize_grammar").ainvoke({"essay": state["essay"]}, bypass_cache=state.get("bypass_cache", False))
+    return {"final_output": response.content, "token_usage": {"HumanizeGrammar": message_usage(response)}}
+
+# Sectioned long-form mode: Outline plans the sections, one WriteSection branch per
+# section drafts, humanizes and proofreads it in parallel, and Assemble joins them
+# with transitions from a short coherence call, so the run takes about as long as
+# the slowest section rather than the whole essay
+def _core_sections(words):
+    return max(2, round(words * 0.8 / SECTION_WORDS))
+
+def _section_inputs(state):
+    section = state["section"]
+    return {"topic": state["topic"], "outline": state["plan"], "heading": section["heading"], "words": section["words"], "points": points_text(section)}
+
+def _section_result(state, text, responses):
+    section = state["section"]
+    return {
+        "sections": [{"index": section["index"], "heading": section["heading"], "text": with_heading(text, section["heading"])}],
+        "token_usage": {f"Section{section['index'] + 1}": sum_usage(message_usage(r) for r in responses if r is not None)},
+    }
+
+def _coherence_inputs(state):
+    sections = sorted(state["sections"], key=lambda section: section["index"])
+    summaries = {str(number): section_summary(section) for number, section in enumerate(sections, start=1)}
+    return sections, {"topic": state["topic"], "sections": json.dumps(summaries, ensure_ascii=False)}
+
+@traced("essay")
+def plan_sections(state):
+    words = state["length"]
+    inputs = {"topic": state["topic"], "words": words, "core_sections": _core_sections(words)}
+    response = get_chain("outline").invoke(inputs, bypass_cache=state.get("bypass_cache", False))
+    return {"outline": parse_outline(response.content, words, SECTION_WORDS), "sections": None, "token_usage": {"Outline": message_usage(response)}}
+
+@traced("essay")
+def write_section(state):
+    bypass_cache = state.get("bypass_cache", False)
+    draft = get_chain("section").invoke(_section_inputs(state), bypass_cache=bypass_cache)
+    if state.get("mode") == "fast":
+        final = get_chain("humanize_grammar").invoke({"essay": draft.content}, bypass_cache=bypass_cache)
+        return _section_result(state, final.content, [draft, final])
+    human = get_chain("humanizer").invoke({"essay": draft.content}, bypass_cache=bypass_cache)
+
+    def full_pass(text):
+        return get_chain("grammar").invoke({"humanized_essay": text}, bypass_cache=bypass_cache)
+
+    text, grammar = proofread(human.content, full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return _section_result(state, text, [draft, human, grammar])
+
+@traced("essay")
+def assemble_sections(state):
+    sections, inputs = _coherence_inputs(state)
+    response = get_chain("coherence").invoke(inputs, bypass_cache=state.get("bypass_cache", False))
+    final = join_sections(sections, parse_transitions(response.content, len(sections)))
+    return {"final_output": final, "token_usage": {"Coherence": message_usage(response)}}
+
+@traced("essay", "plan_sections")
+async def aplan_sections(state):
+    words = state["length"]
+    inputs = {"topic": state["topic"], "words": words, "core_sections": _core_sections(words)}
+    response = await get_chain("outline").ainvoke(inputs, bypass_cache=state.get("bypass_cache", False))
+    return {"outline": parse_outline(response.content, words, SECTION_WORDS), "sections": None, "token_usage": {"Outline": message_usage(response)}}
+
+@traced("essay", "write_section")
+async def awrite_section(state):
+    bypass_cache = state.get("bypass_cache", False)
+    draft = await get_chain("section").ainvoke(_section_inputs(state), bypass_cache=bypass_cache)
+    if state.get("mode") == "fast":
+        final = await get_chain("humanize_grammar").ainvoke({"essay": draft.content}, bypass_cache=bypass_cache)
+        return _section_result(state, final.content, [draft, final])
+    human = await get_chain("humanizer").ainvoke({"essay": draft.content}, bypass_cache=bypass_cache)
+
+    async def full_pass(text):
+        return await get_chain("grammar").ainvoke({"humanized_essay": text}, bypass_cache=bypass_cache)
+
+    text, grammar = await aproofread(human.content, full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return _section_result(state, text, [draft, human, grammar])
+
+@traced("essay", "assemble_sections")
+async def aassemble_sections(state):
+    sections, inputs = _coherence_inputs(state)
+    response = await get_chain("coherence").ainvoke(inputs, bypass_cache=state.get("bypass_cache", False))
+    final = join_sections(sections, parse_transitions(response.content, len(sections)))
+    return {"final_output": final, "token_usage": {"Coherence": message_usage(response)}}
+
+# Nodes whose tokens reach the UI. With the grammar pre-pass on, the grammar node
+# usually makes no call or a JSON-only one, so the humanized draft is streamed and
+# the proofread text replaces it when the run is done
+FINAL_NODES = ("HumanizeEssay" if GRAMMAR_PREPASS else "GrammarCorrect", "HumanizeGrammar")
+
+def _route_start(state):
+    return "sectioned" if state.get("length") else "single"
+
+def _route_mode(state):
+    return "fast" if state.get("mode") == "fast" else "standard"
+
+def _fan_out(state):
+    from langgraph.types import Send
+
+    # One WriteSection branch per planned section; LangGraph runs them concurrently
+    plan = outline_text(state["outline"])
+    branch = {"topic": state["topic"], "plan": plan, "mode": state.get("mode"), "bypass_cache": state.get("bypass_cache", False)}
+    return [Send("WriteSection", {**branch, "section": section}) for section in state["outline"]]
+
+def _build_graph(generate, humanize, grammar, humanize_grammar, outline, section, assemble):
+    from langgraph.graph import StateGraph, START, END
 
-def create_workflow():
     graph = StateGraph(EssayState)
-    graph.add_node("GenerateEssay", RunnableLambda(generate_essay))
-    graph.add_node("HumanizeEssay", RunnableLambda(humanize_essay))
-    graph.add_node("GrammarCorrect", RunnableLambda(correct_grammar))
-    graph.set_entry_point("GenerateEssay")
-    graph.add_edge("GenerateEssay", "HumanizeEssay")
+    graph.add_node("GenerateEssay", RunnableLambda(generate))
+    graph.add_node("HumanizeEssay", RunnableLambda(humanize))
+    graph.add_node("GrammarCorrect", RunnableLambda(grammar))
+    graph.add_node("HumanizeGrammar", RunnableLambda(humanize_grammar))
+    graph.add_node("Outline", RunnableLambda(outline))
+    graph.add_node("WriteSection", RunnableLambda(section))
+    graph.add_node("Assemble", RunnableLambda(assemble))
+    graph.add_conditional_edges(START, _route_start, {"single": "GenerateEssay", "sectioned": "Outline"})
+    graph.add_conditional_edges("GenerateEssay", _route_mode, {"standard": "HumanizeEssay", "fast": "HumanizeGrammar"})
     graph.add_edge("HumanizeEssay", "GrammarCorrect")
     graph.add_edge("GrammarCorrect", END)
-    return graph.compile()
\ No newline at end of file
+    graph.add_edge("HumanizeGrammar", END)
+    graph.add_conditional_edges("Outline", _fan_out, ["WriteSection"])
+    graph.add_edge("WriteSection", "Assemble")
+    graph.add_edge("Assemble", END)
+    return graph.compile()
+
+# Compiled graphs are cached per process, so repeated calls cost nothing
+def create_workflow():
+    return get_or_create(("workflow", __file__, "sync"), lambda: _build_graph(
+        generate_essay, humanize_essay, correct_grammar, humanize_and_correct,
+        plan_sections, write_section, assemble_sections,
+    ))
+
+def acreate_workflow():
+    # Same graph with async nodes; run it with ainvoke/astream. Never checkpointed:
+    # the SQLite checkpointer is sync-only, and batch jobs resume per job instead.
+    return get_or_create(("workflow", __file__, "async"), lambda: _build_graph(
+        agenerate_essay, ahumanize_essay, acorrect_grammar, ahumanize_and_correct,
+        aplan_sections, awrite_section, aassemble_sections,
+    ))
+
+# State kept for near-duplicate topics; a later run on a similar topic (same mode)
+# returns it instead of running the graph unless bypass_cache is set
+SIMILAR_FIELDS = ("essay", "humanized_essay", "final_output")
+
+RUN_CONFIG = {"max_concurrency": SECTION_WORKERS}
+
+def run_workflow(inputs, job_id=None):
+    # invoke() that resumes an unfinished run with the same job id (default: same inputs)
+    return run_with_similar("essay", inputs, SIMILAR_FIELDS, lambda: run_job(create_workflow(), inputs, "essay", job_id, RUN_CONFIG))
+
+def stream_workflow(inputs, job_id=None):
+    return stream_with_similar(
+        "essay", inputs, SIMILAR_FIELDS,
+        lambda: stream_job(create_workflow(), inputs, FINAL_NODES, "essay", job_id, RUN_CONFIG),
+    )
+
+def astream_workflow(inputs):
+    return astream_with_similar("essay", inputs, SIMILAR_FIELDS, lambda: astream_events(acreate_workflow(), inputs, FINAL_NODES, RUN_CONFIG))
\ No newline at end of file
@@ -1,7 +1,29 @@
 # Essay_streamlit_app.py
 import streamlit as st
-from nodes_workflow import create_workflow, EssayState
-from tools import export_to_pdf
+from src_essay_writer.nodes_workflow import stream_workflow
+from src_essay_writer.tools import render_pdf_bytes, pdf_filename
+from src_core.metrics import capture, span_rows, span_totals
+
+NEXT_STAGE = {
+    "GenerateEssay": "Humanizing essay...",
+    "HumanizeEssay": "Proofreading essay...",
+    "Outline": "Writing sections...",
+    "WriteSection": "Writing sections...",
+    "Assemble": "Assembling essay...",
+}
+
+def show_debug_panel():
+    rows = st.session_state.get("last_trace")
+    if not rows:
+        st.caption("Run the tool once to see the per-stage breakdown.")
+        return
+    with st.expander("🔧 Last run: per-stage breakdown", expanded=True):
+        st.dataframe(rows, use_container_width=True)
+        t = span_totals(rows)
+        st.caption(
+            f"{t['wall_ms']:.0f} ms across stages · {t['queue_ms']:.0f} ms queued · {t['llm_calls']:.0f} LLM calls "
+            f"({t['cache_hits']:.0f} cached) · {t['input_tokens']:.0f} in / {t['output_tokens']:.0f} out tokens · {t['errors']} errors"
+        )
 
 def main():
     st.set_page_config(page_title="AI Essay Writer", layout="centered")
@@ -9,25 +31,60 @@ def main():
     st.markdown("""WELCOME TO THE AI ESSAY WRITER! This tool generates high-quality, PhD-level essays on any topic you provide. It uses advanced AI to create structured, well-researched content with proper academic formatting. You can also download the essay as a PDF file.""")
 
     user_topic = st.text_input("Enter your Essay Topic")
+    bypass_cache = st.checkbox("Regenerate (ignore cached result)")
+    fast_mode = st.checkbox("Fast mode (humanize and proofread in one pass)")
+    long_essay = st.checkbox("Long essay (write sections in parallel)")
+    length = st.number_input("Target length (words)", 2000, 20000, 5000, step=500) if long_essay else 0
     submit = st.button("Generate Essay")
+    show_debug = st.sidebar.checkbox("Show debug panel")
 
     if submit and user_topic:
-        with st.spinner("Generating essay. Please wait..."):
-            workflow = create_workflow()
-            output = workflow.invoke({"topic": user_topic})
-            final_essay = output["final_output"].content
-
-            st.subheader("📄 Final Essay")
-            st.text_area("PhD-Level Essay", final_essay, height=500)
-
-            filename = export_to_pdf(user_topic, final_essay)
-            with open(filename, "rb") as f:
-                st.download_button(
-                    "📥 Download Essay as PDF",
-                    f,
-                    file_name=filename,
-                    mime="application/pdf"
+        status = st.empty()
+        st.subheader("📄 Final Essay")
+        preview = st.empty()
+
+        status.info("Writing essay...")
+        streamed = ""
+        similar = None
+        with capture() as trace:
+            inputs = {"topic": user_topic, "bypass_cache": bypass_cache, "mode": "fast" if fast_mode else "standard", "length": int(length)}
+            for event, payload in stream_workflow(inputs):
+                if event == "stage" and payload in NEXT_STAGE:
+                    status.info(NEXT_STAGE[payload])
+                elif event == "token":
+                    streamed += payload
+                    preview.markdown(streamed)
+                elif event == "similar":
+                    similar = payload
+                elif event == "done":
+                    output = payload
+            status.empty()
+            if similar:
+                st.info(
+                    f"Reused the essay for a similar earlier topic, \"{similar['topic']}\" "
+                    f"({similar['similarity']:.0%} match). Tick **Regenerate** to write a new one."
                 )
+            final_essay = output["final_output"]
+            pdf_bytes = render_pdf_bytes(final_essay)
+        st.session_state.last_trace = span_rows(trace)
+
+        preview.text_area("PhD-Level Essay", final_essay, height=500)
+
+        usage = output.get("token_usage", {})
+        st.caption(" · ".join(
+            f"{node}: {u['input_tokens']} in / {u['output_tokens']} out" + (" (cached)" if u["cached"] else "")
+            for node, u in usage.items()
+        ))
+
+        st.download_button(
+            "📥 Download Essay as PDF",
+            pdf_bytes,
+            file_name=pdf_filename(user_topic),
+            mime="application/pdf"
+        )
+
+    if show_debug:
+        show_debug_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
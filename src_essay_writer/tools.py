@@ -1,45 +1,179 @@
 # tools.py
-from fpdf import FPDF
+from functools import lru_cache
+import copy
+import json
 import re
+from fpdf import FPDF
+import os
+from .layout import iter_blocks
+from src_core.grammar import split_sentences
+from src_core.metrics import traced
+
+JSON_ARRAY = re.compile(r"\[.*\]", re.DOTALL)
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+MIN_SECTION_WORDS = 250
+
+# Unicode serif fonts tried in order: ESSAY_PDF_FONT / ESSAY_PDF_FONT_BOLD, then
+# Windows, Linux and macOS locations. Without any, the built-in Times font is used.
+FONT_CANDIDATES = [
+    (os.getenv("ESSAY_PDF_FONT"), os.getenv("ESSAY_PDF_FONT_BOLD")),
+    ("C:\\Windows\\Fonts\\times.ttf", "C:\\Windows\\Fonts\\timesbd.ttf"),
+    ("/usr/share/fonts/truetype/liberation/LiberationSerif-Regular.ttf", "/usr/share/fonts/truetype/liberation/LiberationSerif-Bold.ttf"),
+    ("/usr/share/fonts/liberation-serif/LiberationSerif-Regular.ttf", "/usr/share/fonts/liberation-serif/LiberationSerif-Bold.ttf"),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSerif-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSerif.ttf", "/usr/share/fonts/dejavu/DejaVuSerif-Bold.ttf"),
+    ("/Library/Fonts/Times New Roman.ttf", "/Library/Fonts/Times New Roman Bold.ttf"),
+]
+# Typographic characters LLMs like to emit that the built-in (latin-1) Times lacks
+CORE_FONT_REPLACEMENTS = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+    "\u2013": "-", "\u2014": "-", "\u2026": "...", "\u2022": "-",
+})
 
 def format_for_pdf(text):
-    lines = text.split("\n")
+    # (style, line) pairs as before, "B" for headings; built on layout.iter_blocks()
     formatted_lines = []
-    for line in lines:
-        clean_line = line.strip()
-        if clean_line:
-            # Bold numbered headings like 1.1, 2.2 etc.
-            if re.match(r"^\d+\.\d+", clean_line):
-                formatted_lines.append(("B", clean_line))
-            # Bold main headings like ## Heading
-            elif clean_line.startswith("##"):
-                formatted_lines.append(("B", clean_line.replace("##", "").strip()))
-            # Bold **text** style
-            elif clean_line.startswith("**") and clean_line.endswith("**"):
-                formatted_lines.append(("B", clean_line.replace("**", "").strip()))
-            # Handle References heading without asterisks
-            elif clean_line.lower().startswith("references"):
-                formatted_lines.append(("B", clean_line.replace("*", "").strip()))
-            else:
-                formatted_lines.append(("", clean_line))
+    for block in iter_blocks(text):
+        if block.kind in ("heading", "references"):
+            formatted_lines.append(("B", block.text))
+        elif block.kind == "list_item":
+            formatted_lines.append(("", f"{block.marker} {block.text}"))
+        else:
+            formatted_lines.append(("", block.text))
     return formatted_lines
 
-def export_to_pdf(topic: str, content: str, filename: str = None):
+@lru_cache(maxsize=1)
+def resolve_fonts():
+    # Returns (regular, bold) TTF paths, or None to use the built-in Times font
+    for regular, bold in FONT_CANDIDATES:
+        if regular and os.path.isfile(regular):
+            return regular, bold if bold and os.path.isfile(bold) else regular
+    return None
+
+def _core_font_text(line):
+    return line.translate(CORE_FONT_REPLACEMENTS).encode("latin-1", "replace").decode("latin-1")
+
+@lru_cache(maxsize=1)
+def _pdf_template():
+    # Fonts are parsed once; each export starts from a copy of this document
     pdf = FPDF()
+    fonts = resolve_fonts()
+    if not fonts:
+        return pdf, "Times", _core_font_text
+    pdf.add_font("EssaySerif", "", fonts[0])
+    pdf.add_font("EssaySerif", "B", fonts[1])
+    return pdf, "EssaySerif", str
+
+@traced("essay")
+def render_pdf_bytes(content: str) -> bytes:
+    # Renders format_for_pdf(content) straight to memory, e.g. for st.download_button
+    template, family, clean = _pdf_template()
+    pdf = copy.deepcopy(template)
     pdf.add_page()
-    pdf.add_font("Times", "", fname="C:\\Windows\\Fonts\\times.ttf", uni=True)
-    pdf.set_font("Times", size=12)
-
-    formatted = format_for_pdf(content)
-    for style, line in formatted:
-        if style == "B":
-            pdf.set_font("Times", "B", 12)
-            pdf.multi_cell(0, 7.5, line)
-            pdf.set_font("Times", "", 12)
+    for block in iter_blocks(content):
+        if block.kind in ("heading", "references"):
+            pdf.set_font(family, "B", 12)
+            pdf.multi_cell(0, 7.5, clean(block.text))
+        elif len(block.spans) == 1 and not block.spans[0].bold and block.kind != "list_item":
+            pdf.set_font(family, "", 12)
+            pdf.multi_cell(0, 6, clean(block.text))
         else:
-            pdf.multi_cell(0, 6, line)
+            # Mixed bold/regular text flows span by span; list items are indented per level
+            pdf.set_x(pdf.l_margin + 6 * block.level)
+            if block.marker:
+                pdf.set_font(family, "", 12)
+                pdf.write(6, clean(block.marker + " "))
+            for span in block.spans:
+                pdf.set_font(family, "B" if span.bold else "", 12)
+                pdf.write(6, clean(span.text))
+            pdf.ln(6)
+        pdf.set_x(pdf.l_margin)
+    return bytes(pdf.output())
+
+def pdf_filename(topic: str) -> str:
+    return topic.strip().replace(" ", "_").replace("/", "-") + ".pdf"
 
+@traced("essay")
+def export_to_pdf(topic: str, content: str, filename: str = None):
     if filename is None:
-        filename = topic.strip().replace(" ", "_").replace("/", "-") + ".pdf"
-    pdf.output(filename)
-    return filename
\ No newline at end of file
+        filename = pdf_filename(topic)
+    with open(filename, "wb") as f:
+        f.write(render_pdf_bytes(content))
+    return filename
+
+# Sectioned long-form essays
+def default_outline(words, section_words):
+    intro = max(MIN_SECTION_WORDS, words // 10)
+    core = max(2, round((words - 2 * intro) / section_words))
+    each = max(MIN_SECTION_WORDS, (words - 2 * intro) // core)
+    return (
+        [{"heading": "Introduction", "points": [], "words": intro}]
+        + [{"heading": f"Core Analysis {i}", "points": [], "words": each} for i in range(1, core + 1)]
+        + [{"heading": "Conclusion", "points": [], "words": intro}]
+    )
+
+def _load_json(pattern, text):
+    match = pattern.search(text or "")
+    try:
+        return json.loads(match.group()) if match else None
+    except ValueError:
+        return None
+
+def parse_outline(text, words, section_words):
+    # [{"index", "heading", "points", "words"}] from the outline reply; a reply that is
+    # not a usable JSON array falls back to default_outline()
+    data = _load_json(JSON_ARRAY, text)
+    sections = []
+    for entry in data if isinstance(data, list) else []:
+        if not isinstance(entry, dict) or not str(entry.get("heading") or "").strip():
+            continue
+        points = entry.get("points") if isinstance(entry.get("points"), list) else []
+        size = entry.get("words")
+        sections.append({
+            "heading": str(entry["heading"]).strip().lstrip("#").strip(),
+            "points": [str(point).strip() for point in points if str(point).strip()],
+            "words": size if isinstance(size, int) and size >= MIN_SECTION_WORDS else 0,
+        })
+    if len(sections) < 3:
+        sections = default_outline(words, section_words)
+    share = max(MIN_SECTION_WORDS, words // len(sections))
+    return [{**section, "index": i, "words": section["words"] or share} for i, section in enumerate(sections)]
+
+def outline_text(sections):
+    return "\n".join(f"{section['index'] + 1}. {section['heading']}" for section in sections)
+
+def points_text(section):
+    return "\n".join(f"- {point}" for point in section["points"]) or f"- the key ideas a section titled \"{section['heading']}\" needs"
+
+def with_heading(text, heading):
+    text = text.strip()
+    return text if text.startswith("#") else f"## {heading}\n\n{text}"
+
+def section_summary(section):
+    # Heading plus first and last full sentences, all the coherence pass needs to see
+    text = section["text"]
+    sentences = [text[start:end] for start, end in split_sentences(text) if len(text[start:end].split()) >= 6]
+    return {
+        "heading": section["heading"],
+        "opening": sentences[0] if sentences else "",
+        "closing": sentences[-1] if sentences else "",
+    }
+
+def parse_transitions(text, count):
+    # {section number: transition sentence} for sections 2..count
+    data = _load_json(JSON_OBJECT, text)
+    transitions = {}
+    for key, value in (data.items() if isinstance(data, dict) else ()):
+        if str(key).isdigit() and 2 <= int(key) <= count and isinstance(value, str) and value.strip():
+            transitions[int(key)] = value.strip()
+    return transitions
+
+def join_sections(sections, transitions):
+    parts = []
+    for number, section in enumerate(sections, start=1):
+        text = section["text"]
+        if number in transitions:
+            heading, _, body = text.partition("\n")
+            text = f"{heading}\n\n{transitions[number]}\n\n{body.strip()}"
+        parts.append(text)
+    return "\n\n".join(parts)
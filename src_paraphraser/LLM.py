@@ -1,22 +1,24 @@
-# config.py
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
-
 # LLM.py
-from langchain_google_genai import ChatGoogleGenerativeAI
+import os
 from langchain_core.prompts import ChatPromptTemplate
+from src_core.cache import CachedChain
+from src_core.config import GEMINI_API_KEY
+from src_core.grammar import SENTENCES_PROMPT
+from src_core.models import get_chat_model
+from src_core.registry import get_or_create
+
+# Long documents are paraphrased in chunks that fit comfortably under max_tokens
+CHUNK_TOKENS = int(os.getenv("PARAPHRASE_CHUNK_TOKENS", 1500))
+MAX_WORKERS = int(os.getenv("PARAPHRASE_MAX_WORKERS", 4))
 
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=GEMINI_API_KEY,
-    temperature=0.7,
-    max_tokens=3000
-)
+def get_llm():
+    return get_chat_model(
+        model="gemini-2.0-flash",
+        google_api_key=GEMINI_API_KEY,
+        temperature=0.7,
+        max_tokens=3000
+    )
 
 # Rephrase Prompt
 rephrase_prompt = ChatPromptTemplate.from_messages([
@@ -36,7 +38,28 @@ grammar_prompt = ChatPromptTemplate.from_messages([
     ("human", "{humanized_paragraph}")
 ])
 
-# Create chains
-rephrase_chain = rephrase_prompt | llm
-humanized_chain = humanize_prompt | llm
-grammar_chain = grammar_prompt | llm
\ No newline at end of file
+# Fast mode: humanize and grammar-correct in a single call
+humanize_grammar_prompt = ChatPromptTemplate.from_messages([
+    ("system", humanize_prompt.messages[0].prompt.template + " Then, in the same pass: " + grammar_prompt.messages[0].prompt.template),
+    ("human", "{rephrased_paragraph}")
+])
+
+PROMPTS = {
+    "rephrase": rephrase_prompt,
+    "humanized": humanize_prompt,
+    "grammar": grammar_prompt,
+    "humanize_grammar": humanize_grammar_prompt,
+    "grammar_sentences": SENTENCES_PROMPT,
+}
+
+# Create chains lazily; clients and chains are shared for the life of the process
+def get_chain(name):
+    return get_or_create(("chain", __file__, name), lambda: CachedChain(PROMPTS[name], get_llm()))
+
+def __getattr__(name):
+    # Keeps `LLM.llm` / `LLM.rephrase_chain` style access working without import-time setup
+    if name == "llm":
+        return get_llm()
+    if name.endswith("_chain") and name[:-len("_chain")] in PROMPTS:
+        return get_chain(name[:-len("_chain")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,36 +1,230 @@
 # nodes_workflow.py
+import hashlib
 from typing import TypedDict
-from langgraph.graph import StateGraph, END
 from langchain_core.runnables import RunnableLambda
-from LLM import rephrase_chain, humanized_chain, grammar_chain
+from .LLM import get_chain, CHUNK_TOKENS, MAX_WORKERS
+from .tools import chunk_text
+from src_core.checkpoint import resumable, begin_job, end_job, run_job
+from src_core.config import GRAMMAR_PREPASS
+from src_core.grammar import proofread, aproofread
+from src_core.metrics import traced
+from src_core.registry import get_or_create
+from src_core.streaming import stream_job, astream_events
 
 class ParaphraserState(TypedDict):
     input_paragraph: str
     rephrased_paragraph: str
     humanized_paragraph: str
     final_output: str
+    bypass_cache: bool
+    # "standard" (three calls) or "fast" (humanize and grammar in one call)
+    mode: str
 
+@traced("paraphrase")
 def rephrase_node(state):
-    response = rephrase_chain.invoke({"input_paragraph": state["input_paragraph"]})
+    response = get_chain("rephrase").invoke({"input_paragraph": state["input_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
     return {"rephrased_paragraph": response.content}
 
+@traced("paraphrase")
 def humanize_node(state):
-    response = humanized_chain.invoke({"rephrased_paragraph": state["rephrased_paragraph"]})
+    response = get_chain("humanized").invoke({"rephrased_paragraph": state["rephrased_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
     return {"humanized_paragraph": response.content}
 
+@traced("paraphrase")
 def grammar_node(state):
-    response = grammar_chain.invoke({"humanized_paragraph": state["humanized_paragraph"]})
+    # LLM only for what the offline pre-pass flags (see src_core/grammar.py)
+    bypass_cache = state.get("bypass_cache", False)
+
+    def full_pass(text):
+        return get_chain("grammar").invoke({"humanized_paragraph": text}, bypass_cache=bypass_cache)
+
+    final, _ = proofread(state["humanized_paragraph"], full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return {"final_output": final}
+
+@traced("paraphrase")
+def humanize_grammar_node(state):
+    response = get_chain("humanize_grammar").invoke({"rephrased_paragraph": state["rephrased_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
     return {"final_output": response.content}
 
-def create_workflow():
+@traced("paraphrase", "rephrase_node")
+async def arephrase_node(state):
+    response = await get_chain("rephrase").ainvoke({"input_paragraph": state["input_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
+    return {"rephrased_paragraph": response.content}
+
+@traced("paraphrase", "humanize_node")
+async def ahumanize_node(state):
+    response = await get_chain("humanized").ainvoke({"rephrased_paragraph": state["rephrased_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
+    return {"humanized_paragraph": response.content}
+
+@traced("paraphrase", "grammar_node")
+async def agrammar_node(state):
+    bypass_cache = state.get("bypass_cache", False)
+
+    async def full_pass(text):
+        return await get_chain("grammar").ainvoke({"humanized_paragraph": text}, bypass_cache=bypass_cache)
+
+    final, _ = await aproofread(state["humanized_paragraph"], full_pass, get_chain("grammar_sentences"), bypass_cache)
+    return {"final_output": final}
+
+@traced("paraphrase", "humanize_grammar_node")
+async def ahumanize_grammar_node(state):
+    response = await get_chain("humanize_grammar").ainvoke({"rephrased_paragraph": state["rephrased_paragraph"]}, bypass_cache=state.get("bypass_cache", False))
+    return {"final_output": response.content}
+
+# Nodes whose tokens reach the UI. With the grammar pre-pass on, the grammar node
+# usually makes no call or a JSON-only one, so the humanized draft is streamed and
+# the proofread text replaces it when the run is done
+FINAL_NODES = ("HUMANIZE" if GRAMMAR_PREPASS else "GRAMMAR", "HUMANIZE_GRAMMAR")
+
+def _route_mode(state):
+    return "fast" if state.get("mode") == "fast" else "standard"
+
+def _build_graph(rephrase, humanize, grammar, humanize_grammar):
+    from langgraph.graph import StateGraph, END
+
     graph = StateGraph(ParaphraserState)
-    graph.add_node("REPHRASE", RunnableLambda(rephrase_node))
-    graph.add_node("HUMANIZE", RunnableLambda(humanize_node))
-    graph.add_node("GRAMMAR", RunnableLambda(grammar_node))
+    graph.add_node("REPHRASE", RunnableLambda(rephrase))
+    graph.add_node("HUMANIZE", RunnableLambda(humanize))
+    graph.add_node("GRAMMAR", RunnableLambda(grammar))
+    graph.add_node("HUMANIZE_GRAMMAR", RunnableLambda(humanize_grammar))
     
     graph.set_entry_point("REPHRASE")
-    graph.add_edge("REPHRASE", "HUMANIZE")
+    graph.add_conditional_edges("REPHRASE", _route_mode, {"standard": "HUMANIZE", "fast": "HUMANIZE_GRAMMAR"})
     graph.add_edge("HUMANIZE", "GRAMMAR")
     graph.add_edge("GRAMMAR", END)
+    graph.add_edge("HUMANIZE_GRAMMAR", END)
     
-    return graph.compile()
\ No newline at end of file
+    return graph.compile()
+
+# Compiled graphs are cached per process, so repeated calls cost nothing
+def create_workflow():
+    return get_or_create(("workflow", __file__, "sync"), lambda: _build_graph(rephrase_node, humanize_node, grammar_node, humanize_grammar_node))
+
+def acreate_workflow():
+    # Same graph with async nodes; run it with ainvoke/astream. Never checkpointed:
+    # the SQLite checkpointer is sync-only, and batch jobs resume per job instead.
+    return get_or_create(("workflow", __file__, "async"), lambda: _build_graph(arephrase_node, ahumanize_node, agrammar_node, ahumanize_grammar_node))
+
+def fingerprint(chunk, mode):
+    return hashlib.sha256(f"{mode}\n{chunk}".encode("utf-8")).hexdigest()
+
+def _plan(text, chunk_tokens, mode, bypass_cache, memo):
+    # With a memo (fingerprint -> output, e.g. kept in session state) every paragraph
+    # is its own chunk, so an edit only sends the paragraphs it touched back to the LLM.
+    chunks = chunk_text(text, chunk_tokens, pack=memo is None)
+    keys = [fingerprint(chunk, mode) for _, chunk in chunks]
+    reuse = memo if memo is not None and not bypass_cache else {}
+    return chunks, keys, [reuse.get(key) for key in keys]
+
+def _stitch(chunks, keys, outputs, memo):
+    # The memo only keeps the current document's paragraphs, so it cannot grow across edits
+    if memo is not None:
+        memo.clear()
+        memo.update(zip(keys, outputs))
+    return "".join(separator + output for (separator, _), output in zip(chunks, outputs))
+
+def _chunk_jobs(workflow, chunks, todo, bypass_cache, mode, max_workers):
+    # One checkpointed job per chunk, so a failed document resumes chunk by chunk;
+    # repeated chunks get one-off job ids of their own
+    inputs, configs = [], []
+    for i in todo:
+        state = {"input_paragraph": chunks[i][1], "bypass_cache": bypass_cache, "mode": mode}
+        start, config = begin_job(workflow, state, "paraphrase", config={"max_concurrency": max_workers})
+        inputs.append(start)
+        configs.append(config)
+    return inputs, configs
+
+def _end_chunk(workflow, config, result):
+    # Chunk results come back with return_exceptions=True so every job is released
+    end_job(workflow, config, failed=isinstance(result, Exception))
+    return result
+
+def paraphrase_document(text, bypass_cache=False, chunk_tokens=CHUNK_TOKENS, max_workers=MAX_WORKERS, mode="standard", memo=None):
+    # Each chunk runs through the full REPHRASE -> HUMANIZE -> GRAMMAR graph;
+    # batch() keeps results in input order while bounding concurrency.
+    chunks, keys, outputs = _plan(text, chunk_tokens, mode, bypass_cache, memo)
+    todo = [i for i, output in enumerate(outputs) if output is None]
+    if todo:
+        workflow = resumable(create_workflow())
+        inputs, configs = _chunk_jobs(workflow, chunks, todo, bypass_cache, mode, max_workers)
+        results = [_end_chunk(workflow, config, result) for config, result in zip(configs, workflow.batch(inputs, configs, return_exceptions=True))]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        for i, result in zip(todo, results):
+            outputs[i] = result["final_output"].strip()
+    return _stitch(chunks, keys, outputs, memo)
+
+async def aparaphrase_document(text, bypass_cache=False, chunk_tokens=CHUNK_TOKENS, mode="standard", memo=None):
+    # Chunk concurrency is bounded by the shared LLM slot limit rather than a thread pool
+    chunks, keys, outputs = _plan(text, chunk_tokens, mode, bypass_cache, memo)
+    todo = [i for i, output in enumerate(outputs) if output is None]
+    if todo:
+        results = await acreate_workflow().abatch(
+            [{"input_paragraph": chunks[i][1], "bypass_cache": bypass_cache, "mode": mode} for i in todo]
+        )
+        for i, result in zip(todo, results):
+            outputs[i] = result["final_output"].strip()
+    return _stitch(chunks, keys, outputs, memo)
+
+def run_workflow(inputs, job_id=None):
+    # invoke() that resumes an unfinished run with the same job id (default: same inputs)
+    return run_job(create_workflow(), inputs, "paraphrase", job_id)
+
+def stream_workflow(inputs, job_id=None):
+    return stream_job(create_workflow(), inputs, FINAL_NODES, "paraphrase", job_id)
+
+def astream_workflow(inputs):
+    return astream_events(acreate_workflow(), inputs, FINAL_NODES)
+
+def stream_document(text, bypass_cache=False, chunk_tokens=CHUNK_TOKENS, max_workers=MAX_WORKERS, mode="standard", memo=None):
+    # Single-chunk inputs stream tokens from the GRAMMAR node; longer documents
+    # report ("stage", "CHUNK i/n") as chunks finish and stream nothing until done.
+    # With a memo, ("stage", "REUSED k/n") first reports how many paragraphs were unchanged.
+    chunks, keys, outputs = _plan(text, chunk_tokens, mode, bypass_cache, memo)
+    todo = [i for i, output in enumerate(outputs) if output is None]
+    if len(todo) < len(chunks):
+        yield "stage", f"REUSED {len(chunks) - len(todo)}/{len(chunks)}"
+    if len(chunks) == 1 and todo:
+        for event, payload in stream_workflow({"input_paragraph": chunks[0][1], "bypass_cache": bypass_cache, "mode": mode}):
+            if event == "done":
+                outputs[0] = payload["final_output"].strip()
+                break
+            yield event, payload
+    elif todo:
+        workflow = resumable(create_workflow())
+        inputs, configs = _chunk_jobs(workflow, chunks, todo, bypass_cache, mode, max_workers)
+        pending = set(range(len(todo)))
+        try:
+            for done, (index, result) in enumerate(workflow.batch_as_completed(inputs, configs, return_exceptions=True), start=1):
+                pending.discard(index)
+                if isinstance(_end_chunk(workflow, configs[index], result), Exception):
+                    raise result
+                outputs[todo[index]] = result["final_output"].strip()
+                yield "stage", f"CHUNK {done}/{len(todo)}"
+        finally:
+            for index in pending:
+                end_job(workflow, configs[index], failed=True)
+    yield "done", {"final_output": _stitch(chunks, keys, outputs, memo)}
+
+async def astream_document(text, bypass_cache=False, chunk_tokens=CHUNK_TOKENS, mode="standard", memo=None):
+    # Async counterpart of stream_document() for the API service; chunk concurrency
+    # is bounded by the shared LLM slot limit
+    chunks, keys, outputs = _plan(text, chunk_tokens, mode, bypass_cache, memo)
+    todo = [i for i, output in enumerate(outputs) if output is None]
+    if len(todo) < len(chunks):
+        yield "stage", f"REUSED {len(chunks) - len(todo)}/{len(chunks)}"
+    if len(chunks) == 1 and todo:
+        async for event, payload in astream_workflow({"input_paragraph": chunks[0][1], "bypass_cache": bypass_cache, "mode": mode}):
+            if event == "done":
+                outputs[0] = payload["final_output"].strip()
+            else:
+                yield event, payload
+    elif todo:
+        inputs = [{"input_paragraph": chunks[i][1], "bypass_cache": bypass_cache, "mode": mode} for i in todo]
+        done = 0
+        async for index, result in acreate_workflow().abatch_as_completed(inputs):
+            outputs[todo[index]] = result["final_output"].strip()
+            done += 1
+            yield "stage", f"CHUNK {done}/{len(todo)}"
+    yield "done", {"final_output": _stitch(chunks, keys, outputs, memo)}
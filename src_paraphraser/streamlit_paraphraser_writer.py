@@ -1,7 +1,26 @@
 # Paraphraser_streamlit_app.py
 import streamlit as st
-from nodes_workflow import create_workflow
-from tools import extract_text_from_pdf, count_words
+from src_paraphraser.nodes_workflow import stream_document
+from src_paraphraser.tools import extract_text_from_pdf, count_words, PDFTooLargeError
+from src_core.metrics import capture, span_rows, span_totals
+
+NEXT_STAGE = {
+    "REPHRASE": "Humanizing...",
+    "HUMANIZE": "Correcting grammar...",
+}
+
+def show_debug_panel():
+    rows = st.session_state.get("last_trace")
+    if not rows:
+        st.caption("Run the tool once to see the per-stage breakdown.")
+        return
+    with st.expander("🔧 Last run: per-stage breakdown", expanded=True):
+        st.dataframe(rows, use_container_width=True)
+        t = span_totals(rows)
+        st.caption(
+            f"{t['wall_ms']:.0f} ms across stages · {t['queue_ms']:.0f} ms queued · {t['llm_calls']:.0f} LLM calls "
+            f"({t['cache_hits']:.0f} cached) · {t['input_tokens']:.0f} in / {t['output_tokens']:.0f} out tokens · {t['errors']} errors"
+        )
 
 def main():
     st.set_page_config(page_title="AI Paraphraser", layout="wide")
@@ -11,7 +30,11 @@ def main():
         st.session_state.input_text = ""
     if "final_output" not in st.session_state:
         st.session_state.final_output = ""
+    # Paragraph fingerprint -> paraphrased paragraph from the last run
+    if "paragraph_memo" not in st.session_state:
+        st.session_state.paragraph_memo = {}
 
+    show_debug = st.sidebar.checkbox("Show debug panel")
     col_input, col_output = st.columns(2)
 
     with col_input:
@@ -19,8 +42,14 @@ def main():
 
         # File uploader
         uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
-        if uploaded_file is not None:
-            st.session_state.input_text = extract_text_from_pdf(uploaded_file)
+        # Extract once per upload; later reruns keep the (possibly edited) text
+        if uploaded_file is not None and st.session_state.get("upload_id") != (uploaded_file.name, uploaded_file.size):
+            st.session_state.upload_id = (uploaded_file.name, uploaded_file.size)
+            try:
+                with st.spinner("Extracting text from PDF..."):
+                    st.session_state.input_text = extract_text_from_pdf(uploaded_file)
+            except PDFTooLargeError as e:
+                st.error(str(e))
 
         # Text input area
         input_value = st.text_area(
@@ -33,6 +62,8 @@ def main():
         st.session_state.input_text = input_value
 
         st.markdown(f"**Word Count:** {count_words(st.session_state.input_text)}")
+        bypass_cache = st.checkbox("Regenerate (ignore cached result)")
+        fast_mode = st.checkbox("Fast mode (humanize and proofread in one pass)")
 
         # Action buttons
         col_a, col_b = st.columns([1, 1])
@@ -40,15 +71,33 @@ def main():
             if st.button("Clear"):
                 st.session_state.input_text = ""
                 st.session_state.final_output = ""
+                st.session_state.paragraph_memo = {}
                 st.rerun()
         with col_b:
             if st.button("Paraphrase"):
                 if st.session_state.input_text.strip():
-                    with st.spinner("Processing..."):
-                        workflow = create_workflow()
-                        result = workflow.invoke({"input_paragraph": st.session_state.input_text})
-                        st.session_state.final_output = result["final_output"]
-                        st.rerun()
+                    status = col_output.empty()
+                    preview = col_output.empty()
+                    status.info("Rephrasing...")
+                    streamed = ""
+                    with capture() as trace:
+                        for event, payload in stream_document(
+                            st.session_state.input_text, bypass_cache=bypass_cache, mode="fast" if fast_mode else "standard",
+                            memo=st.session_state.paragraph_memo,
+                        ):
+                            if event == "stage" and payload in NEXT_STAGE:
+                                status.info(NEXT_STAGE[payload])
+                            elif event == "stage" and payload.startswith("REUSED"):
+                                status.info(f"Reusing {payload.split()[1]} unchanged paragraphs...")
+                            elif event == "stage" and payload.startswith("CHUNK"):
+                                status.info(f"Paraphrased {payload.split()[1]} chunks...")
+                            elif event == "token":
+                                streamed += payload
+                                preview.markdown(streamed)
+                            elif event == "done":
+                                st.session_state.final_output = payload["final_output"]
+                    st.session_state.last_trace = span_rows(trace)
+                    st.rerun()
                 else:
                     st.warning("Please enter a paragraph to paraphrase.")
 
@@ -58,6 +107,8 @@ def main():
             st.text_area("", value=st.session_state.final_output, height=500, key="result_output")
             if st.button("Copy"):
                 st.toast("Copied to clipboard!")
+        if show_debug:
+            show_debug_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
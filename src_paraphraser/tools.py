@@ -1,9 +1,65 @@
 # tools.py
-import PyPDF2
+import re
+from src_core.metrics import traced
+from src_core.pdf_text import extract_pdf_text, iter_pdf_pages, PDFTooLargeError
+from src_core.tokens import estimate_tokens, CHARS_PER_TOKEN
 
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+@traced("paraphrase")
 def extract_text_from_pdf(uploaded_file):
-    reader = PyPDF2.PdfReader(uploaded_file)
-    return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+    return extract_pdf_text(uploaded_file)
 
 def count_words(text):
-    return len(text.split()) if text else 0
\ No newline at end of file
+    return len(text.split()) if text else 0
+
+def split_paragraphs(text):
+    return [p.strip() for p in PARAGRAPH_BREAK.split(text) if p.strip()]
+
+def _pack(pieces, max_tokens):
+    # Space-joined runs of pieces, measured on the joined text so the spaces count too
+    budget = max_tokens * CHARS_PER_TOKEN
+    chunks, current, length = [], [], 0
+    for piece in pieces:
+        if current and length + 1 + len(piece) > budget:
+            chunks.append(" ".join(current))
+            current, length = [], 0
+        length += len(piece) + (1 if current else 0)
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def _split_oversized(paragraph, max_tokens):
+    # Break a paragraph that exceeds the budget at sentence boundaries, and
+    # sentences that still exceed it at word boundaries
+    pieces = []
+    for sentence in SENTENCE_BREAK.split(paragraph):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_pack(sentence.split(), max_tokens))
+    return _pack(pieces, max_tokens)
+
+def chunk_text(text, max_tokens, pack=True):
+    # Returns (separator, chunk) pairs; concatenating separator + chunk in order
+    # rebuilds the paragraph layout. Whole paragraphs are packed together (unless
+    # pack=False) and oversized ones are split, with their continuation joined by a space.
+    budget = max_tokens * CHARS_PER_TOKEN
+    chunks, current, length = [], [], 0
+    for paragraph in split_paragraphs(text):
+        if current and (not pack or length + 2 + len(paragraph) > budget):
+            chunks.append(("\n\n", "\n\n".join(current)))
+            current, length = [], 0
+        if len(paragraph) <= budget:
+            length += len(paragraph) + (2 if current else 0)
+            current.append(paragraph)
+        else:
+            for i, part in enumerate(_split_oversized(paragraph, max_tokens)):
+                chunks.append(("\n\n" if i == 0 else " ", part))
+    if current:
+        chunks.append(("\n\n", "\n\n".join(current)))
+    if chunks:
+        chunks[0] = ("", chunks[0][1])
+    return chunks
\ No newline at end of file
@@ -1,23 +1,27 @@
 
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
-GOOGLE_SEARCH_API_KEY = os.getenv("GOOGLE_SEARCH_API_KEY")
-GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
-
 # LLM.py
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=GEMINI_API_KEY,
-    temperature=0.7,
-    max_tokens=2048
-)
+import os
+from langchain_core.prompts import PromptTemplate
+from src_core.cache import CachedChain
+from src_core.config import GEMINI_API_KEY
+from src_core.models import get_chat_model
+from src_core.registry import get_or_create
+
+MAX_TOKENS = 2048
+# Multi-topic batches: estimated output must fit in this share of MAX_TOKENS, and
+# a 10-item list is assumed to take THESIS_LIST_TOKENS until real replies are seen
+BATCH_OUTPUT_BUDGET = int(MAX_TOKENS * float(os.getenv("THESIS_BATCH_FILL", 0.85)))
+LIST_TOKENS = int(os.getenv("THESIS_LIST_TOKENS", 600))
+# Concurrent calls when single thesis statements are edited
+ITEM_WORKERS = int(os.getenv("THESIS_ITEM_WORKERS", 5))
+
+def get_llm():
+    return get_chat_model(
+        model="gemini-2.0-flash",
+        google_api_key=GEMINI_API_KEY,
+        temperature=0.7,
+        max_tokens=MAX_TOKENS
+    )
 
 thesis_prompt = PromptTemplate(
     input_variables=["topic"],
@@ -61,6 +65,115 @@ CORRECTED THESIS STATEMENTS:
 """
 )
 
-thesis_agent = thesis_prompt | llm
-humanize_agent = humanize_prompt | llm
-grammar_agent = grammar_prompt | llm
\ No newline at end of file
+# Fast mode: humanize and grammar-check the list in a single call
+humanize_grammar_prompt = PromptTemplate(
+    input_variables=["thesis_list"],
+    template=humanize_prompt.template.split("THESIS STATEMENTS:")[0]
+    + "Then, in the same pass: "
+    + grammar_prompt.template.split("THESIS STATEMENTS:")[0].lstrip()
+    + """THESIS STATEMENTS:
+{thesis_list}
+
+FINAL THESIS STATEMENTS:
+"""
+)
+
+# Structured variants: the list comes back as a JSON array of items so each thesis
+# statement can be checked, edited or regenerated on its own
+ITEMS_FORMAT = """
+Return only a JSON array of 10 objects, one per thesis statement, each with the fields "topic" (the subject), "claim" (the complete thesis statement as one sentence) and "points" (a list of 2 to 4 major points). No commentary and no code fences.
+
+TOPIC: {topic}
+
+JSON:
+"""
+
+ITEM_FORMAT = """
+Fix these problems: {problems}
+Keep the same fields and return only the revised JSON object. No commentary and no code fences.
+
+THESIS STATEMENT (JSON):
+{item}
+
+REVISED THESIS STATEMENT (JSON):
+"""
+
+def item_prompt(instructions):
+    return PromptTemplate(input_variables=["item", "problems"], template=instructions.rstrip() + "\n" + ITEM_FORMAT)
+
+item_humanize = """
+You are a human writing assistant. Revise the following thesis statement so it sounds fluent, natural, and as if written by an academic expert. Maintain its topic and meaning.
+"""
+
+item_grammar = """
+You are a grammar expert. Review the following thesis statement for grammar, clarity, and fluency. Correct any mistakes without changing its structure and meaning.
+"""
+
+# Replaces one item of a list; the other claims are listed so the new one differs
+thesis_item_prompt = PromptTemplate(
+    input_variables=["topic", "others"],
+    template="""
+You are a professional academic writing expert. Write one new strong, arguable thesis statement on the following topic. It must argue something different from each of these existing statements:
+{others}
+
+Return only a JSON object with the fields "topic" (the subject), "claim" (the complete thesis statement as one sentence) and "points" (a list of 2 to 4 major points). No commentary and no code fences.
+
+TOPIC: {topic}
+
+JSON:
+"""
+)
+
+# Batched variants of the item prompts: one call handles several topics (or several
+# statements), in and out as a JSON object keyed by topic (or "topic #n"). The
+# instructions avoid braces so the prompt's only JSON is the input.
+BATCH_ITEMS_FORMAT = """
+The input is a JSON object whose keys are thesis topics. Write the thesis statements for every topic separately.
+Return only a JSON object with exactly the same keys, each mapped to a JSON array of 10 objects, one per thesis statement, each with the fields "topic" (the subject), "claim" (the complete thesis statement as one sentence) and "points" (a list of 2 to 4 major points). No commentary and no code fences.
+
+INPUT (JSON):
+{items}
+
+OUTPUT (JSON):
+"""
+
+BATCH_ITEM_FORMAT = """
+The input is a JSON object whose keys identify thesis statements. Each value holds the statement ("item") and the problems to fix in it ("problems"). Apply the instructions above to every entry separately.
+Return only a JSON object with exactly the same keys, each mapped to the revised statement as an object with the same fields as its "item". No commentary and no code fences.
+
+INPUT (JSON):
+{items}
+
+OUTPUT (JSON):
+"""
+
+def batch_prompt(instructions, output_format=BATCH_ITEM_FORMAT):
+    return PromptTemplate(input_variables=["items"], template=instructions.rstrip() + "\n" + output_format)
+
+PROMPTS = {
+    "thesis": thesis_prompt,
+    "humanize": humanize_prompt,
+    "grammar": grammar_prompt,
+    "humanize_grammar": humanize_grammar_prompt,
+    "thesis_items": PromptTemplate(input_variables=["topic"], template=thesis_prompt.template.split("Structure each thesis")[0] + ITEMS_FORMAT),
+    "thesis_item": thesis_item_prompt,
+    "item_humanize": item_prompt(item_humanize),
+    "item_grammar": item_prompt(item_grammar),
+    "item_humanize_grammar": item_prompt(item_humanize.rstrip() + " Then, in the same pass: " + item_grammar.lstrip()),
+    "batch_thesis_items": batch_prompt(thesis_prompt.template.split("Structure each thesis")[0], BATCH_ITEMS_FORMAT),
+    "batch_item_humanize": batch_prompt(item_humanize),
+    "batch_item_grammar": batch_prompt(item_grammar),
+    "batch_item_humanize_grammar": batch_prompt(item_humanize.rstrip() + " Then, in the same pass: " + item_grammar.lstrip()),
+}
+
+# Agents are built on first use and shared for the life of the process
+def get_agent(name):
+    return get_or_create(("chain", __file__, name), lambda: CachedChain(PROMPTS[name], get_llm()))
+
+def __getattr__(name):
+    # Keeps `LLM.llm` / `LLM.thesis_agent` style access working without import-time setup
+    if name == "llm":
+        return get_llm()
+    if name.endswith("_agent") and name[:-len("_agent")] in PROMPTS:
+        return get_agent(name[:-len("_agent")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,31 +1,255 @@
 # nodes_workflow.py
-from langgraph.graph import StateGraph, END
-from LLM import thesis_agent, humanize_agent, grammar_agent
+import asyncio
+import json
+from langchain_core.runnables import RunnableLambda
+from .LLM import get_agent, BATCH_OUTPUT_BUDGET, LIST_TOKENS, ITEM_WORKERS
+from .tools import pack_batches, json_entry_tokens, parse_keyed_json
+from .tools import parse_thesis_items, parse_thesis_item, format_thesis_list, content_issues, surface_issues, fix_items
+from src_core.checkpoint import run_job
+from src_core.concurrency import run_async
+from src_core.metrics import traced
+from src_core.registry import get_or_create
+from src_core.semantic_cache import run_with_similar, stream_with_similar, astream_with_similar
+from src_core.streaming import stream_job, astream_events
 
+# The list is generated as ThesisItems (topic, claim, points). Later stages only send
+# the items that fail the local quality check, one concurrent call per item, and
+# "thesis_list" keeps a markdown rendering for callers that want plain text.
+def _item_inputs(items, issues):
+    return [{"item": json.dumps(items[i], ensure_ascii=False), "problems": "; ".join(problems)} for i, problems in issues.items()]
+
+def _apply_edits(items, issues, replies):
+    items = list(items)
+    for i, reply in zip(issues, replies):
+        items[i] = parse_thesis_item(reply.content, items[i])
+    return items
+
+def edit_items(items, issues, agent, bypass_cache=False):
+    if not issues:
+        return items
+    call = RunnableLambda(lambda inputs: get_agent(agent).invoke(inputs, bypass_cache=bypass_cache))
+    replies = call.batch(_item_inputs(items, issues), config={"max_concurrency": ITEM_WORKERS})
+    return _apply_edits(items, issues, replies)
+
+async def aedit_items(items, issues, agent, bypass_cache=False):
+    if not issues:
+        return items
+    replies = await asyncio.gather(*(get_agent(agent).ainvoke(inputs, bypass_cache=bypass_cache) for inputs in _item_inputs(items, issues)))
+    return _apply_edits(items, issues, replies)
+
+def _merge_issues(*found):
+    merged = {}
+    for issues in found:
+        for i, problems in issues.items():
+            merged.setdefault(i, []).extend(problems)
+    return dict(sorted(merged.items()))
+
+def _all_issues(items):
+    return _merge_issues(content_issues(items), surface_issues(items))
+
+def _with_items(state, items):
+    return {**state, "thesis_items": items, "thesis_list": format_thesis_list(items)}
+
+@traced("thesis")
 def thesis_node(state):
     topic = state.get("topic")
     if not topic:
         raise ValueError("Missing 'topic' in state.")
-    thesis_list = thesis_agent.invoke({"topic": topic}).content
-    return {**state, "thesis_list": thesis_list}
+    reply = get_agent("thesis_items").invoke({"topic": topic}, bypass_cache=state.get("bypass_cache", False))
+    return _with_items(state, parse_thesis_items(reply.content, topic))
 
+@traced("thesis")
 def human_node(state):
-    thesis_list = state.get("thesis_list")
-    human_thesis = humanize_agent.invoke({"thesis_list": thesis_list}).content
-    return {**state, "thesis_list": human_thesis}
+    items = state["thesis_items"]
+    return _with_items(state, edit_items(items, content_issues(items), "item_humanize", state.get("bypass_cache", False)))
 
+@traced("thesis")
 def grammar_node(state):
-    thesis_list = state.get("thesis_list")
-    final_thesis = grammar_agent.invoke({"thesis_list": thesis_list}).content
-    return {**state, "thesis_list": final_thesis}
+    items = fix_items(state["thesis_items"])
+    return _with_items(state, edit_items(items, surface_issues(items), "item_grammar", state.get("bypass_cache", False)))
+
+@traced("thesis")
+def human_grammar_node(state):
+    items = fix_items(state["thesis_items"])
+    issues = _all_issues(items)
+    return _with_items(state, edit_items(items, issues, "item_humanize_grammar", state.get("bypass_cache", False)))
+
+@traced("thesis", "thesis_node")
+async def athesis_node(state):
+    topic = state.get("topic")
+    if not topic:
+        raise ValueError("Missing 'topic' in state.")
+    reply = await get_agent("thesis_items").ainvoke({"topic": topic}, bypass_cache=state.get("bypass_cache", False))
+    return _with_items(state, parse_thesis_items(reply.content, topic))
+
+@traced("thesis", "human_node")
+async def ahuman_node(state):
+    items = state["thesis_items"]
+    return _with_items(state, await aedit_items(items, content_issues(items), "item_humanize", state.get("bypass_cache", False)))
+
+@traced("thesis", "grammar_node")
+async def agrammar_node(state):
+    items = fix_items(state["thesis_items"])
+    return _with_items(state, await aedit_items(items, surface_issues(items), "item_grammar", state.get("bypass_cache", False)))
+
+@traced("thesis", "human_grammar_node")
+async def ahuman_grammar_node(state):
+    items = fix_items(state["thesis_items"])
+    issues = _all_issues(items)
+    return _with_items(state, await aedit_items(items, issues, "item_humanize_grammar", state.get("bypass_cache", False)))
+
+@traced("thesis")
+def regenerate_item(topic, items, index, mode="standard", bypass_cache=True):
+    # Replaces items[index] with a fresh statement and polishes only that one.
+    # Bypasses the cache by default, since the same request would return the same item.
+    others = "\n".join(f"- {item['claim']}" for i, item in enumerate(items) if i != index)
+    reply = get_agent("thesis_item").invoke({"topic": topic, "others": others}, bypass_cache=bypass_cache)
+    items = list(items)
+    items[index] = fix_items([parse_thesis_item(reply.content, items[index])])[0]
+
+    def only(issues):
+        return {index: issues[index]} if index in issues else {}
+
+    if mode == "fast":
+        return edit_items(items, only(_all_issues(items)), "item_humanize_grammar", bypass_cache)
+    items = edit_items(items, only(content_issues(items)), "item_humanize", bypass_cache)
+    return edit_items(items, only(surface_issues(items)), "item_grammar", bypass_cache)
+
+# Edits are per-item JSON, so no stage streams tokens worth showing; callers get
+# stage events and render "thesis_items" when the run is done
+FINAL_NODES = ()
+
+def _route_mode(state):
+    # state["mode"] == "fast" humanizes and grammar-checks in a single call
+    return "fast" if state.get("mode") == "fast" else "standard"
+
+def _build_graph(thesis, human, grammar, human_grammar):
+    from langgraph.graph import StateGraph, END
 
-def create_workflow():
     workflow = StateGraph(dict)
-    workflow.add_node("LLM_THESIS", thesis_node)
-    workflow.add_node("HUMANIZED", human_node)
-    workflow.add_node("GRAMMAR", grammar_node)
+    workflow.add_node("LLM_THESIS", thesis)
+    workflow.add_node("HUMANIZED", human)
+    workflow.add_node("GRAMMAR", grammar)
+    workflow.add_node("HUMANIZED_GRAMMAR", human_grammar)
     workflow.set_entry_point("LLM_THESIS")
-    workflow.add_edge("LLM_THESIS", "HUMANIZED")
+    workflow.add_conditional_edges("LLM_THESIS", _route_mode, {"standard": "HUMANIZED", "fast": "HUMANIZED_GRAMMAR"})
     workflow.add_edge("HUMANIZED", "GRAMMAR")
     workflow.add_edge("GRAMMAR", END)
-    return workflow.compile()
\ No newline at end of file
+    workflow.add_edge("HUMANIZED_GRAMMAR", END)
+    return workflow.compile()
+
+# Compiled graphs are cached per process, so repeated calls cost nothing
+def create_workflow():
+    return get_or_create(("workflow", __file__, "sync"), lambda: _build_graph(thesis_node, human_node, grammar_node, human_grammar_node))
+
+def acreate_workflow():
+    # Same graph with async nodes; run it with ainvoke/astream. Never checkpointed:
+    # the SQLite checkpointer is sync-only, and batch jobs resume per job instead.
+    return get_or_create(("workflow", __file__, "async"), lambda: _build_graph(athesis_node, ahuman_node, agrammar_node, ahuman_grammar_node))
+
+# State kept for near-duplicate topics; a later run on a similar topic (same mode)
+# returns it instead of running the graph unless bypass_cache is set
+SIMILAR_FIELDS = ("thesis_items", "thesis_list")
+
+def run_workflow(inputs, job_id=None):
+    # invoke() that resumes an unfinished run with the same job id (default: same inputs)
+    return run_with_similar("thesis", inputs, SIMILAR_FIELDS, lambda: run_job(create_workflow(), inputs, "thesis", job_id))
+
+def stream_workflow(inputs, job_id=None):
+    return stream_with_similar(
+        "thesis", inputs, SIMILAR_FIELDS,
+        lambda: stream_job(create_workflow(), inputs, FINAL_NODES, "thesis", job_id),
+    )
+
+def astream_workflow(inputs):
+    return astream_with_similar("thesis", inputs, SIMILAR_FIELDS, lambda: astream_events(acreate_workflow(), inputs, FINAL_NODES))
+
+# Multi-topic generation: each stage sends several entries per call as a JSON object
+# keyed by topic (or "topic #n" for one statement), so N topics take far fewer round
+# trips than N single-topic runs. The stages mirror the graph: a list of ThesisItems
+# per topic, then edits for just the items the local checks flag.
+# (batch prompt, single-entry fallback prompt, fallback inputs for one entry)
+THESIS_STAGE = ("batch_thesis_items", "thesis_items", lambda topic: {"topic": topic})
+
+def _edit_stage(agent):
+    return ("batch_" + agent, agent, lambda entry: _item_inputs([entry["item"]], {0: entry["problems"]})[0])
+
+# Running estimate of a generated list's size, used to size first-stage batches
+_list_tokens = LIST_TOKENS
+
+def _stage_cost(stage):
+    if stage is THESIS_STAGE:
+        return lambda topic, _: json_entry_tokens(topic, "") + _list_tokens * 115 // 100
+    return lambda key, entry: json_entry_tokens(key, json.dumps(entry["item"], ensure_ascii=False))
+
+def _observe_lists(lists):
+    global _list_tokens
+    mean = sum(json_entry_tokens("", text) for text in lists) / len(lists)
+    _list_tokens = int(0.7 * _list_tokens + 0.3 * mean)
+
+async def _arun_batch(stage, batch, bypass_cache):
+    # Entries missing from the reply are retried on their own batch; a reply that
+    # does not parse at all (malformed, or truncated at max_tokens) is split in half
+    # and retried. A single entry falls back to the one-entry prompt.
+    batch_name, single_name, single_inputs = stage
+    if len(batch) == 1:
+        (key, value), = batch.items()
+        reply = await get_agent(single_name).ainvoke(single_inputs(value), bypass_cache=bypass_cache)
+        return {key: reply.content.strip()}
+    reply = await get_agent(batch_name).ainvoke({"items": json.dumps(batch, ensure_ascii=False, indent=1)}, bypass_cache=bypass_cache)
+    parsed = parse_keyed_json(reply.content, batch)
+    missing = {key: value for key, value in batch.items() if key not in parsed}
+    if not missing:
+        return parsed
+    if parsed:
+        return {**parsed, **await _arun_batch(stage, missing, bypass_cache)}
+    keys = list(batch)
+    half = len(keys) // 2
+    first, second = await asyncio.gather(
+        _arun_batch(stage, {key: batch[key] for key in keys[:half]}, bypass_cache),
+        _arun_batch(stage, {key: batch[key] for key in keys[half:]}, bypass_cache),
+    )
+    return {**first, **second}
+
+async def _arun_stage(stage, entries, bypass_cache):
+    # {key: reply text} for every entry; batches of a stage run concurrently,
+    # bounded by the shared LLM slot limit
+    batches = pack_batches(entries, _stage_cost(stage), BATCH_OUTPUT_BUDGET)
+    results = await asyncio.gather(*(_arun_batch(stage, batch, bypass_cache) for batch in batches))
+    return {key: value for result in results for key, value in result.items()}
+
+async def _aedit_theses(theses, find_issues, agent, bypass_cache):
+    # aedit_items() for every topic at once
+    entries, owners = {}, {}
+    for topic, items in theses.items():
+        for i, problems in find_issues(items).items():
+            key = f"{topic} #{i + 1}"
+            entries[key] = {"item": items[i], "problems": problems}
+            owners[key] = (topic, i)
+    if not entries:
+        return theses
+    replies = await _arun_stage(_edit_stage(agent), entries, bypass_cache)
+    theses = {topic: list(items) for topic, items in theses.items()}
+    for key, (topic, i) in owners.items():
+        theses[topic][i] = parse_thesis_item(replies[key], theses[topic][i])
+    return theses
+
+@traced("thesis", "generate_theses")
+async def agenerate_theses(topics, mode="standard", bypass_cache=False):
+    # Returns {topic: [ThesisItem, ...]} in input order (duplicates collapsed), the
+    # same items a single-topic run leaves in "thesis_items"
+    topics = [topic for topic in dict.fromkeys(t.strip() for t in topics) if topic]
+    if not topics:
+        return {}
+    lists = await _arun_stage(THESIS_STAGE, {topic: topic for topic in topics}, bypass_cache)
+    _observe_lists([lists[topic] for topic in topics])
+    theses = {topic: parse_thesis_items(lists[topic], topic) for topic in topics}
+    if mode == "fast":
+        theses = {topic: fix_items(items) for topic, items in theses.items()}
+        return await _aedit_theses(theses, _all_issues, "item_humanize_grammar", bypass_cache)
+    theses = await _aedit_theses(theses, content_issues, "item_humanize", bypass_cache)
+    theses = {topic: fix_items(items) for topic, items in theses.items()}
+    return await _aedit_theses(theses, surface_issues, "item_grammar", bypass_cache)
+
+def generate_theses(topics, mode="standard", bypass_cache=False):
+    return run_async(agenerate_theses(topics, mode, bypass_cache))
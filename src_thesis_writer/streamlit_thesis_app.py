@@ -1,7 +1,76 @@
 # Thesis_streamlit_app.py
+import contextvars
 import streamlit as st
-from nodes_workflow import create_workflow
-from tools import fetch_related_articles
+from concurrent.futures import ThreadPoolExecutor
+from src_thesis_writer.nodes_workflow import stream_workflow, regenerate_item
+from src_thesis_writer.tools import fetch_related_articles, format_thesis_list
+from src_core.metrics import capture, span_rows, span_totals
+
+NEXT_STAGE = {
+    "LLM_THESIS": "Humanizing thesis statements...",
+    "HUMANIZED": "Checking grammar...",
+}
+FAST_STAGE = "Polishing thesis statements..."
+
+# The article search is independent of the LLM graph, so it runs in the background
+# while the thesis statements stream in. One pool is shared across reruns and sessions.
+@st.cache_resource
+def get_search_pool():
+    return ThreadPoolExecutor(max_workers=4)
+
+def submit_search(topic):
+    # Run in a copy of the caller's context so the search shows up in its trace
+    return get_search_pool().submit(contextvars.copy_context().run, fetch_related_articles, topic)
+
+def store_related_articles(topic, search):
+    st.session_state.articles_topic = topic
+    st.session_state.articles_error = None
+    with st.spinner("Searching for articles..."):
+        try:
+            st.session_state.articles = search.result()
+        except Exception as e:
+            st.session_state.articles = []
+            st.session_state.articles_error = str(e)
+
+def show_thesis_items():
+    # One row per thesis statement, each with its own regenerate button; the
+    # markdown download is built from the same items, so it follows every edit
+    items = st.session_state.get("thesis_items")
+    if not items:
+        return
+    for i, item in enumerate(items):
+        text_col, button_col = st.columns([12, 1])
+        with text_col:
+            st.markdown(f"{i + 1}. **{item['topic']}**: {item['claim']}")
+            if item["points"]:
+                st.caption("Major points: " + "; ".join(item["points"]))
+        with button_col:
+            if st.button("↻", key=f"regenerate_{i}", help="Regenerate this thesis statement"):
+                with capture() as trace:
+                    with st.spinner("Regenerating thesis statement..."):
+                        items = regenerate_item(st.session_state.thesis_topic, items, i, st.session_state.thesis_mode)
+                st.session_state.thesis_items = items
+                st.session_state.last_trace = span_rows(trace)
+                st.experimental_rerun()
+    st.download_button(
+        "📥 Download Thesis Statements",
+        format_thesis_list(items),
+        file_name="thesis_statements.md",
+        mime="text/markdown"
+    )
+
+def show_debug_panel():
+    rows = st.session_state.get("last_trace")
+    if not rows:
+        st.caption("Run the tool once to see the per-stage breakdown.")
+        return
+    with st.expander("🔧 Last run: per-stage breakdown", expanded=True):
+        st.dataframe(rows, use_container_width=True)
+        t = span_totals(rows)
+        st.caption(
+            f"{t['wall_ms']:.0f} ms across stages · {t['queue_ms']:.0f} ms queued · {t['llm_calls']:.0f} LLM calls "
+            f"({t['cache_hits']:.0f} cached) · {t['input_tokens']:.0f} in / {t['output_tokens']:.0f} out tokens · {t['errors']} errors"
+        )
 
 def main():
     st.set_page_config(page_title="Thesis Statement Generator", layout="wide")
@@ -16,6 +85,9 @@ def main():
             main_idea = st.text_input("Main idea about topic (optional):", placeholder="ex: Junk food is bad for the body")
             reason = st.text_input("Reason supporting main idea (optional):", placeholder="ex: Junk food creates health issues")
             audience = st.text_input("Intended audience (optional):", placeholder="ex: College students")
+            bypass_cache = st.checkbox("Regenerate (ignore cached result)")
+            fast_mode = st.checkbox("Fast mode (humanize and proofread in one pass)")
+            show_debug = st.sidebar.checkbox("Show debug panel")
 
             colA, colB = st.columns([1, 1])
             with colA:
@@ -27,46 +99,65 @@ def main():
 
         with col2:
             st.header("Result")
-            result_placeholder = st.empty()
+            status_placeholder = st.empty()
 
         if generate:
             if thesis_topic.strip() == "":
                 st.warning("Please enter a thesis topic.")
             else:
-                with st.spinner("Generating thesis statements..."):
-                    full_topic = thesis_topic
-                    if main_idea:
-                        full_topic += f" - {main_idea}"
-                    if reason:
-                        full_topic += f" - because {reason}"
-                    if audience:
-                        full_topic += f" - for {audience}"
-
-                    workflow = create_workflow()
-                    result = workflow.invoke({"topic": full_topic})
-                    result_text = result["thesis_list"]
-
-                    result_placeholder.markdown(result_text)
-                    st.session_state.result_text = result_text
+                full_topic = thesis_topic
+                if main_idea:
+                    full_topic += f" - {main_idea}"
+                if reason:
+                    full_topic += f" - because {reason}"
+                if audience:
+                    full_topic += f" - for {audience}"
+
+                mode = "fast" if fast_mode else "standard"
+                with capture() as trace:
+                    search = submit_search(thesis_topic)
+                    status_placeholder.info("Generating thesis statements...")
+                    for event, payload in stream_workflow({"topic": full_topic, "bypass_cache": bypass_cache, "mode": mode}):
+                        if event == "stage" and payload in NEXT_STAGE:
+                            status_placeholder.info(FAST_STAGE if fast_mode else NEXT_STAGE[payload])
+                        elif event == "similar":
+                            st.info(
+                                f"Reused the statements for a similar earlier topic, \"{payload['topic']}\" "
+                                f"({payload['similarity']:.0%} match). Tick **Regenerate** for new ones."
+                            )
+                        elif event == "done":
+                            st.session_state.thesis_items = payload["thesis_items"]
+                    status_placeholder.empty()
+
+                    st.session_state.thesis_topic = full_topic
+                    st.session_state.thesis_mode = mode
+                    store_related_articles(thesis_topic, search)
+                st.session_state.last_trace = span_rows(trace)
+
+        with col2:
+            show_thesis_items()
 
     # Related Articles Section
     st.markdown("---")
     st.subheader("🔍 Related Articles and Papers")
 
-    if thesis_topic.strip():
-        with st.spinner("Searching for articles..."):
-            try:
-                articles = fetch_related_articles(thesis_topic)
-                if articles:
-                    st.success("Here are related articles and papers:")
-                    for i, article in enumerate(articles, start=1):
-                        st.markdown(f"{i}. {article}")
-                else:
-                    st.warning("No recent articles found. Try refining your topic.")
-            except Exception as e:
-                st.error(f"Error fetching articles: {str(e)}")
+    # Search only on an explicit request (Generate or Find Articles), not on every rerun
+    if st.button("Find Articles") and thesis_topic.strip():
+        store_related_articles(thesis_topic, submit_search(thesis_topic))
+
+    if "articles" not in st.session_state:
+        st.info("Enter a topic and click Generate or Find Articles to fetch related articles.")
+    elif st.session_state.articles_error:
+        st.error(f"Error fetching articles: {st.session_state.articles_error}")
+    elif st.session_state.articles:
+        st.success(f"Here are related articles and papers for \"{st.session_state.articles_topic}\":")
+        for i, article in enumerate(st.session_state.articles, start=1):
+            st.markdown(f"{i}. {article}")
     else:
-        st.info("Enter a topic to fetch related articles.")
+        st.warning("No recent articles found. Try refining your topic.")
+
+    if show_debug:
+        show_debug_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
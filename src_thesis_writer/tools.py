@@ -1,17 +1,219 @@
 # tools.py
-from langchain.utilities import GoogleSearchAPIWrapper
+import json
 import os
+import re
+from collections import Counter
+from typing import List, TypedDict
 from dotenv import load_dotenv
+
+from src_core.cache import TTLCache
+from src_core.config import SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES
+from src_core.grammar import check_text, fix_text
+from src_core.metrics import traced
+from src_core.registry import get_or_create
+from src_core.tokens import estimate_tokens
+
 load_dotenv()
 # Configuration for Google Search API
 GOOGLE_SEARCH_API_KEY = os.getenv("GOOGLE_SEARCH_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+JSON_ARRAY = re.compile(r"\[.*\]", re.DOTALL)
+LIST_LINE = re.compile(r"^\s*(?:\d+[.)]|[-*\u2022])\s+(.+)$")
+WORD = re.compile(r"[a-z0-9']+")
+
+# Local quality check thresholds
+MIN_CLAIM_WORDS = 8
+MAX_CLAIM_WORDS = 60
+MIN_POINTS = 2
+DUPLICATE_SIMILARITY = 0.7
+
+# One Custom Search request per distinct topic until the entry expires
+_article_cache = TTLCache(ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES, kind="search")
+
+
+def get_search_client():
+    def build():
+        from langchain.utilities import GoogleSearchAPIWrapper
+
+        return GoogleSearchAPIWrapper(
+            google_api_key=GOOGLE_SEARCH_API_KEY,
+            google_cse_id=GOOGLE_CSE_ID
+        )
+
+    return get_or_create(("search_client", GOOGLE_SEARCH_API_KEY, GOOGLE_CSE_ID), build)
+
+
+def normalize_topic(topic):
+    return " ".join(topic.lower().split())
+
+
+@traced("thesis")
 def fetch_related_articles(topic):
-    search = GoogleSearchAPIWrapper(
-        google_api_key=GOOGLE_SEARCH_API_KEY,
-        google_cse_id=GOOGLE_CSE_ID
-    )
-    query = f"{topic} research paper"
-    results = search.results(query, num_results=10)
-    return [f"[{item['title']}]({item['link']})" for item in results]
\ No newline at end of file
+    key = normalize_topic(topic)
+    articles = _article_cache.get(key)
+    if articles is None:
+        query = f"{key} research paper"
+        results = get_search_client().results(query, num_results=10)
+        articles = [f"[{item['title']}]({item['link']})" for item in results if "link" in item]
+        _article_cache.set(key, articles)
+    return articles
+
+
+def pack_batches(items, cost, budget):
+    # Greedy, order-preserving split of {key: value} into dicts whose summed
+    # cost(key, value) stays within budget; an oversized item gets a batch of its own
+    batches, current, size = [], {}, 0
+    for key, value in items.items():
+        tokens = cost(key, value)
+        if current and size + tokens > budget:
+            batches.append(current)
+            current, size = {}, 0
+        current[key] = value
+        size += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def json_entry_tokens(key, value):
+    # A value re-emitted inside a JSON object, with quoting/escaping headroom
+    return estimate_tokens(key) + estimate_tokens(value) * 115 // 100 + 8
+
+
+def parse_keyed_json(text, keys):
+    # {key: text} for the expected keys the reply answered; empty when the reply is
+    # not a JSON object at all (e.g. malformed, or cut off at max_tokens). A list of
+    # strings becomes a numbered list, and objects (or lists of them) stay JSON text
+    # for parse_thesis_items() / parse_thesis_item(). Reply keys
+    # match exactly first; a key the model re-cased or re-spaced only counts when
+    # no other expected key or reply key normalizes to the same text.
+    match = JSON_OBJECT.search(text or "")
+    if match is None:
+        return {}
+    try:
+        data = json.loads(match.group())
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    exact = {str(key): value for key, value in data.items()}
+    loose = {}
+    for key, value in exact.items():
+        loose.setdefault(normalize_topic(key), []).append(value)
+    expected = Counter(normalize_topic(key) for key in keys)
+    result = {}
+    for key in keys:
+        value = exact.get(key)
+        candidates = loose.get(normalize_topic(key), [])
+        if value is None and len(candidates) == 1 and expected[normalize_topic(key)] == 1:
+            value = candidates[0]
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            value = "\n".join(f"{i}. {item}" for i, item in enumerate(value, start=1))
+        elif isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        if isinstance(value, str) and value.strip():
+            result[key] = value.strip()
+    return result
+
+
+class ThesisItem(TypedDict):
+    topic: str
+    claim: str
+    points: List[str]
+
+
+def make_item(data, topic):
+    points = data.get("points") or []
+    if isinstance(points, str):
+        points = re.split(r"[;\n]", points)
+    return {
+        "topic": str(data.get("topic") or topic).strip(),
+        "claim": str(data.get("claim") or "").strip(),
+        "points": [str(point).strip() for point in points if str(point).strip()],
+    }
+
+
+def parse_thesis_items(text, topic):
+    # ThesisItems from a JSON array reply; a free-text list falls back to one
+    # claim per numbered or bulleted line, which the quality check then flags
+    match = JSON_ARRAY.search(text or "")
+    if match:
+        try:
+            data = json.loads(match.group())
+        except ValueError:
+            data = None
+        if isinstance(data, list):
+            items = [make_item(entry, topic) for entry in data if isinstance(entry, dict)]
+            if items:
+                return items
+    lines = (LIST_LINE.match(line) for line in (text or "").splitlines())
+    return [{"topic": topic, "claim": line.group(1).strip(), "points": []} for line in lines if line]
+
+
+def parse_thesis_item(text, fallback):
+    # One edited ThesisItem, or the fallback when the reply has no usable object
+    match = JSON_OBJECT.search(text or "")
+    try:
+        data = json.loads(match.group()) if match else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return fallback
+    item = make_item(data, fallback["topic"])
+    return item if item["claim"] else fallback
+
+
+def format_thesis_list(items):
+    lines = []
+    for i, item in enumerate(items, start=1):
+        lines.append(f"{i}. **{item['topic']}**: {item['claim']}")
+        if item["points"]:
+            lines.append(f"   *Major points:* {'; '.join(item['points'])}")
+    return "\n".join(lines)
+
+
+def content_issues(items):
+    # {index: [problem, ...]} for items whose substance needs rewriting: a missing or
+    # badly sized claim, too few major points, or a near-duplicate of an earlier item
+    issues, seen = {}, []
+    for i, item in enumerate(items):
+        problems = []
+        words = WORD.findall(item["claim"].lower())
+        if len(words) < MIN_CLAIM_WORDS:
+            problems.append("the claim is missing or too short to be arguable")
+        elif len(words) > MAX_CLAIM_WORDS:
+            problems.append("the claim is too long; keep it to one sentence")
+        if len(item["points"]) < MIN_POINTS:
+            problems.append(f"it needs at least {MIN_POINTS} major points")
+        words = set(words)
+        for j, other in seen:
+            if words and len(words & other) / len(words | other) >= DUPLICATE_SIMILARITY:
+                problems.append(f"it repeats statement {j + 1}; argue a different position")
+                break
+        seen.append((i, words))
+        if problems:
+            issues[i] = problems
+    return issues
+
+
+def fix_items(items):
+    # The offline grammar pre-pass's mechanical fixes, applied to every claim and point
+    return [
+        {**item, "claim": fix_text(item["claim"])[0], "points": [fix_text(point)[0] for point in item["points"]]}
+        for item in items
+    ]
+
+
+def surface_issues(items):
+    # {index: [problem, ...]} for items with writing errors fix_items() cannot repair
+    issues = {}
+    for i, item in enumerate(items):
+        claim = item["claim"]
+        problems = [problem for found in check_text(claim).flagged.values() for problem in found]
+        if claim and claim[-1] not in ".!?":
+            problems.append("the claim should end with a full stop")
+        if problems:
+            issues[i] = list(dict.fromkeys(problems))
+    return issues
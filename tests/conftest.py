@@ -0,0 +1,11 @@
+# conftest.py
+# Every test runs against the offline LLM stand-in, with caches and checkpoints in
+# a throwaway directory. Set before any src_* module reads src_core.config.
+import os
+import tempfile
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["AI_TOOLS_CACHE_DIR"] = tempfile.mkdtemp(prefix="ai_tools_tests_")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SEC", "1000000")
+for name in ("RESPONSE_CACHE_PATH", "CHECKPOINT_PATH"):
+    os.environ.pop(name, None)
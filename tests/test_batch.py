@@ -0,0 +1,89 @@
+# test_batch.py
+import asyncio
+import io
+import json
+import sqlite3
+
+import pytest
+
+from src_core import batch
+from src_core.ratelimit import CircuitOpenError
+
+
+def write_jobs(path, *records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return str(path)
+
+
+def read_results(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+def test_read_jobs_takes_ids_tools_and_fields(tmp_path):
+    path = write_jobs(
+        tmp_path / "jobs.jsonl",
+        {"job_id": 7, "topic": "Urban heat", "length": 3000},
+        {"tool": "paraphrase", "text": "A paragraph.", "mode": "fast"},
+    )
+    jobs = batch.read_jobs(path, "essay", None)
+    assert [(job["id"], job["tool"], job["input"], job["mode"], job["length"]) for job in jobs] == [
+        ("7", "essay", "Urban heat", "standard", 3000),
+        ("2", "paraphrase", "A paragraph.", "fast", 0),
+    ]
+
+
+@pytest.mark.parametrize("record, message", [
+    ({"topic": "x"}, "unknown or missing tool"),
+    ({"tool": "essay", "text": "x"}, "missing input field 'topic'"),
+])
+def test_read_jobs_rejects_bad_lines(tmp_path, record, message):
+    with pytest.raises(ValueError, match=message):
+        batch.read_jobs(write_jobs(tmp_path / "jobs.jsonl", record), None, None)
+
+
+def test_batch_runs_every_tool_and_resumes(tmp_path):
+    jobs = [
+        {"id": "essay", "tool": "essay", "input": "Urban heat", "mode": "fast", "bypass_cache": False, "length": 0},
+        {"id": "thesis", "tool": "thesis", "input": "Urban heat", "mode": "standard", "bypass_cache": False, "length": 0},
+        {"id": "para", "tool": "paraphrase", "input": "Rainfall has declined.", "mode": "standard", "bypass_cache": False, "length": 0},
+    ]
+    output = str(tmp_path / "results.jsonl")
+    summary = asyncio.run(batch.run_batch(jobs, output, log=io.StringIO()))
+    assert (summary["succeeded"], summary["failed"], summary["skipped"]) == (3, 0, 0)
+    assert {record["id"] for record in read_results(output) if record["status"] == "ok"} == {"essay", "thesis", "para"}
+
+    summary = asyncio.run(batch.run_batch(jobs, output, log=io.StringIO()))
+    assert (summary["succeeded"], summary["skipped"]) == (0, 3)
+
+
+def failing_job(*errors):
+    pending = list(errors)
+
+    async def run_job(job):
+        if pending:
+            raise pending.pop(0)
+        return "done"
+
+    return run_job
+
+
+def test_failures_outside_llm_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(batch, "run_job", failing_job(sqlite3.OperationalError("database is locked")))
+    assert asyncio.run(batch.run_with_retries({}, max_retries=2, base_delay=0.0)) == ("done", 1)
+
+
+@pytest.mark.parametrize("error", [
+    RuntimeError("429 Resource exhausted"),
+    RuntimeError("503 Service unavailable"),
+    CircuitOpenError("provider is failing"),
+])
+def test_llm_failures_are_not_retried_again(monkeypatch, error):
+    monkeypatch.setattr(batch, "run_job", failing_job(error))
+    with pytest.raises(type(error)):
+        asyncio.run(batch.run_with_retries({}, max_retries=2, base_delay=0.0))
+
+
+def test_percentile_is_nearest_rank():
+    assert batch.percentile([], 95) == 0.0
+    assert batch.percentile([3, 1, 2, 4], 50) == 2
+    assert batch.percentile([3, 1, 2, 4], 95) == 4
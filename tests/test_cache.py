@@ -0,0 +1,93 @@
+# test_cache.py
+import asyncio
+import time
+
+import pytest
+from langchain_core.prompts import PromptTemplate
+
+from src_core.cache import CachedChain, ResponseCache, TTLCache
+from src_core.fake_llm import FakeChatModel
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), ttl=0, max_entries=100, max_bytes=10**6)
+
+
+class CountingModel(FakeChatModel):
+    def _respond(self, messages):
+        self.calls.append(messages[-1].content)
+        return super()._respond(messages)
+
+
+def make_chain(cache, temperature=0.0):
+    prompt = PromptTemplate(input_variables=["text"], template="Rewrite: {text}")
+    return CachedChain(prompt, CountingModel(temperature=temperature), cache)
+
+
+def test_entries_persist_across_instances(cache):
+    cache.set("k", "value")
+    reopened = ResponseCache(cache.path, ttl=0, max_entries=100, max_bytes=10**6)
+    assert reopened.get("k") == "value"
+    assert reopened.get("missing") is None
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.ttl = 60
+    cache.set("k", "value")
+    now = time.time()
+    monkeypatch.setattr("src_core.cache.time.time", lambda: now + 61)
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "lru.sqlite3"), ttl=0, max_entries=2, max_bytes=10**6)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+
+def test_size_limit_is_enforced(tmp_path):
+    cache = ResponseCache(str(tmp_path / "size.sqlite3"), ttl=0, max_entries=100, max_bytes=10)
+    cache.set("a", "x" * 6)
+    cache.set("b", "y" * 6)
+    assert cache.get("a") is None and cache.get("b") == "y" * 6
+
+
+def test_repeated_calls_are_served_from_the_cache(cache):
+    chain = make_chain(cache)
+    first = chain.invoke({"text": "hello"})
+    second = chain.invoke({"text": "hello"})
+    assert second.content == first.content
+    assert second.response_metadata.get("cache_hit") and len(chain.llm.calls) == 1
+
+    chain.invoke({"text": "hello"}, bypass_cache=True)
+    chain.invoke({"text": "other"})
+    assert len(chain.llm.calls) == 3
+
+
+def test_async_calls_share_the_sync_entries(cache):
+    chain = make_chain(cache)
+    chain.invoke({"text": "hello"})
+    reply = asyncio.run(chain.ainvoke({"text": "hello"}))
+    assert reply.response_metadata.get("cache_hit") and len(chain.llm.calls) == 1
+
+
+def test_model_settings_are_part_of_the_key(cache):
+    assert make_chain(cache).cache_key({"text": "a"}) != make_chain(cache, temperature=0.7).cache_key({"text": "a"})
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src_core.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None and cache.get("b") == 2
+    now[0] = 11
+    assert cache.get("b") is None
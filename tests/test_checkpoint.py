@@ -0,0 +1,124 @@
+# test_checkpoint.py
+import sqlite3
+import time
+from typing import TypedDict
+
+import pytest
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, StateGraph
+
+from src_core.checkpoint import JobClaims, begin_job, end_job, get_job_claims, resumable, run_job
+
+
+class State(TypedDict, total=False):
+    topic: str
+    draft: str
+    final: str
+
+
+def make_workflow(calls, fail_times=0):
+    # draft -> finish, where finish raises on its first fail_times calls
+    def draft(state):
+        calls.append("draft")
+        return {"draft": state["topic"].upper()}
+
+    def finish(state):
+        calls.append("finish")
+        if calls.count("finish") <= fail_times:
+            raise RuntimeError("grammar stage failed")
+        return {"final": state["draft"] + "!"}
+
+    graph = StateGraph(State)
+    graph.add_node("draft", draft)
+    graph.add_node("finish", finish)
+    graph.set_entry_point("draft")
+    graph.add_edge("draft", "finish")
+    graph.add_edge("finish", END)
+    return graph.compile()
+
+
+def thread_ids(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")}
+
+
+@pytest.fixture
+def claims(tmp_path):
+    return JobClaims(str(tmp_path / "claims.sqlite3"), stale_after=60, keep_for=3600)
+
+
+def test_claim_is_new_busy_then_resumable(claims):
+    assert claims.claim("job") == "new"
+    assert claims.claim("job") == "busy"
+    claims.release("job", failed=True)
+    assert claims.claim("job") == "resume"
+    claims.release("job")
+    assert claims.claim("job") == "new"
+
+
+def test_abandoned_running_claim_can_be_taken_over(claims):
+    claims.claim("job")
+    claims._conn.execute("UPDATE job_claims SET updated = ?", (time.time() - 120,))
+    assert claims.claim("job") == "resume"
+
+
+def test_failed_run_resumes_from_last_completed_node():
+    calls = []
+    workflow = make_workflow(calls, fail_times=1)
+    with pytest.raises(RuntimeError):
+        run_job(workflow, {"topic": "heat"}, "test-resume")
+    assert run_job(workflow, {"topic": "heat"}, "test-resume")["final"] == "HEAT!"
+    assert calls == ["draft", "finish", "finish"]
+
+
+def test_bypass_cache_starts_afresh_after_failure():
+    calls = []
+    workflow = make_workflow(calls, fail_times=1)
+    with pytest.raises(RuntimeError):
+        run_job(workflow, {"topic": "rain"}, "test-bypass")
+    run_job(workflow, {"topic": "rain", "bypass_cache": True}, "test-bypass")
+    assert calls == ["draft", "finish", "draft", "finish"]
+
+
+def test_finished_run_leaves_no_claim_or_checkpoints():
+    workflow = resumable(make_workflow([]))
+    start, config = begin_job(workflow, {"topic": "wind"}, "test-done")
+    workflow.invoke(start, config)
+    end_job(workflow, config)
+    thread_id = config["configurable"]["thread_id"]
+    assert not workflow.checkpointer.get_tuple(config)
+    assert get_job_claims().claim(thread_id) == "new"
+    get_job_claims().release(thread_id)
+
+
+def test_busy_job_runs_under_a_one_off_id_that_is_never_kept():
+    workflow = resumable(make_workflow([], fail_times=1))
+    _, first = begin_job(workflow, {"topic": "snow"}, "test-busy")
+    start, second = begin_job(workflow, {"topic": "snow"}, "test-busy")
+    assert start == {"topic": "snow"}
+    assert second["configurable"]["thread_id"].startswith(first["configurable"]["thread_id"] + ":")
+    with pytest.raises(RuntimeError):
+        workflow.invoke(start, second)
+    end_job(workflow, second, failed=True)
+    assert not workflow.checkpointer.get_tuple(second)
+    assert get_job_claims().claim(second["configurable"]["thread_id"]) == "new"
+    end_job(workflow, first)
+
+
+def test_prune_drops_expired_failures_and_orphan_threads(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    workflow = make_workflow([], fail_times=3).copy({"checkpointer": saver})
+    claims = JobClaims(path, stale_after=60, keep_for=3600)
+    for thread_id in ("old", "recent", "orphan"):
+        claims.claim(thread_id)
+        with pytest.raises(RuntimeError):
+            workflow.invoke({"topic": thread_id}, {"configurable": {"thread_id": thread_id}})
+        claims.release(thread_id, failed=True)
+    claims._conn.execute("DELETE FROM job_claims WHERE thread_id = 'orphan'")
+    claims._conn.execute("UPDATE job_claims SET updated = ? WHERE thread_id = 'old'", (time.time() - 7200,))
+
+    assert claims.prune() == 2
+    assert thread_ids(path) == {"recent"}
+    assert claims.claim("old") == "new"
+    assert claims.claim("recent") == "resume"
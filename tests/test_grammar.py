@@ -0,0 +1,64 @@
+# test_grammar.py
+import pytest
+
+from src_core.grammar import apply_corrections, check_text, fix_text, split_sentences
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("It is is important.", "It is important."),
+    ("The the crops failed.", "The crops failed."),
+    ("This is important ,because it rains.", "This is important, because it rains."),
+    ("We recieve alot of rain.", "We receive a lot of rain."),
+    ("It could of worked!!", "It could have worked!"),
+])
+def test_mechanical_errors_are_fixed(text, expected):
+    assert fix_text(text)[0] == expected
+
+
+@pytest.mark.parametrize("text", [
+    "We flew to Bora Bora and then to Walla Walla.",
+    "That that is true had had an effect.",
+    "See https://example.com/a,b;c for details.",
+    "Visit www.site.Com today.",
+    "Run main.Py first.",
+    "Write `x ,y` and keep snake_case names.",
+    "For each i, compute the sum.",
+])
+def test_names_urls_code_and_identifiers_are_left_alone(text):
+    assert fix_text(text) == (text, 0)
+
+
+def test_fixes_still_apply_next_to_protected_spans():
+    assert fix_text("Mail a.b@x.co ,please.")[0] == "Mail a.b@x.co, please."
+
+
+@pytest.mark.parametrize("text, problem", [
+    ("For each i, compute the sum of the values.", "lowercase 'i' (should it be 'I'?)"),
+    ("The crops failed.They were never replanted.", "missing space after a full stop"),
+    ("He bought a apple at the market today.", "'a' before a vowel sound"),
+])
+def test_ambiguous_cases_are_flagged_not_rewritten(text, problem):
+    report = check_text(text)
+    assert report.text == text
+    assert problem in report.flagged[0]
+
+
+def test_urls_are_hidden_from_flags():
+    assert check_text("The data is at www.site.Com for anyone to read.").action == "skip"
+
+
+def test_clean_text_skips_the_llm():
+    assert check_text("Rainfall has declined. Farmers adapted quickly.").action == "skip"
+
+
+def test_split_sentences_keeps_abbreviations_and_markers():
+    text = "# Heading\n- First point, e.g. this one. Second sentence here."
+    assert [text[start:end] for start, end in split_sentences(text)] == [
+        "Heading", "First point, e.g. this one.", "Second sentence here.",
+    ]
+
+
+def test_apply_corrections_keeps_unanswered_sentences():
+    report = check_text("He ate a apple. It was nice. She saw a owl.")
+    fixed = apply_corrections(report, '{"0": "He ate an apple."}')
+    assert fixed == "He ate an apple. It was nice. She saw a owl."
@@ -0,0 +1,63 @@
+# test_layout.py
+import time
+
+import pytest
+
+from src_essay_writer.layout import Block, Span, iter_blocks, parse_spans
+
+ESSAY = """# Title ##
+## 2 Body
+1.1 Sub heading
+- item with **bold**
+  * nested item
+3) third
+**Bold line**:
+Plain **b** text.
+
+References
+Smith, J. (2020). A book.
+- Doe, A. (2021). A paper.
+"""
+
+
+def test_blocks_of_a_whole_essay():
+    blocks = list(iter_blocks(ESSAY))
+    assert [(block.kind, block.text, block.level, block.marker) for block in blocks] == [
+        ("heading", "Title", 1, ""),
+        ("heading", "2 Body", 2, ""),
+        ("heading", "1.1 Sub heading", 2, ""),
+        ("list_item", "item with bold", 0, "-"),
+        ("list_item", "nested item", 1, "-"),
+        ("list_item", "third", 0, "3)"),
+        ("heading", "Bold line", 2, ""),
+        ("paragraph", "Plain b text.", 0, ""),
+        ("references", "References", 2, ""),
+        ("reference", "Smith, J. (2020). A book.", 0, ""),
+        ("reference", "- Doe, A. (2021). A paper.", 0, ""),
+    ]
+
+
+def test_lines_from_an_iterable_match_the_string():
+    assert list(iter_blocks(ESSAY.splitlines(keepends=True))) == list(iter_blocks(ESSAY))
+
+
+def test_references_heading_may_be_a_markdown_heading():
+    blocks = list(iter_blocks("## Works Cited\nSmith (2020)."))
+    assert blocks == [
+        Block("references", (Span("Works Cited", True),), level=2),
+        Block("reference", (Span("Smith (2020)."),)),
+    ]
+
+
+def test_parse_spans_splits_bold_runs():
+    assert parse_spans("a **b** c **d**") == (Span("a "), Span("b", True), Span(" c "), Span("d", True))
+    assert parse_spans("no bold") == (Span("no bold"),)
+
+
+@pytest.mark.parametrize("prefix", ["# ", "- ", "1. ", "1.1 ", "**", ""])
+def test_long_whitespace_runs_stay_linear(prefix):
+    line = f"{prefix}a{' ' * 20000}b{' ' * 20000}"
+    start = time.perf_counter()
+    blocks = list(iter_blocks(line))
+    assert time.perf_counter() - start < 0.5
+    assert blocks[0].text.rstrip().endswith("b")
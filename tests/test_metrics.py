@@ -0,0 +1,59 @@
+# test_metrics.py
+import asyncio
+import urllib.request
+
+import pytest
+
+from src_core.cache import TTLCache
+from src_core.metrics import Metrics, Span, capture, note_cache_hit, note_llm_call, serve_metrics, span_rows, traced
+
+
+def test_traced_records_calls_tokens_and_cache_kinds():
+    search = TTLCache(ttl=0, max_entries=10, kind="search")
+    search.set("q", ["result"])
+
+    @traced("test", "stage")
+    def stage():
+        note_llm_call({"input_tokens": 0, "output_tokens": 0, "cached": True})
+        note_llm_call({"input_tokens": 12, "output_tokens": 30, "cached": False})
+        search.get("q")
+        note_cache_hit("semantic")
+
+    with capture() as spans:
+        stage()
+    span, = spans
+    assert (span.llm_calls, span.input_tokens, span.output_tokens, span.cache_hits) == (2, 12, 30, 3)
+    assert span.cache_kinds == {"response": 1, "search": 1, "semantic": 1}
+    assert span_rows(spans)[0]["cache_hits"] == 3
+
+
+def test_cache_hits_are_exported_by_kind():
+    metrics = Metrics()
+    metrics.record(Span("thesis", "fetch", cache_hits=2, cache_kinds={"search": 2}))
+    metrics.record(Span("thesis", "fetch", cache_hits=1, cache_kinds={"response": 1}))
+    text = metrics.render_prometheus()
+    assert 'ai_tools_cache_hits_total{tool="thesis",stage="fetch",kind="response"} 1' in text
+    assert 'ai_tools_cache_hits_total{tool="thesis",stage="fetch",kind="search"} 2' in text
+    assert "answered from the response cache" not in text
+
+
+def test_errors_are_recorded_and_reraised():
+    @traced("test", "async_stage")
+    async def failing():
+        raise ValueError("bad")
+
+    with capture() as spans:
+        with pytest.raises(ValueError):
+            asyncio.run(failing())
+    assert spans[0].error == "ValueError: bad"
+
+
+def test_exporter_listens_on_the_given_host():
+    server = serve_metrics("127.0.0.1", 0)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert b"ai_tools_stage_seconds" in response.read()
+    finally:
+        server.shutdown()
@@ -0,0 +1,99 @@
+# test_paraphrase_chunking.py
+import asyncio
+
+import pytest
+
+from src_core.tokens import estimate_tokens
+from src_paraphraser import nodes_workflow
+from src_paraphraser.tools import chunk_text, split_paragraphs
+
+PARAGRAPHS = [
+    "Rainfall in the region has declined over the last decade.",
+    "Farmers have adapted by planting crops that need less water.",
+    "Local governments now fund new irrigation projects every year.",
+]
+TEXT = "\n\n".join(PARAGRAPHS)
+
+
+def rebuild(chunks):
+    return "".join(separator + chunk for separator, chunk in chunks)
+
+
+@pytest.mark.parametrize("max_tokens", [5, 20, 1000])
+def test_chunks_rebuild_the_paragraph_layout(max_tokens):
+    chunks = chunk_text(TEXT, max_tokens)
+    assert rebuild(chunks).split() == TEXT.split()
+    # Joining spaces and paragraph breaks count against the budget too
+    assert all(estimate_tokens(chunk) <= max_tokens or len(chunk.split()) == 1 for _, chunk in chunks)
+
+
+def test_packed_paragraphs_stay_within_budget():
+    budget = estimate_tokens(PARAGRAPHS[0] + "\n\n" + PARAGRAPHS[1])
+    assert [chunk for _, chunk in chunk_text(TEXT, budget - 1)][0] == PARAGRAPHS[0]
+    assert [chunk for _, chunk in chunk_text(TEXT, budget)][0] == PARAGRAPHS[0] + "\n\n" + PARAGRAPHS[1]
+
+
+def test_small_paragraphs_are_packed_together():
+    assert chunk_text(TEXT, 1000) == [("", TEXT)]
+    assert [chunk for _, chunk in chunk_text(TEXT, 1000, pack=False)] == PARAGRAPHS
+
+
+def test_oversized_paragraph_splits_at_sentences_and_rejoins_with_a_space():
+    paragraph = "First sentence is here. Second sentence is here. Third sentence is here."
+    chunks = chunk_text("Intro.\n\n" + paragraph, estimate_tokens("Second sentence is here.") + 1)
+    assert chunks[0] == ("", "Intro.")
+    assert [separator for separator, _ in chunks[1:]] == ["\n\n", " ", " "]
+    assert rebuild(chunks) == "Intro.\n\n" + paragraph
+
+
+def test_blank_lines_and_whitespace_collapse_to_paragraphs():
+    assert split_paragraphs("\n  a  \n \n\n b\n") == ["a", "b"]
+    assert chunk_text("   \n\n ", 100) == []
+
+
+class EchoChain:
+    # Returns its only input unchanged and records which stage was called
+    def __init__(self, name, calls):
+        self.name, self.calls = name, calls
+
+    def invoke(self, inputs, config=None, bypass_cache=False):
+        self.calls.append(self.name)
+        (value,) = inputs.values()
+        return type("Reply", (), {"content": value})()
+
+    async def ainvoke(self, inputs, config=None, bypass_cache=False):
+        return self.invoke(inputs, config, bypass_cache)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nodes_workflow, "get_chain", lambda name: EchoChain(name, calls))
+    return calls
+
+
+def test_document_chunks_come_back_in_order(calls):
+    text = TEXT + "\n\nA fourth paragraph closes the document here."
+    assert nodes_workflow.paraphrase_document(text, chunk_tokens=20) == text
+    assert calls.count("rephrase") == len(chunk_text(text, 20))
+    assert asyncio.run(nodes_workflow.aparaphrase_document(text, chunk_tokens=20)) == text
+
+
+def test_memo_reprocesses_only_edited_paragraphs(calls):
+    memo = {}
+    nodes_workflow.paraphrase_document(TEXT, memo=memo)
+    assert calls.count("rephrase") == 3 and len(memo) == 3
+    calls.clear()
+    edited = TEXT.replace("every year", "each spring")
+    assert nodes_workflow.paraphrase_document(edited, memo=memo) == edited
+    assert calls.count("rephrase") == 1
+
+
+def test_stream_document_reports_reuse_and_chunks(calls):
+    memo = {}
+    nodes_workflow.paraphrase_document(TEXT, memo=memo)
+    edited = TEXT.replace("every year", "each spring").replace("last decade", "past ten years")
+    events = list(nodes_workflow.stream_document(edited, memo=memo))
+    assert events[0] == ("stage", "REUSED 1/3")
+    assert [payload for event, payload in events if event == "stage"][1:] == ["CHUNK 1/2", "CHUNK 2/2"]
+    assert events[-1] == ("done", {"final_output": edited})
@@ -0,0 +1,66 @@
+# test_pdf_text.py
+import io
+
+import pytest
+from fpdf import FPDF
+
+from src_core import pdf_text
+from src_core.pdf_text import PDFTooLargeError, extract_pdf_text, iter_pdf_pages, read_pdf_bytes
+
+
+def make_pdf(*pages):
+    # One page per entry; an empty string makes a blank page
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=12)
+    for text in pages:
+        pdf.add_page()
+        if text:
+            pdf.cell(0, 10, text)
+    return bytes(pdf.output())
+
+
+PAGES = [f"Page {i} text" for i in range(1, 7)]
+
+
+def test_pages_come_back_in_order_without_blank_ones():
+    data = make_pdf(PAGES[0], "", PAGES[1])
+    assert [text.strip() for text in iter_pdf_pages(data)] == PAGES[:2]
+
+
+def test_parallel_extraction_matches_serial(monkeypatch):
+    data = make_pdf(*PAGES)
+    serial = list(iter_pdf_pages(data))
+    monkeypatch.setattr(pdf_text, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(pdf_text, "PDF_WORKERS", 2)
+    assert list(iter_pdf_pages(data)) == serial
+    assert [text.strip() for text in serial] == PAGES
+
+
+def test_page_limit_is_enforced():
+    with pytest.raises(PDFTooLargeError, match="3 pages"):
+        list(iter_pdf_pages(make_pdf(*PAGES[:3]), max_pages=2))
+
+
+@pytest.mark.parametrize("wrap", [bytes, io.BytesIO, "path"])
+def test_size_limit_applies_to_every_source(tmp_path, wrap):
+    data = make_pdf(PAGES[0])
+    if wrap == "path":
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(data)
+        source = str(path)
+    else:
+        source = wrap(data)
+    assert read_pdf_bytes(source, max_bytes=len(data)) == data
+    with pytest.raises(PDFTooLargeError):
+        read_pdf_bytes(source, max_bytes=len(data) - 1)
+
+
+def test_extracted_text_is_cached_by_content():
+    data = make_pdf(*PAGES[:2])
+    hits = pdf_text._text_cache.hits
+    first = extract_pdf_text(data)
+    assert extract_pdf_text(io.BytesIO(data)) == first
+    assert pdf_text._text_cache.hits == hits + 1
+    extract_pdf_text(data, use_cache=False)
+    assert pdf_text._text_cache.hits == hits + 1
+    assert first.split("\n") == [text for text in iter_pdf_pages(data)]
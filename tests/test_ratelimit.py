@@ -0,0 +1,194 @@
+# test_ratelimit.py
+import asyncio
+
+import pytest
+
+from src_core.ratelimit import (
+    BATCH,
+    INTERACTIVE,
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMGuard,
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+)
+
+
+class ProviderError(Exception):
+    pass
+
+
+def failing(*errors, result="ok"):
+    # fn for LLMGuard.call() that raises each error in turn, then returns result
+    pending = list(errors)
+
+    def fn():
+        if pending:
+            raise pending.pop(0)
+        return result
+
+    return fn
+
+
+def make_guard(threshold=2, cooldown=0.0, max_retries=2):
+    breaker = CircuitBreaker(threshold=threshold, cooldown=cooldown)
+    return LLMGuard(RateLimiter(rpm=0, tpm=0), breaker, max_retries=max_retries, base_delay=0.0, max_delay=0.0)
+
+
+def open_breaker(guard):
+    for _ in range(guard.breaker.threshold):
+        guard.breaker.record_failure()
+    assert guard.breaker.opened_at is not None
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(threshold=2, cooldown=60.0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_allows_one_trial_and_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    assert breaker.opened_at is None and breaker.failures == 0
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(threshold=5, cooldown=60.0)
+    breaker.opened_at = 0.0  # cooldown long over
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_rate_limited_trial_is_retried_and_closes_breaker():
+    guard = make_guard()
+    open_breaker(guard)
+    assert guard.call(failing(ProviderError("429 Resource exhausted"))) == "ok"
+    assert guard.breaker.opened_at is None
+    assert not guard.breaker._trial
+    assert guard.stats["rate_limited"] == 1
+
+
+def test_rate_limited_trial_does_not_wedge_breaker():
+    guard = make_guard(max_retries=0)
+    open_breaker(guard)
+    with pytest.raises(ProviderError):
+        guard.call(failing(ProviderError("429 quota exceeded")))
+    assert not guard.breaker._trial
+    # The cooldown is zero, so the next call gets a new trial instead of CircuitOpenError
+    assert guard.call(failing()) == "ok"
+    assert guard.breaker.opened_at is None
+
+
+def test_async_rate_limited_trial_is_retried():
+    guard = make_guard()
+    open_breaker(guard)
+    fn = failing(ProviderError("429 rate limit"))
+
+    async def call():
+        return fn()
+
+    assert asyncio.run(guard.acall(call)) == "ok"
+    assert guard.breaker.opened_at is None
+
+
+def test_non_provider_error_releases_trial_without_retry():
+    guard = make_guard()
+    open_breaker(guard)
+    with pytest.raises(ValueError):
+        guard.call(failing(ValueError("bad prompt")))
+    assert not guard.breaker._trial
+    assert guard.stats["retries"] == 0
+
+
+def test_transient_errors_are_retried_then_recorded():
+    guard = make_guard(threshold=10, max_retries=1)
+    with pytest.raises(ProviderError):
+        guard.call(failing(ProviderError("503 unavailable"), ProviderError("503 unavailable")))
+    assert guard.stats["retries"] == 1
+    assert guard.breaker.failures == 2
+
+
+def test_token_bucket_refills_at_remaining_rate():
+    bucket = TokenBucket(60, burst=0.1)
+    now = bucket.updated
+    assert bucket.capacity == 6.0
+    assert bucket.wait_time(1, now=now) == 0.0
+    bucket.take(6)
+    assert bucket.wait_time(1, now=now) == pytest.approx(1 / 0.9)
+    assert bucket.wait_time(1, now=now + 1 / 0.9) == pytest.approx(0.0)
+
+
+def test_token_bucket_waits_to_pay_back_debt():
+    bucket = TokenBucket(600, burst=0.1)
+    now = bucket.updated
+    bucket.take(bucket.capacity + 9)
+    assert bucket.wait_time(1, now=now) == pytest.approx(10 / bucket.rate)
+
+
+@pytest.mark.parametrize("burst", [1.0, 1.5, -0.1])
+def test_token_bucket_rejects_burst_without_refill(burst):
+    with pytest.raises(ValueError):
+        TokenBucket(60, burst=burst)
+
+
+def test_batch_lane_leaves_reserve_for_interactive_calls():
+    limiter = RateLimiter(rpm=600, tpm=0, batch_reserve=0.5)
+    limiter.requests.take(limiter.requests.capacity * 0.6)
+    assert limiter._try_admit(0, BATCH) > 0
+    assert limiter._try_admit(0, INTERACTIVE) == 0.0
+
+
+def test_batch_lane_yields_to_waiting_interactive_calls():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.waiting[INTERACTIVE] = 1
+    assert limiter._try_admit(0, BATCH) > 0
+    assert limiter._try_admit(0, INTERACTIVE) == 0.0
+
+
+def test_backoff_delay_is_bounded_and_longer_when_throttled():
+    for attempt in range(6):
+        assert 0.5 <= backoff_delay(attempt, False, base=1.0, maximum=100.0) / 2 ** attempt <= 1.0
+    assert backoff_delay(0, True, base=1.0, maximum=100.0) >= 2.0
+    assert backoff_delay(20, True, base=1.0, maximum=5.0) <= 5.0
+
+
+def test_cancelled_async_trial_is_released():
+    guard = make_guard()
+    open_breaker(guard)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.create_task(guard.acall(hang))
+        await asyncio.sleep(0.01)
+        assert guard.breaker._trial
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert not guard.breaker._trial
+    assert guard.call(failing()) == "ok"
+    assert guard.breaker.opened_at is None
+
+
+def test_interrupted_sync_trial_is_released():
+    guard = make_guard()
+    open_breaker(guard)
+    with pytest.raises(KeyboardInterrupt):
+        guard.call(failing(KeyboardInterrupt()))
+    assert not guard.breaker._trial
+    assert guard.call(failing()) == "ok"
@@ -0,0 +1,71 @@
+# test_semantic_cache.py
+import pytest
+
+from src_core.semantic_cache import SemanticCache, same_content, stance_key, signature
+
+TOPIC = "Why capital punishment should be abolished"
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticCache(threshold=0.8, max_entries=100, ttl=0)
+    cache.add("essay", TOPIC, {"final_output": "abolish"})
+    return cache
+
+
+@pytest.mark.parametrize("topic", [
+    "why capital punishments should be abolished",
+    "Capital punishment: why it should be abolished",
+])
+def test_reworded_topic_matches(cache, topic):
+    match = cache.lookup("essay", topic)
+    assert match is not None and match.result == {"final_output": "abolish"}
+
+
+@pytest.mark.parametrize("topic", [
+    "Why capital punishment should not be abolished",
+    "Why capital punishment shouldn't be abolished",
+    "Why capital punishment should never be abolished",
+    "Arguments against abolishing capital punishment",
+])
+def test_opposite_stance_does_not_match(cache, topic):
+    assert cache.lookup("essay", topic) is None
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("Impact of climate change on small-scale agriculture in India", "Impact of climate change on small-scale agriculture in Kenya"),
+    ("Effects of social media on the mental health of teenage girls", "Effects of social media on the mental health of teenage boys"),
+    (
+        "Should schools ban smartphones - because they distract - for College students",
+        "Should schools ban smartphones - because they distract - for parents",
+    ),
+    ("Causes of the 2008 financial crisis", "Causes of the 2007 financial crisis"),
+])
+def test_one_different_content_word_does_not_match(stored, query):
+    cache = SemanticCache(threshold=0.5, max_entries=100, ttl=0)
+    cache.add("essay", stored, {"final_output": stored})
+    # The topics look alike to MinHash; the content check is what keeps them apart
+    assert (signature(stored) == signature(query)).mean() >= 0.5
+    assert cache.lookup("essay", query) is None
+
+
+def test_typos_and_word_order_still_match():
+    assert same_content("Impact of deforestation on biodiversity", "biodiversity impacts of deforstation")
+    assert not same_content("Urban heat in 2020", "Urban heat in 2021")
+
+
+def test_stance_words_must_match_exactly():
+    cache = SemanticCache(threshold=0.5, max_entries=100, ttl=0)
+    cache.add("essay", "Benefits of remote work for employees", {"final_output": "benefits"})
+    assert cache.lookup("essay", "Drawbacks of remote work for employees") is None
+    assert cache.lookup("essay", "remote work benefit for employees") is not None
+
+
+def test_stance_key_folds_negations_and_plurals():
+    assert stance_key("It can't and won't work") == ("not",)
+    assert stance_key("Pros and cons of nuclear power") == ("con", "pro")
+    assert stance_key("Impact of junk food on health") == ()
+
+
+def test_namespaces_are_separate(cache):
+    assert cache.lookup("thesis", TOPIC) is None
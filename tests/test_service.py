@@ -0,0 +1,84 @@
+# test_service.py
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from src_core.service import Job, JobRequest, JobQueue, create_app
+
+
+def wait_for(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        summary = client.get(f"/jobs/{job_id}").json()
+        if summary["status"] in ("done", "error"):
+            return summary
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def read_events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_paraphrase_job_runs_and_replays_its_events():
+    with TestClient(create_app(workers=1)) as client:
+        submitted = client.post("/paraphrase", json={"text": "Rainfall has declined sharply in the region."})
+        assert submitted.status_code == 202
+        summary = wait_for(client, submitted.json()["id"])
+        assert summary["status"] == "done" and summary["result"]["output"]
+
+        events = read_events(client.get(submitted.json()["events_url"]))
+        assert events[-1] == ("done", summary["result"])
+        assert any(event == "stage" for event, _ in events)
+        streamed = "".join(payload for event, payload in events if event == "token")
+        assert streamed.strip()
+
+
+def test_token_events_are_kept_as_one_running_text():
+    async def main():
+        job = Job("essay", JobRequest(topic="heat"))
+        for event, payload in [("stage", "Essay"), ("token", "Hot "), ("token", "days"), ("stage", "Humanize")]:
+            await job.emit(event, payload)
+        return job
+
+    job = asyncio.run(main())
+    assert job.text == "Hot days"
+    assert job.events == [("stage", "Essay", 0), ("stage", "Humanize", 8)]
+
+
+def test_missing_input_is_rejected():
+    with TestClient(create_app(workers=1)) as client:
+        assert client.post("/essay", json={"topic": "  "}).status_code == 422
+        assert client.post("/thesis/batch", json={"topics": []}).status_code == 422
+
+
+def test_full_queue_answers_429_with_retry_after():
+    with TestClient(create_app(workers=0, max_queued=1)) as client:
+        assert client.post("/essay", json={"topic": "Urban heat"}).status_code == 202
+        refused = client.post("/essay", json={"topic": "Urban heat"})
+        assert refused.status_code == 429
+        assert "Retry-After" in refused.headers and refused.json()["queued"] == 1
+
+
+def test_finished_jobs_are_pruned_after_their_ttl():
+    async def main():
+        queue = JobQueue(workers=0, max_queued=4, ttl=60)
+        old, recent, running = (queue.submit("essay", JobRequest(topic=topic)) for topic in ("a", "b", "c"))
+        old.finished = time.time() - 120
+        recent.finished = time.time()
+        queue._prune()
+        return queue.jobs, recent, running
+
+    jobs, recent, running = asyncio.run(main())
+    assert set(jobs) == {recent.id, running.id}
+
+
+def test_unknown_job_is_404():
+    with TestClient(create_app(workers=1)) as client:
+        assert client.get("/jobs/nope").status_code == 404
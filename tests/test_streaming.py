@@ -0,0 +1,48 @@
+# test_streaming.py
+import asyncio
+
+from src_core.config import GRAMMAR_PREPASS
+from src_essay_writer import nodes_workflow as essay
+from src_paraphraser import nodes_workflow as paraphraser
+
+
+def events(stream):
+    return list(stream)
+
+
+def test_stream_reports_stages_then_done():
+    stream = events(essay.stream_workflow({"topic": "Soil health in drylands"}))
+    stages = [payload for event, payload in stream if event == "stage"]
+    assert stages == ["GenerateEssay", "HumanizeEssay", "GrammarCorrect"]
+    assert stream[-1][0] == "done" and stream[-1][1]["final_output"]
+
+
+def test_tokens_stream_when_the_grammar_pass_makes_no_streamed_call():
+    # With the pre-pass the grammar stage is skipped or JSON-only, so the humanized
+    # draft is what streams; the final text still arrives with "done"
+    assert GRAMMAR_PREPASS
+    stream = events(essay.stream_workflow({"topic": "Soil health in wetlands"}))
+    tokens = "".join(payload for event, payload in stream if event == "token")
+    assert tokens
+    assert tokens == stream[-1][1]["humanized_essay"]
+
+
+def test_fast_mode_streams_the_merged_stage():
+    stream = events(essay.stream_workflow({"topic": "Soil health on farms", "mode": "fast"}))
+    tokens = "".join(payload for event, payload in stream if event == "token")
+    assert tokens == stream[-1][1]["final_output"]
+
+
+def test_async_stream_matches_sync_stages():
+    async def collect():
+        return [item async for item in essay.astream_workflow({"topic": "Soil health in forests"})]
+
+    stream = asyncio.run(collect())
+    assert [payload for event, payload in stream if event == "stage"] == ["GenerateEssay", "HumanizeEssay", "GrammarCorrect"]
+    assert any(event == "token" for event, _ in stream)
+
+
+def test_paraphrase_stream_of_one_chunk_streams_tokens():
+    stream = events(paraphraser.stream_document("Soil is important. Farmers know it well."))
+    assert any(event == "token" for event, _ in stream)
+    assert stream[-1] == ("done", {"final_output": stream[-1][1]["final_output"]})
@@ -0,0 +1,78 @@
+# test_thesis_batch.py
+import json
+
+import pytest
+
+from src_thesis_writer import nodes_workflow
+
+CLAIMS = [
+    "Cities should plant street trees because shade lowers summer deaths.",
+    "Reflective roofing is the cheapest way for poor districts to stay cool.",
+    "National building codes must require cooling plans for every new school.",
+]
+
+
+def thesis_list(topic, short=None):
+    return [
+        {"topic": topic, "claim": "Too short." if i == short else claim, "points": ["health", "cost"]}
+        for i, claim in enumerate(CLAIMS)
+    ]
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubAgent:
+    # Answers each prompt as a well-behaved model would; the second statement of
+    # topics listed in `short` comes back too short, so the quality check flags it
+    def __init__(self, name, calls, short):
+        self.name, self.calls, self.short = name, calls, short
+
+    def invoke(self, inputs, bypass_cache=False):
+        self.calls.append(self.name)
+        if self.name == "thesis_items":
+            return Reply(json.dumps(thesis_list(inputs["topic"], 1 if inputs["topic"] in self.short else None)))
+        if self.name == "batch_thesis_items":
+            topics = json.loads(inputs["items"])
+            return Reply(json.dumps({key: thesis_list(topic, 1 if topic in self.short else None) for key, topic in topics.items()}))
+        if self.name.startswith("batch_"):
+            entries = json.loads(inputs["items"])
+            return Reply(json.dumps({key: {**entry["item"], "claim": "Edited: " + CLAIMS[1]} for key, entry in entries.items()}))
+        return Reply(json.dumps({**json.loads(inputs["item"]), "claim": "Edited: " + CLAIMS[1]}))
+
+    async def ainvoke(self, inputs, bypass_cache=False):
+        return self.invoke(inputs, bypass_cache)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nodes_workflow, "get_agent", lambda name: StubAgent(name, calls, short={"Urban heat"}))
+    return calls
+
+
+@pytest.mark.parametrize("mode", ["standard", "fast"])
+def test_batch_returns_the_items_of_a_single_topic_run(calls, mode):
+    topics = ["Urban heat", "Coastal flooding", "Urban heat "]
+    theses = nodes_workflow.generate_theses(topics, mode=mode)
+    assert list(theses) == ["Urban heat", "Coastal flooding"]
+    workflow = nodes_workflow.create_workflow()
+    for topic, items in theses.items():
+        assert items == workflow.invoke({"topic": topic, "mode": mode})["thesis_items"]
+
+
+def test_only_flagged_statements_are_edited_in_batches(calls):
+    theses = nodes_workflow.generate_theses(["Urban heat", "Coastal flooding", "Drought"])
+    assert calls == ["batch_thesis_items", "item_humanize"]
+    assert theses["Urban heat"][1]["claim"] == "Edited: " + CLAIMS[1]
+    assert theses["Drought"] == thesis_list("Drought")
+
+
+def test_flagged_statements_of_several_topics_share_a_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(nodes_workflow, "get_agent", lambda name: StubAgent(name, calls, short={"Drought", "Wildfire"}))
+    theses = nodes_workflow.generate_theses(["Drought", "Wildfire"], mode="fast")
+    assert calls == ["batch_thesis_items", "batch_item_humanize_grammar"]
+    assert all(items[1]["claim"] == "Edited: " + CLAIMS[1] for items in theses.values())
@@ -0,0 +1,44 @@
+# test_thesis_tools.py
+import json
+
+from src_thesis_writer.tools import format_thesis_list, parse_keyed_json, parse_thesis_items
+
+
+def test_keys_match_exactly_before_normalizing():
+    reply = json.dumps({"Topic 1": "upper", "topic 1": "lower"})
+    assert parse_keyed_json(reply, ["Topic 1", "topic 1"]) == {"Topic 1": "upper", "topic 1": "lower"}
+
+
+def test_ambiguous_normalized_keys_are_left_unanswered():
+    # Both inputs normalize to "topic 1", so a re-cased reply key cannot be attributed
+    reply = json.dumps({"TOPIC 1": "one list"})
+    assert parse_keyed_json(reply, ["Topic 1", "topic 1"]) == {}
+
+
+def test_partial_exact_answer_does_not_leak_to_a_near_duplicate():
+    reply = json.dumps({"Topic 1": "upper"})
+    assert parse_keyed_json(reply, ["Topic 1", "topic 1"]) == {"Topic 1": "upper"}
+
+
+def test_recased_key_matches_when_unambiguous():
+    reply = json.dumps({"junk food and health ": "list", "Urban Heat": ["a", "b"]})
+    assert parse_keyed_json(reply, ["Junk food and health", "urban heat"]) == {
+        "Junk food and health": "list",
+        "urban heat": "1. a\n2. b",
+    }
+
+
+def test_unparseable_reply_answers_nothing():
+    assert parse_keyed_json('{"Topic 1": "cut off', ["Topic 1"]) == {}
+
+
+def test_thesis_items_round_trip_to_markdown():
+    reply = json.dumps([{"topic": "Heat", "claim": "Cities must plant trees.", "points": ["shade", "cost"]}])
+    items = parse_thesis_items(reply, "Heat")
+    assert format_thesis_list(items) == "1. **Heat**: Cities must plant trees.\n   *Major points:* shade; cost"
+
+
+def test_object_values_stay_json_for_the_item_parsers():
+    reply = json.dumps({"Heat": [{"topic": "Heat", "claim": "Plant trees.", "points": ["shade"]}]})
+    answered = parse_keyed_json(reply, ["Heat"])
+    assert parse_thesis_items(answered["Heat"], "Heat") == [{"topic": "Heat", "claim": "Plant trees.", "points": ["shade"]}]